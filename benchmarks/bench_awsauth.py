@@ -0,0 +1,77 @@
+"""
+Benchmark of the AWS SigV4 signing overhead per request.
+
+Compares the signers which can be used for the 'awsauth' auth method:
+- AWS4Auth with static credentials,
+- AWS4Auth created for every request, as needed to pick up refreshed
+  credentials without RefreshingAWS4Auth, it derives the signing key for
+  every request,
+- RefreshingAWS4Auth refreshing its credentials in the background, with the
+  cached signing key.
+
+Run: python benchmarks/bench_awsauth.py [--requests N]
+"""
+import argparse
+import json
+import timeit
+
+import requests
+from requests_aws4auth import AWS4Auth
+
+from osman import awsauth
+
+REGION = "us-east-1"
+SERVICE = "es"
+
+
+def per_request_signer(request: requests.PreparedRequest):
+    """Sign by an AWS4Auth created for the request."""
+    signer = AWS4Auth(
+        "access_key", "secret_key", REGION, SERVICE, session_token="token"
+    )
+    return signer(request)
+
+
+def prepare_request() -> requests.PreparedRequest:
+    """Return a typical search request."""
+    body = json.dumps({"query": {"match": {"name": "james"}}, "size": 10})
+    return requests.Request(
+        "POST",
+        "https://search-domain.us-east-1.es.amazonaws.com/index/_search",
+        headers={"content-type": "application/json"},
+        data=body.encode("utf-8"),
+    ).prepare()
+
+
+def main():
+    """Run the benchmark and print microseconds per signed request."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    signers = {
+        "AWS4Auth static credentials": AWS4Auth(
+            "access_key", "secret_key", REGION, SERVICE, session_token="token"
+        ),
+        "AWS4Auth per request": per_request_signer,
+        "RefreshingAWS4Auth": awsauth.RefreshingAWS4Auth(
+            awsauth.StaticCredentialsProvider(
+                awsauth.AWSCredentials("access_key", "secret_key", "token")
+            ),
+            REGION,
+            SERVICE,
+            refresh_interval=60,
+        ),
+    }
+
+    requests_to_sign = [prepare_request() for _ in range(args.requests)]
+    for name, signer in signers.items():
+        it = iter(requests_to_sign)
+        elapsed = timeit.timeit(lambda: signer(next(it)), number=args.requests)
+        print(f"{name:35} {elapsed / args.requests * 1e6:8.1f} us/request")
+        # Reset the signed headers for the next signer
+        requests_to_sign = [prepare_request() for _ in range(args.requests)]
+
+
+if __name__ == "__main__":
+    main()
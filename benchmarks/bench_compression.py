@@ -0,0 +1,149 @@
+"""
+Benchmark of the request/response compression trade-off.
+
+Measures the CPU time of gzip at different levels against the saved bytes
+for the bodies of add_data_to_index (bulk request) and search_index (search
+request and response) and estimates the total time for several network
+bandwidths. The response is compressed by the server with its own
+http.compression_level, the response rows only illustrate the trade-off.
+
+With --host the same operations are also timed against a live OpenSearch
+instance for every compression policy.
+
+Run: python benchmarks/bench_compression.py [--documents N] [--host URL]
+"""
+import argparse
+import gzip
+import json
+import random
+import time
+
+from opensearchpy import helpers
+from opensearchpy.serializer import JSONSerializer
+
+from osman import Osman, OsmanConfig
+from osman.osman import _bulk_json_data
+
+# Network bandwidths in bytes per second
+BANDWIDTHS = {"100 Mbit/s": 12.5e6, "1 Gbit/s": 125e6, "10 Gbit/s": 1250e6}
+LEVELS = (1, 6, 9)
+WORDS = ("alpha", "beta", "gamma", "delta", "omega", "sigma", "kappa")
+
+
+def generate_documents(count: int) -> list:
+    """Return documents similar to the test data."""
+    return [
+        {
+            "id": idx,
+            "age": random.randint(1, 90),  # noqa: S311
+            "name": random.choice(WORDS),  # noqa: S311
+            "text": " ".join(random.choices(WORDS, k=40)),  # noqa: S311
+        }
+        for idx in range(count)
+    ]
+
+
+def bulk_body(documents: list) -> bytes:
+    """Return the bulk request body as sent by add_data_to_index."""
+    serializer = JSONSerializer()
+    lines = []
+    for action in _bulk_json_data("benchmark", documents, id_key="id"):
+        action, data = helpers.expand_action(action)
+        lines.append(serializer.dumps(action))
+        lines.append(serializer.dumps(data))
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def search_bodies(documents: list, size: int) -> tuple:
+    """Return the search request and response bodies."""
+    request = {"query": {"match": {"text": "alpha"}}, "size": size}
+    response = {
+        "took": 5,
+        "hits": {
+            "total": {"value": len(documents), "relation": "eq"},
+            "hits": [
+                {"_index": "benchmark", "_id": str(doc["id"]), "_source": doc}
+                for doc in documents[:size]
+            ],
+        },
+    }
+    return json.dumps(request).encode(), json.dumps(response).encode()
+
+
+def report(name: str, body: bytes):
+    """Print compression cost and estimated transfer time of the body."""
+    print(f"\n{name}: {len(body)} bytes")
+    header = f"{'level':>6} {'bytes':>10} {'cpu ms':>8}"
+    for bandwidth in BANDWIDTHS:
+        header += f" {bandwidth:>12}"
+    print(header)
+
+    rows = [("off", len(body), 0)]
+    for level in LEVELS:
+        start = time.perf_counter()
+        compressed = gzip.compress(body, compresslevel=level)
+        compress_time = time.perf_counter() - start
+        start = time.perf_counter()
+        gzip.decompress(compressed)
+        cpu_time = compress_time + time.perf_counter() - start
+        rows.append((level, len(compressed), cpu_time))
+
+    for level, size, cpu_time in rows:
+        line = f"{level:>6} {size:>10} {cpu_time * 1000:>8.2f}"
+        for bandwidth in BANDWIDTHS.values():
+            total_ms = (cpu_time + size / bandwidth) * 1000
+            line += f" {total_ms:>9.2f} ms"
+        print(line)
+
+
+def benchmark_live(host_url: str, documents: list):
+    """Time add_data_to_index and search_index for each policy."""
+    print(f"\nLive {host_url}, {len(documents)} documents")
+    index_name = f"bench_compression_{int(time.time())}"
+    for policy in ("off", "always", "auto"):
+        os_man = Osman(
+            OsmanConfig(
+                host_url=host_url,
+                compression={"bulk": policy, "search": policy},
+            )
+        )
+        os_man.create_index(index_name)
+
+        start = time.perf_counter()
+        os_man.add_data_to_index(index_name, documents, id_key="id")
+        bulk_time = time.perf_counter() - start
+        os_man.client.indices.refresh(index=index_name)
+
+        query = {"query": {"match": {"text": "alpha"}}, "size": 1000}
+        start = time.perf_counter()
+        for _ in range(10):
+            os_man.search_index(index_name, query)
+        search_time = (time.perf_counter() - start) / 10
+
+        print(
+            f"{policy:>7}: add_data_to_index {bulk_time * 1000:8.1f} ms, "
+            + f"search_index {search_time * 1000:8.1f} ms"
+        )
+        os_man.delete_index(index_name)
+        os_man.close()
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--documents", type=int, default=10000)
+    parser.add_argument("--host", help="OpenSearch url for the live part")
+    args = parser.parse_args()
+
+    documents = generate_documents(args.documents)
+    report("add_data_to_index bulk request", bulk_body(documents))
+    search_request, search_response = search_bodies(documents, 1000)
+    report("search_index request", search_request)
+    report("search_index response (1000 hits)", search_response)
+
+    if args.host:
+        benchmark_live(args.host, documents)
+
+
+if __name__ == "__main__":
+    main()
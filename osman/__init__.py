@@ -2,4 +2,6 @@
 
 # flake8: noqa
 from osman.config import OsmanConfig
+from osman.migration import migrate
 from osman.osman import Osman
+from osman.registry import close_all, get_osman
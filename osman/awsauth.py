@@ -0,0 +1,390 @@
+"""AWS SigV4 signing with cached signing keys and refreshed credentials."""
+import configparser
+import datetime
+import hashlib
+import hmac
+import logging
+import os
+import threading
+from dataclasses import dataclass
+
+from requests_aws4auth import AWS4Auth, AWS4SigningKey
+
+# Maximal number of cached derived signing keys, one key is valid for a day
+_SIGNING_KEYS_CACHE_SIZE = 8
+
+_AMZ_DATE_FORMAT = "%Y%m%dT%H%M%SZ"
+_SCOPE_DATE_FORMAT = "%Y%m%d"
+_SECURITY_TOKEN_HEADER = "x-amz-security-token"
+
+
+@dataclass(frozen=True)
+class AWSCredentials(object):
+    """
+    Immutable snapshot of AWS credentials.
+
+    Attributes
+    ----------
+    access_key_id: str
+        AWS access key id
+    secret_access_key: str
+        AWS secret access key
+    session_token: str
+        session token of temporary credentials or None
+    """
+
+    access_key_id: str
+    secret_access_key: str
+    session_token: str = None
+
+
+class StaticCredentialsProvider(object):
+    """Provider returning always the same credentials."""
+
+    def __init__(self, credentials: AWSCredentials):
+        """
+        Init StaticCredentialsProvider.
+
+        Parameters
+        ----------
+        credentials: AWSCredentials
+            credentials to provide
+        """
+        self.credentials = credentials
+
+    def load(self) -> AWSCredentials:
+        """
+        Return the credentials.
+
+        Returns
+        -------
+        AWSCredentials
+            the credentials given at init
+        """
+        return self.credentials
+
+
+class EnvCredentialsProvider(object):
+    """
+    Provider reading credentials from the environment variables.
+
+    AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY and optional AWS_SESSION_TOKEN
+    are read on every load, i.e. rotated values are picked up.
+    """
+
+    def load(self) -> AWSCredentials:
+        """
+        Read the credentials from the environment.
+
+        Returns
+        -------
+        AWSCredentials
+            current credentials
+        Raises
+        ------
+        RuntimeError
+            when the access key or the secret key is not set
+        """
+        access_key_id = os.environ.get("AWS_ACCESS_KEY_ID")
+        secret_access_key = os.environ.get("AWS_SECRET_ACCESS_KEY")
+        if not access_key_id or not secret_access_key:
+            raise RuntimeError("AWS credentials missing in the environment")
+
+        return AWSCredentials(
+            access_key_id,
+            secret_access_key,
+            os.environ.get("AWS_SESSION_TOKEN"),
+        )
+
+
+class FileCredentialsProvider(object):
+    """
+    Provider reading credentials from an AWS shared credentials file.
+
+    The file is in the ini format of ~/.aws/credentials, it is re-read on
+    every load so credentials rotated by an external process are picked up.
+    """
+
+    def __init__(self, path: str = None, profile: str = "default"):
+        """
+        Init FileCredentialsProvider.
+
+        Parameters
+        ----------
+        path: str
+            path to the credentials file, default: ~/.aws/credentials
+        profile: str
+            profile (ini section) to read the credentials from
+        """
+        self.path = path or os.path.join("~", ".aws", "credentials")
+        self.path = os.path.expanduser(self.path)
+        self.profile = profile
+
+    def load(self) -> AWSCredentials:
+        """
+        Read the credentials from the file.
+
+        Returns
+        -------
+        AWSCredentials
+            current credentials
+        Raises
+        ------
+        RuntimeError
+            when the file or the profile can't be read
+        """
+        parser = configparser.ConfigParser()
+        if not parser.read(self.path):
+            raise RuntimeError(f"Can't read AWS credentials file {self.path}")
+        if not parser.has_section(self.profile):
+            raise RuntimeError(
+                f"Profile '{self.profile}' missing in {self.path}"
+            )
+
+        section = parser[self.profile]
+        return AWSCredentials(
+            section.get("aws_access_key_id"),
+            section.get("aws_secret_access_key"),
+            section.get("aws_session_token"),
+        )
+
+
+class RefreshingAWS4Auth(AWS4Auth):
+    """
+    AWS4Auth with cached signing keys and background credential refresh.
+
+    The derived signing key is cached per secret key/date/region/service,
+    so a request is signed by a single HMAC of the string to sign. The
+    credentials are reloaded from the provider by a daemon thread, requests
+    always use the last successfully loaded credentials and never wait for
+    the provider.
+
+    The signing does not mutate the instance, i.e. it is safe to be shared
+    among threads.
+    """
+
+    def __init__(
+        self,
+        provider,
+        region: str,
+        service: str,
+        refresh_interval: float = None,
+    ):
+        """
+        Init RefreshingAWS4Auth.
+
+        Parameters
+        ----------
+        provider
+            credentials provider, any object with load() returning
+            AWSCredentials
+        region: str
+            AWS region
+        service: str
+            AWS service
+        refresh_interval: float
+            seconds between credential reloads, None disables the refresh
+        """
+        self.provider = provider
+        self.refresh_interval = refresh_interval
+        self._credentials = provider.load()
+        super().__init__(
+            self._credentials.access_key_id,
+            self._credentials.secret_access_key,
+            region,
+            service,
+        )
+        self.include_hdrs = set(self.default_include_headers)
+        self.include_hdrs.add(_SECURITY_TOKEN_HEADER)
+
+        self._signing_keys = {}
+        self._signing_keys_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._refresher = None
+        self._refresher_pid = None
+        self._ensure_refresher()
+
+    @property
+    def credentials(self) -> AWSCredentials:
+        """
+        Return the credentials currently used for signing.
+
+        Returns
+        -------
+        AWSCredentials
+            current credentials
+        """
+        return self._credentials
+
+    def refresh(self) -> bool:
+        """
+        Reload the credentials from the provider.
+
+        A failed reload is logged and the previous credentials are kept.
+
+        Returns
+        -------
+        bool
+            True if the credentials were reloaded
+        """
+        try:
+            credentials = self.provider.load()
+        except Exception as exc:
+            logging.warning("AWS credentials refresh failed: %s", exc)
+            return False
+
+        if credentials != self._credentials:
+            logging.info("AWS credentials changed")
+        # Assignment is atomic, signing threads see old or new credentials
+        self._credentials = credentials
+        return True
+
+    def close(self):
+        """Stop the background refresh."""
+        self._stop_event.set()
+
+    def __call__(self, req):
+        """
+        Sign the request.
+
+        Parameters
+        ----------
+        req: requests.PreparedRequest
+            request to sign
+        Returns
+        -------
+        requests.PreparedRequest
+            the signed request
+        """
+        self._ensure_refresher()
+        credentials = self._credentials
+
+        req_date = self.get_request_date(req)
+        if req_date is None:
+            req.headers.pop("date", None)
+            now = datetime.datetime.now(datetime.timezone.utc)
+            req_date = now.date()
+            req.headers["x-amz-date"] = now.strftime(_AMZ_DATE_FORMAT)
+        signing_key = self._get_signing_key(
+            credentials.secret_access_key,
+            req_date.strftime(_SCOPE_DATE_FORMAT),
+        )
+
+        if getattr(req, "body", None) is not None:
+            if hasattr(req.body, "read"):
+                req.body = req.body.read()
+            self.encode_body(req)
+            content_hash = hashlib.sha256(req.body)
+        else:
+            content_hash = hashlib.sha256(b"")
+        req.headers["x-amz-content-sha256"] = content_hash.hexdigest()
+        if credentials.session_token:
+            req.headers[_SECURITY_TOKEN_HEADER] = credentials.session_token
+        else:
+            req.headers.pop(_SECURITY_TOKEN_HEADER, None)
+
+        cano_headers, signed_headers = self.get_canonical_headers(
+            req, self.include_hdrs
+        )
+        cano_req = self.get_canonical_request(req, cano_headers, signed_headers)
+        sig_string = self.get_sig_string(req, cano_req, signing_key.scope)
+        signature = hmac.new(
+            signing_key.key, sig_string.encode("utf-8"), hashlib.sha256
+        ).hexdigest()
+
+        req.headers["Authorization"] = (
+            "AWS4-HMAC-SHA256 "
+            + f"Credential={credentials.access_key_id}/{signing_key.scope}, "
+            + f"SignedHeaders={signed_headers}, "
+            + f"Signature={signature}"
+        )
+        return req
+
+    def _get_signing_key(self, secret_key: str, date: str) -> AWS4SigningKey:
+        """
+        Return the derived signing key, compute it only on a cache miss.
+
+        Parameters
+        ----------
+        secret_key: str
+            AWS secret access key
+        date: str
+            scope date, YYYYMMDD
+        Returns
+        -------
+        AWS4SigningKey
+            signing key for the scope
+        """
+        key = (secret_key, date, self.region, self.service)
+        signing_key = self._signing_keys.get(key)
+        if signing_key is not None:
+            return signing_key
+
+        signing_key = AWS4SigningKey(
+            secret_key, self.region, self.service, date, store_secret_key=False
+        )
+        with self._signing_keys_lock:
+            if len(self._signing_keys) >= _SIGNING_KEYS_CACHE_SIZE:
+                self._signing_keys.clear()
+            self._signing_keys[key] = signing_key
+        return signing_key
+
+    def _ensure_refresher(self):
+        """Start the refresh thread, again in a forked child process."""
+        if not self.refresh_interval or self._stop_event.is_set():
+            return
+        if self._refresher_pid == os.getpid():
+            return
+
+        self._refresher_pid = os.getpid()
+        self._refresher = threading.Thread(
+            target=self._refresh_loop,
+            name="osman-aws-credentials",
+            daemon=True,
+        )
+        self._refresher.start()
+
+    def _refresh_loop(self):
+        """Reload the credentials until close() is called."""
+        while not self._stop_event.wait(self.refresh_interval):
+            self.refresh()
+
+
+def build_aws_auth(config) -> RefreshingAWS4Auth:
+    """
+    Create the request signer for the 'awsauth' auth method.
+
+    Parameters
+    ----------
+    config: OsmanConfig
+        configuration with the aws_* attributes
+    Returns
+    -------
+    RefreshingAWS4Auth
+        request signer
+    """
+    if config.aws_credentials_provider == "env":
+        provider = EnvCredentialsProvider()
+    elif config.aws_credentials_provider == "file":
+        provider = FileCredentialsProvider(
+            config.aws_credentials_file, config.aws_profile
+        )
+    else:
+        provider = StaticCredentialsProvider(
+            AWSCredentials(
+                config.aws_access_key_id,
+                config.aws_secret_access_key,
+                config.aws_session_token,
+            )
+        )
+
+    refresh_interval = None
+    if config.aws_credentials_provider:
+        refresh_interval = config.aws_credentials_refresh_interval
+
+    return RefreshingAWS4Auth(
+        provider,
+        config.aws_region,
+        config.aws_service,
+        refresh_interval=refresh_interval,
+    )
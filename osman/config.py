@@ -4,7 +4,23 @@ import os
 import urllib
 from dataclasses import dataclass
 
+from osman.connection import (
+    COMPRESSION_POLICIES,
+    DEFAULT_COMPRESSION,
+    DEFAULT_COMPRESSION_LEVEL,
+    DEFAULT_COMPRESSION_THRESHOLD,
+    DEFAULT_LATENCY_EWMA_ALPHA,
+)
 from osman.environment import OSMAN_ENVIRONMENT_VARS
+from osman.resilience import DEFAULT_ADAPTIVE_TIMEOUT, DEFAULT_CIRCUIT_BREAKER
+from osman.transport import (
+    DEFAULT_PROFILES,
+    DEFAULT_RETRY_BACKOFF,
+    DEFAULT_RETRY_BACKOFF_MAX,
+    DEFAULT_RETRY_BUDGET,
+    PINNED_PROFILE_OPTIONS,
+    PROFILE_OPTIONS,
+)
 
 _HTTP_DEFAULT_PORT = 80
 _HTTPS_DEFAULT_PORT = 443
@@ -12,6 +28,43 @@ _HTTP_STR = "http"
 _HTTPS_STR = "https"
 _TRUE_STR = "True"
 
+DEFAULT_TIMEOUT = 10
+DEFAULT_MAX_RETRIES = 1
+
+# Connection selectors, see osman.selector
+HOST_SELECTORS = frozenset(("round_robin", "random", "least_latency"))
+
+
+def _parse_hosts(hosts, default_port: int) -> list:
+    """
+    Parse a list of OpenSearch hosts.
+
+    Parameters
+    ----------
+    hosts: Union[str, list]
+        list of "host" or "host:port" items, or the same items in a comma
+        separated string
+    default_port: int
+        port used for hosts without port
+    Returns
+    -------
+    list
+        list of {"host": host, "port": port} dictionaries
+    """
+    if isinstance(hosts, str):
+        hosts = hosts.split(",")
+
+    parsed_hosts = []
+    for host in hosts:
+        host = host.strip()
+        if not host:
+            continue
+        hostname, _, port = host.rpartition(":")
+        if not hostname or not port.isdigit():
+            hostname, port = host, default_port
+        parsed_hosts.append({"host": hostname, "port": int(port)})
+    return parsed_hosts
+
 
 @dataclass
 class OsmanConfig(object):
@@ -25,6 +78,9 @@ class OsmanConfig(object):
 
     OPENSEARCH_HOST: str
         OpenSearch instance host
+    OPENSEARCH_HOSTS: str
+        Comma separated list of OpenSearch hosts "host[:port],...", requests
+        are balanced among them. OPENSEARCH_HOST defaults to the first one.
     OPENSEARCH_PORT: int
         OpenSearch instance port. Default: HTTPS_DEFAULT_PORT (443)
     OPENSEARCH_SSL_ENABLED: bool
@@ -51,6 +107,8 @@ class OsmanConfig(object):
         Default: "us-east-1"
     AWS_SERVICE: str
         Default: "es"
+    AWS_SESSION_TOKEN: str
+        Session token of temporary AWS credentials. Default: None
 
     Instance Attributes
     -------------------
@@ -61,6 +119,11 @@ class OsmanConfig(object):
 
     opensearch_host: str
     opensearch_port: int
+    opensearch_hosts: list
+        list of {"host": host, "port": port}, contains opensearch_host when
+        OPENSEARCH_HOSTS is not set
+    host_urls: list
+        host_url for every host in opensearch_hosts ('http' auth method)
     opensearch_ssl_enabled: bool
     opensearch_user: str
     opensearch_secret: str
@@ -71,9 +134,93 @@ class OsmanConfig(object):
     aws_secret_access_key: str
     aws_region: str
     aws_service: str
+    aws_session_token: str
+
+    aws_credentials_provider: str
+        None -- use the static aws_* credentials above
+        "env" -- reload the credentials from the AWS_* environment variables
+        "file" -- reload the credentials from an AWS shared credentials file
+    aws_credentials_file: str
+        credentials file for the "file" provider, default ~/.aws/credentials
+    aws_profile: str
+        profile in the credentials file. Default: "default"
+    aws_credentials_refresh_interval: float
+        seconds between background credential reloads by the provider.
+        Default: 300
+
+    sniff_on_start: bool
+        discover the cluster nodes on start
+    sniff_on_connection_fail: bool
+        discover the cluster nodes when a request to a node fails
+    sniffer_timeout: float
+        seconds between periodic node discoveries, None disables it
+    host_selector: str
+        how a node is selected for a request when there are more nodes:
+        "round_robin" (default), "random" or "least_latency"
+    dead_timeout: float
+        seconds a failed node is excluded for, doubles with every
+        consecutive failure. Default: 60
+    latency_ewma_alpha: float
+        weight of the last request in the per node latency moving average
+        used by the "least_latency" selector. Default: 0.3
+    availability_zone: str
+        availability zone of the caller, nodes in the same zone are
+        preferred when set
+    host_zones: dict
+        availability zones of the configured hosts, {host: zone}
+    zone_attribute: str
+        node attribute with the availability zone of the sniffed nodes.
+        Default: "zone"
+
+    compression: dict
+        compression policy by operation class ("bulk", "search", "default"):
+        "off" -- no compression
+        "always" -- compress the request body, accept compressed responses
+        "auto" -- compress the request body larger than compression_threshold,
+            accept compressed responses
+        Default: {"bulk": "always", "search": "auto", "default": "auto"}
+    compression_threshold: int
+        minimal request body size in bytes compressed by "auto".
+        Default: 16384
+    compression_level: int
+        gzip level, 1 (fastest) to 9 (smallest). Default: 1
+
+    circuit_breaker: dict
+        circuit breaker per node and operation class, it rejects the requests
+        for reset_timeout seconds once the error rate of the requests in the
+        last window seconds reaches error_rate, see DEFAULT_CIRCUIT_BREAKER.
+        Default: None (disabled)
+    adaptive_timeout: dict
+        timeout per node and operation class derived from the latency
+        percentile of the recent requests, bounded by min and timeout, used
+        when the request has no explicit timeout, see
+        DEFAULT_ADAPTIVE_TIMEOUT. Default: None (disabled)
+    retry_backoff: float
+        upper bound of the random delay before the first retry in seconds,
+        it doubles with every retry, 0 disables it. Default: 0.1
+    retry_backoff_max: float
+        maximal delay before a retry in seconds. Default: 5
+    retry_budget: float
+        retries allowed per request over all requests of the client, None
+        disables the limit. Default: 0.2
+    profiles: dict
+        timeout and retries by request profile, the Osman methods use
+        "search", "bulk", "admin" and "long_running". A profile has the
+        options timeout, max_retries, retry_on_status, retry_on_timeout and
+        adaptive_timeout. The given ones take precedence, then timeout,
+        max_retries and retry_on_timeout above when they are set, then
+        DEFAULT_PROFILES. The retries disabled by
+        PINNED_PROFILE_OPTIONS (bulk timeouts, long running, scroll and
+        replayed requests) stay disabled. The missing ones are taken from
+        timeout, max_retries and retry_on_timeout.
+        Default: None (DEFAULT_PROFILES)
+    pool_maxsize: int
+        maximal number of kept connections per node, raise it above the
+        number of threads sending requests concurrently. Default: 10
     """
 
     OPENSEARCH_HOST = os.environ.get("OPENSEARCH_HOST", None)
+    OPENSEARCH_HOSTS = os.environ.get("OPENSEARCH_HOSTS", None)
     OPENSEARCH_PORT = int(
         os.environ.get("OPENSEARCH_PORT", _HTTPS_DEFAULT_PORT)
     )
@@ -96,12 +243,14 @@ class OsmanConfig(object):
 
     AWS_REGION = os.environ.get("AWS_REGION", "us-east-1")
     AWS_SERVICE = os.environ.get("AWS_SERVICE", "es")
+    AWS_SESSION_TOKEN = os.environ.get("AWS_SESSION_TOKEN", None)
 
     def __init__(
         self,
         host_url: str = None,
         opensearch_host: str = OPENSEARCH_HOST,
         opensearch_port: int = OPENSEARCH_PORT,
+        opensearch_hosts: list = OPENSEARCH_HOSTS,
         opensearch_ssl_enabled: bool = OPENSEARCH_SSL_ENABLED,
         opensearch_user: str = OPENSEARCH_USER,
         opensearch_secret: str = OPENSEARCH_SECRET,
@@ -110,9 +259,33 @@ class OsmanConfig(object):
         aws_secret_access_key: str = AWS_SECRET_ACCESS_KEY,
         aws_region: str = AWS_REGION,
         aws_service: str = AWS_SERVICE,
-        timeout: int = 10,
-        max_retries: int = 1,
-        retry_on_timeout: bool = False,
+        aws_session_token: str = AWS_SESSION_TOKEN,
+        aws_credentials_provider: str = None,
+        aws_credentials_file: str = None,
+        aws_profile: str = "default",
+        aws_credentials_refresh_interval: float = 300,
+        timeout: int = None,
+        max_retries: int = None,
+        retry_on_timeout: bool = None,
+        sniff_on_start: bool = False,
+        sniff_on_connection_fail: bool = False,
+        sniffer_timeout: float = None,
+        host_selector: str = "round_robin",
+        dead_timeout: float = 60,
+        latency_ewma_alpha: float = DEFAULT_LATENCY_EWMA_ALPHA,
+        availability_zone: str = None,
+        host_zones: dict = None,
+        zone_attribute: str = "zone",
+        compression: dict = None,
+        compression_threshold: int = DEFAULT_COMPRESSION_THRESHOLD,
+        compression_level: int = DEFAULT_COMPRESSION_LEVEL,
+        circuit_breaker: dict = None,
+        adaptive_timeout: dict = None,
+        retry_backoff: float = DEFAULT_RETRY_BACKOFF,
+        retry_backoff_max: float = DEFAULT_RETRY_BACKOFF_MAX,
+        retry_budget: float = DEFAULT_RETRY_BUDGET,
+        profiles: dict = None,
+        pool_maxsize: int = 10,
     ):
         """
         Init OsmanConfig.
@@ -131,6 +304,8 @@ class OsmanConfig(object):
             init
         opensearch_port: int
             init
+        opensearch_hosts: list
+            init
         opensearch_ssl_enabled: bool
             init
         opensearch_user: str
@@ -149,16 +324,136 @@ class OsmanConfig(object):
             init
         aws_service: str
             init
+        aws_session_token: str
+            init
+        aws_credentials_provider: str
+            init
+        aws_credentials_file: str
+            init
+        aws_profile: str
+            init
+        aws_credentials_refresh_interval: float
+            init
         timeout: int
             init
         max_retries: int
             init
         retry_on_timeout: bool
             init
+        sniff_on_start: bool
+            init
+        sniff_on_connection_fail: bool
+            init
+        sniffer_timeout: float
+            init
+        host_selector: str
+            init
+        dead_timeout: float
+            init
+        latency_ewma_alpha: float
+            init
+        availability_zone: str
+            init
+        host_zones: dict
+            init
+        zone_attribute: str
+            init
+        compression: dict
+            init
+        compression_threshold: int
+            init
+        compression_level: int
+            init
+        circuit_breaker: dict
+            init
+        adaptive_timeout: dict
+            init
+        retry_backoff: float
+            init
+        retry_backoff_max: float
+            init
+        retry_budget: float
+            init
+        profiles: dict
+            init
+        pool_maxsize: int
+            init
         """
-        self.timeout = timeout
-        self.max_retries = max_retries
-        self.retry_on_timeout = retry_on_timeout
+        # The options set explicitly replace those of DEFAULT_PROFILES, except
+        # the pinned ones
+        explicit = {
+            option
+            for option, value in (
+                ("timeout", timeout),
+                ("max_retries", max_retries),
+                ("retry_on_timeout", retry_on_timeout),
+            )
+            if value is not None
+        }
+        self.timeout = DEFAULT_TIMEOUT if timeout is None else timeout
+        assert pool_maxsize > 0
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = (
+            DEFAULT_MAX_RETRIES if max_retries is None else max_retries
+        )
+        self.retry_on_timeout = bool(retry_on_timeout)
+
+        assert host_selector in HOST_SELECTORS, (
+            "host_selector wrong, host_selector = '%s'" % host_selector
+        )
+        self.sniff_on_start = sniff_on_start
+        self.sniff_on_connection_fail = sniff_on_connection_fail
+        self.sniffer_timeout = sniffer_timeout
+        self.host_selector = host_selector
+        self.dead_timeout = dead_timeout
+
+        assert 0 < latency_ewma_alpha <= 1
+        self.latency_ewma_alpha = latency_ewma_alpha
+        self.availability_zone = availability_zone
+        self.host_zones = host_zones or {}
+        self.zone_attribute = zone_attribute
+
+        self.compression = {**DEFAULT_COMPRESSION, **(compression or {})}
+        assert set(self.compression.values()) <= COMPRESSION_POLICIES, (
+            "compression policy wrong, compression = '%s'" % self.compression
+        )
+        assert 1 <= compression_level <= 9
+        self.compression_threshold = compression_threshold
+        self.compression_level = compression_level
+
+        self.circuit_breaker = None
+        if circuit_breaker is not None:
+            self.circuit_breaker = {
+                **DEFAULT_CIRCUIT_BREAKER,
+                **circuit_breaker,
+            }
+            assert 0 < self.circuit_breaker["error_rate"] <= 1
+        self.adaptive_timeout = None
+        if adaptive_timeout is not None:
+            self.adaptive_timeout = {
+                **DEFAULT_ADAPTIVE_TIMEOUT,
+                **adaptive_timeout,
+            }
+            assert 0 <= self.adaptive_timeout["percentile"] <= 100
+        assert retry_budget is None or retry_budget >= 0
+        self.retry_backoff = retry_backoff
+        self.retry_backoff_max = retry_backoff_max
+        self.retry_budget = retry_budget
+
+        profiles = profiles or {}
+        self.profiles = {}
+        for name in {**DEFAULT_PROFILES, **profiles}:
+            defaults = {
+                option: value
+                for option, value in DEFAULT_PROFILES.get(name, {}).items()
+                if option not in explicit
+                or option in PINNED_PROFILE_OPTIONS.get(name, ())
+            }
+            self.profiles[name] = {**defaults, **profiles.get(name, {})}
+        for name, profile in self.profiles.items():
+            assert (
+                set(profile) <= PROFILE_OPTIONS
+            ), "profile options wrong, %s = '%s'" % (name, profile)
 
         # non empty host_url takes precedence over auth_method
         if host_url:
@@ -183,6 +478,10 @@ class OsmanConfig(object):
 
             self.opensearch_user = parsed_url.username
             self.opensearch_secret = parsed_url.password
+            self.opensearch_hosts = [
+                {"host": self.opensearch_host, "port": self.opensearch_port}
+            ]
+            self.host_urls = [host_url]
             # All other parameters are ignored
             return
 
@@ -190,11 +489,24 @@ class OsmanConfig(object):
             "auth_method wrong or missing, auth_method = '%s'" % auth_method
         )
 
-        assert opensearch_host
         assert opensearch_port
         assert isinstance(opensearch_port, int)
         assert isinstance(opensearch_ssl_enabled, bool)
 
+        if opensearch_hosts:
+            self.opensearch_hosts = _parse_hosts(
+                opensearch_hosts, opensearch_port
+            )
+            assert self.opensearch_hosts
+            if not opensearch_host:
+                opensearch_host = self.opensearch_hosts[0]["host"]
+                opensearch_port = self.opensearch_hosts[0]["port"]
+        else:
+            assert opensearch_host
+            self.opensearch_hosts = [
+                {"host": opensearch_host, "port": opensearch_port}
+            ]
+
         self.opensearch_host = opensearch_host
         self.opensearch_port = opensearch_port
         self.opensearch_ssl_enabled = opensearch_ssl_enabled
@@ -208,23 +520,23 @@ class OsmanConfig(object):
             )
 
             os_scheme = _HTTPS_STR if opensearch_ssl_enabled else _HTTP_STR
-            if not opensearch_user:
-                self.host_url = (
-                    f"{os_scheme}://{opensearch_host}:{opensearch_port}"
-                )
-                return
+            os_creds = ""
+            if opensearch_user:
+                assert opensearch_secret
+                os_creds_user = urllib.parse.quote_plus(f"{opensearch_user}")
+                os_creds_pass = urllib.parse.quote_plus(f"{opensearch_secret}")
+                os_creds = f"{os_creds_user}:{os_creds_pass}@"
 
-            assert opensearch_secret
-            os_creds_user = urllib.parse.quote_plus(f"{opensearch_user}")
-            os_creds_pass = urllib.parse.quote_plus(f"{opensearch_secret}")
+                self.opensearch_user = opensearch_user
+                self.opensearch_secret = opensearch_secret
 
             self.host_url = (
-                f"{os_scheme}://{os_creds_user}:{os_creds_pass}"
-                + f"@{opensearch_host}:{opensearch_port}"
+                f"{os_scheme}://{os_creds}{opensearch_host}:{opensearch_port}"
             )
-
-            self.opensearch_user = opensearch_user
-            self.opensearch_secret = opensearch_secret
+            self.host_urls = [
+                f"{os_scheme}://{os_creds}{host['host']}:{host['port']}"
+                for host in self.opensearch_hosts
+            ]
             return
 
         # AWS auth method
@@ -235,9 +547,16 @@ class OsmanConfig(object):
             opensearch_port,
         )
         self.host_url = ""
+        self.host_urls = []
 
-        assert aws_access_key_id
-        assert aws_secret_access_key
+        assert aws_credentials_provider in {None, "env", "file"}, (
+            "aws_credentials_provider wrong, aws_credentials_provider = '%s'"
+            % aws_credentials_provider
+        )
+        # Providers read the credentials themselves
+        if aws_credentials_provider is None:
+            assert aws_access_key_id
+            assert aws_secret_access_key
         assert aws_region
         assert aws_service
 
@@ -245,6 +564,11 @@ class OsmanConfig(object):
         self.aws_secret_access_key = aws_secret_access_key
         self.aws_region = aws_region
         self.aws_service = aws_service
+        self.aws_session_token = aws_session_token
+        self.aws_credentials_provider = aws_credentials_provider
+        self.aws_credentials_file = aws_credentials_file
+        self.aws_profile = aws_profile
+        self.aws_credentials_refresh_interval = aws_credentials_refresh_interval
 
     def _reload_defaults_from_env(self):
         """
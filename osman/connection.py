@@ -0,0 +1,330 @@
+"""OpenSearch connection used by Osman."""
+import gzip
+import time
+
+from opensearchpy import RequestsHttpConnection
+from opensearchpy.exceptions import ConnectionError as OpenSearchConnectionError
+from opensearchpy.exceptions import ConnectionTimeout, TransportError
+
+from osman.resilience import (
+    DEFAULT_ADAPTIVE_TIMEOUT,
+    DEFAULT_CIRCUIT_BREAKER,
+    CircuitBreaker,
+    CircuitBreakerOpenError,
+    LatencyWindow,
+)
+
+# Weight of the last request in the latency moving average
+DEFAULT_LATENCY_EWMA_ALPHA = 0.3
+
+# Compression policies:
+# "off" -- neither the request nor the response is compressed
+# "always" -- the request body is compressed, compressed response accepted
+# "auto" -- the request body is compressed when larger than the threshold,
+#     compressed response accepted
+COMPRESSION_POLICIES = frozenset(("off", "always", "auto"))
+DEFAULT_COMPRESSION = {"bulk": "always", "search": "auto", "default": "auto"}
+DEFAULT_COMPRESSION_THRESHOLD = 16384
+# Level 1 is several times cheaper than the gzip default (9) and compresses
+# bulk json only slightly worse, see benchmarks/bench_compression.py
+DEFAULT_COMPRESSION_LEVEL = 1
+
+# Path components identifying the operation class of a request
+_BULK_ENDPOINTS = frozenset(("_bulk",))
+_SEARCH_ENDPOINTS = frozenset(("_search", "_msearch", "_count", "_mget"))
+
+
+def operation_class(url: str) -> str:
+    """
+    Return the operation class of a request.
+
+    Parameters
+    ----------
+    url: str
+        request path, optionally with the query string
+    Returns
+    -------
+    str
+        "bulk", "search" or "default"
+    """
+    parts = set(url.split("?", 1)[0].split("/"))
+    if parts & _BULK_ENDPOINTS:
+        return "bulk"
+    if parts & _SEARCH_ENDPOINTS:
+        return "search"
+    return "default"
+
+
+def is_failure(error: TransportError) -> bool:
+    """
+    Check whether the error counts as a failure of the node.
+
+    Parameters
+    ----------
+    error: TransportError
+        error raised by the request
+    Returns
+    -------
+    bool
+        True for connection errors, timeouts, 429 and 5xx responses
+    """
+    if isinstance(error, OpenSearchConnectionError):
+        return True
+    status = error.status_code
+    return isinstance(status, int) and (status == 429 or status >= 500)
+
+
+class OsmanConnection(RequestsHttpConnection):
+    """
+    RequestsHttpConnection tracking the response latency of its node.
+
+    Attributes
+    ----------
+    latency: float
+        exponentially weighted moving average (EWMA) of the request duration
+        in seconds, None until the first request is done
+    zone: str
+        availability zone of the node or None when unknown
+    compression: dict
+        compression policy by operation class, see COMPRESSION_POLICIES
+    breakers: dict
+        CircuitBreaker by operation class, empty when disabled
+    latencies: dict
+        LatencyWindow of the successful requests by operation class, empty
+        when the adaptive timeout is disabled
+    """
+
+    def __init__(
+        self,
+        *args,
+        zone: str = None,
+        host_zones: dict = None,
+        latency_ewma_alpha: float = DEFAULT_LATENCY_EWMA_ALPHA,
+        compression: dict = None,
+        compression_threshold: int = DEFAULT_COMPRESSION_THRESHOLD,
+        compression_level: int = DEFAULT_COMPRESSION_LEVEL,
+        circuit_breaker: dict = None,
+        adaptive_timeout: dict = None,
+        **kwargs,
+    ):
+        """
+        Init OsmanConnection.
+
+        Parameters
+        ----------
+        args: list
+            positional arguments of RequestsHttpConnection
+        zone: str
+            availability zone of the node, set for the sniffed nodes
+        host_zones: dict
+            availability zones by host name, used when zone is None
+        latency_ewma_alpha: float
+            weight of the last request in the latency average, (0, 1]
+        compression: dict
+            compression policy by operation class, DEFAULT_COMPRESSION
+            is used for the missing classes
+        compression_threshold: int
+            minimal body size in bytes compressed by the "auto" policy
+        compression_level: int
+            gzip compression level, 1 (fastest) to 9 (smallest)
+        circuit_breaker: dict
+            options of the circuit breakers, see DEFAULT_CIRCUIT_BREAKER,
+            None disables them
+        adaptive_timeout: dict
+            options of the adaptive timeout, see DEFAULT_ADAPTIVE_TIMEOUT,
+            None disables it
+        kwargs: dict
+            keyword arguments of RequestsHttpConnection
+        """
+        # The compression is decided per request in perform_request()
+        kwargs["http_compress"] = False
+        super().__init__(*args, **kwargs)
+        self.compression = {**DEFAULT_COMPRESSION, **(compression or {})}
+        self.compression_threshold = compression_threshold
+        self.compression_level = compression_level
+        self.latency = None
+        self.latency_ewma_alpha = latency_ewma_alpha
+        self.zone = zone or (host_zones or {}).get(self.hostname)
+
+        operations = ("bulk", "search", "default")
+        self.breakers = {}
+        if circuit_breaker is not None:
+            options = {**DEFAULT_CIRCUIT_BREAKER, **circuit_breaker}
+            self.breakers = {op: CircuitBreaker(**options) for op in operations}
+        self.adaptive_timeout = None
+        self.latencies = {}
+        if adaptive_timeout is not None:
+            self.adaptive_timeout = {
+                **DEFAULT_ADAPTIVE_TIMEOUT,
+                **adaptive_timeout,
+            }
+            samples = self.adaptive_timeout["samples"]
+            self.latencies = {op: LatencyWindow(samples) for op in operations}
+
+    def perform_request(  # noqa: WPS211
+        self,
+        method: str,
+        url: str,
+        params: dict = None,
+        body: bytes = None,
+        timeout: float = None,
+        allow_redirects: bool = True,
+        ignore: tuple = (),
+        headers: dict = None,
+    ):
+        """
+        Perform the request and record its duration.
+
+        The request body is compressed and the compressed response accepted
+        according to the compression policy of the request's operation
+        class. Timed out requests are recorded too, a node which stopped
+        responding should not look fast.
+
+        When the circuit breaker of the operation class is open the request
+        fails fast with CircuitBreakerOpenError. Without an explicit timeout
+        the adaptive timeout of the operation class is used.
+
+        For the parameters see RequestsHttpConnection.perform_request().
+
+        Parameters
+        ----------
+        method: str
+            HTTP method
+        url: str
+            request path
+        params: dict
+            query parameters
+        body: bytes
+            request body
+        timeout: float
+            request timeout in seconds
+        allow_redirects: bool
+            follow redirects
+        ignore: tuple
+            HTTP status codes which don't raise an exception
+        headers: dict
+            additional request headers
+        Returns
+        -------
+        tuple
+            status code, response headers and raw response data
+        """
+        operation = operation_class(url)
+        breaker = self.breakers.get(operation)
+        if breaker is not None and not breaker.allow():
+            raise CircuitBreakerOpenError(
+                "N/A",
+                f"Circuit breaker of {self.host} open for {operation} requests",
+                None,
+            )
+        if timeout is None:
+            timeout = self.request_timeout(operation)
+
+        headers = dict(headers or {})
+        body = self._compress(operation, body, headers)
+
+        start = time.monotonic()
+        try:
+            response = super().perform_request(
+                method,
+                url,
+                params=params,
+                body=body,
+                timeout=timeout,
+                allow_redirects=allow_redirects,
+                ignore=ignore,
+                headers=headers,
+            )
+        except TransportError as error:
+            if isinstance(error, ConnectionTimeout):
+                self._record_latency(time.monotonic() - start)
+            if breaker is not None:
+                breaker.record(not is_failure(error))
+            raise
+        except Exception:
+            # Release a half open breaker waiting for its probe
+            if breaker is not None:
+                breaker.record(False)
+            raise
+
+        duration = time.monotonic() - start
+        self._record_latency(duration)
+        if breaker is not None:
+            breaker.record(True)
+        if self.latencies:
+            self.latencies[operation].add(duration)
+        return response
+
+    def request_timeout(self, operation: str, timeout: float = None) -> float:
+        """
+        Return the timeout of a request, adaptive when enabled.
+
+        The adaptive timeout is derived from the recent latencies of the
+        operation class and bounded by the adaptive minimum and timeout.
+
+        Parameters
+        ----------
+        operation: str
+            operation class of the request
+        timeout: float
+            upper bound of the timeout, the connection timeout when None
+        Returns
+        -------
+        float
+            timeout in seconds
+        """
+        timeout = timeout or self.timeout
+        if not self.latencies:
+            return timeout
+        latencies = self.latencies[operation]
+        if len(latencies) < self.adaptive_timeout["samples"]:
+            return timeout
+
+        options = self.adaptive_timeout
+        adaptive = latencies.percentile(options["percentile"])
+        adaptive *= options["multiplier"]
+        return min(timeout, max(options["min"], adaptive))
+
+    def _compress(self, operation: str, body: bytes, headers: dict) -> bytes:
+        """
+        Apply the compression policy of the operation to the request.
+
+        Parameters
+        ----------
+        operation: str
+            operation class of the request
+        body: bytes
+            request body or None
+        headers: dict
+            request headers, updated in place
+        Returns
+        -------
+        bytes
+            request body, compressed or not
+        """
+        policy = self.compression.get(operation, "auto")
+        if policy == "off":
+            return body
+
+        headers["accept-encoding"] = "gzip,deflate"
+        if not body:
+            return body
+        if policy == "auto" and len(body) < self.compression_threshold:
+            return body
+
+        headers["content-encoding"] = "gzip"
+        return gzip.compress(body, compresslevel=self.compression_level)
+
+    def _record_latency(self, duration: float):
+        """
+        Update the latency moving average.
+
+        Parameters
+        ----------
+        duration: float
+            duration of the request in seconds
+        """
+        if self.latency is None:
+            self.latency = duration
+        else:
+            self.latency += self.latency_ewma_alpha * (duration - self.latency)
@@ -0,0 +1,221 @@
+"""
+Conversion between OpenSearch documents and columnar data.
+
+pyarrow and pandas are optional dependencies, install them by
+pip install osmanager[dataframe]
+"""
+import json
+
+DEFAULT_BATCH_SIZE = 10000
+OUTPUTS = ("columns", "arrow", "pandas")
+
+
+def _import_arrow():
+    """
+    Import pyarrow.
+
+    Returns
+    -------
+    module
+        pyarrow with its parquet module loaded
+    Raises
+    ------
+    ImportError
+        with the installation hint when pyarrow or pandas is missing
+    """
+    try:
+        import pandas  # noqa: F401
+        import pyarrow
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as exc:
+        raise ImportError(
+            "pyarrow and pandas are required for DataFrame and Arrow data, "
+            + "install them by: pip install osmanager[dataframe]"
+        ) from exc
+    return pyarrow
+
+
+def record_batches(data, batch_size: int = DEFAULT_BATCH_SIZE):
+    """
+    Yield Arrow record batches of the data.
+
+    A Parquet file is read batch by batch, it is never loaded whole.
+
+    Parameters
+    ----------
+    data: Union[pandas.DataFrame, pyarrow.Table, pyarrow.RecordBatch, str]
+        the data or path of a Parquet file
+    batch_size: int
+        maximal number of rows in a batch
+    Yields
+    ------
+    pyarrow.RecordBatch
+        batch of rows
+    Raises
+    ------
+    TypeError
+        for an unsupported type of data
+    """
+    pa = _import_arrow()
+    if isinstance(data, (str, bytes)) or hasattr(data, "__fspath__"):
+        yield from pa.parquet.ParquetFile(data).iter_batches(batch_size)
+        return
+    if isinstance(data, pa.RecordBatch):
+        data = pa.Table.from_batches([data])
+    elif not isinstance(data, pa.Table):
+        if not hasattr(data, "to_dict") or not hasattr(data, "columns"):
+            raise TypeError(f"Unsupported data type {type(data).__name__}")
+        data = pa.Table.from_pandas(data, preserve_index=False)
+    yield from data.to_batches(max_chunksize=batch_size)
+
+
+def bulk_ndjson(batches, index_name: str, id_key: str = None):
+    """
+    Serialize record batches to bulk index actions.
+
+    The documents of a batch are serialized column-wise by the pandas JSON
+    writer, no dictionary is created per row. NaN and missing values are
+    serialized as null, dates in ISO format.
+
+    Parameters
+    ----------
+    batches: Iterable
+        pyarrow.RecordBatch instances
+    index_name: str
+        name of the index
+    id_key: str
+        column used as the document id, ids are generated by OpenSearch
+        when None
+    Yields
+    ------
+    tuple
+        JSON strings of the action and of the document
+    """
+    action_prefix = '{"index":{"_index":%s' % json.dumps(index_name)
+    action_no_id = action_prefix + "}}"
+    for batch in batches:
+        if not batch.num_rows:
+            continue
+        lines = batch.to_pandas().to_json(
+            orient="records", lines=True, date_format="iso", date_unit="ms"
+        )
+        documents = lines.split("\n")
+        if id_key is None:
+            for document in documents[: batch.num_rows]:
+                yield action_no_id, document
+            continue
+
+        ids = batch.column(id_key).to_pylist()
+        for doc_id, document in zip(ids, documents):
+            action = '%s,"_id":%s}}' % (action_prefix, json.dumps(str(doc_id)))
+            yield action, document
+
+
+def raw_action(action: tuple) -> tuple:
+    """
+    Return the serialized action as is.
+
+    An expand_action_callback of the opensearchpy bulk helpers, the
+    serializer passes strings through unchanged.
+
+    Parameters
+    ----------
+    action: tuple
+        JSON strings of the action and of the document
+    Returns
+    -------
+    tuple
+        the same action
+    """
+    return action
+
+
+def _source_getter(field: str):
+    """
+    Return a function reading a field of a _source.
+
+    Parameters
+    ----------
+    field: str
+        name of the field, a dotted path for object fields
+    Returns
+    -------
+    Callable
+        function returning the value of the field of a _source or None
+    """
+    path = field.split(".")
+    if len(path) == 1:
+        return lambda source: source.get(field)
+
+    def get(source: dict):  # noqa: WPS430
+        value = source.get(field, source)
+        if value is not source:
+            return value
+        for key in path:
+            if not isinstance(value, dict):
+                return None
+            value = value.get(key)
+        return value
+
+    return get
+
+
+def hits_columns(hits: list, fields: list = None) -> dict:
+    """
+    Convert search hits to column arrays.
+
+    Parameters
+    ----------
+    hits: list
+        hits of a search response
+    fields: list
+        fields of the _source, dotted paths for object fields, all top level
+        fields in the order of their first occurrence when None
+    Returns
+    -------
+    dict
+        {"_id": [...], "_score": [...], field: [...]}, None for a missing
+        value
+    """
+    if fields is None:
+        fields = list(
+            dict.fromkeys(key for hit in hits for key in hit.get("_source", ()))
+        )
+    columns = {
+        "_id": [hit.get("_id") for hit in hits],
+        "_score": [hit.get("_score") for hit in hits],
+    }
+    sources = [hit.get("_source", {}) for hit in hits]
+    for field in fields:
+        get = _source_getter(field)
+        columns[field] = [get(source) for source in sources]
+    return columns
+
+
+def convert_columns(columns: dict, output: str):
+    """
+    Convert column arrays to the output format.
+
+    Parameters
+    ----------
+    columns: dict
+        column arrays by name
+    output: str
+        "columns" for the arrays, "arrow" for a pyarrow.Table or "pandas"
+        for a pandas.DataFrame
+    Returns
+    -------
+    Union[dict, pyarrow.Table, pandas.DataFrame]
+        the columns in the output format
+    Raises
+    ------
+    ImportError
+        when pyarrow or pandas is missing for the "arrow" and "pandas" output
+    """
+    assert output in OUTPUTS, f"Output must be one of {OUTPUTS}"
+    if output == "columns":
+        return columns
+    table = _import_arrow().table(columns)
+    if output == "arrow":
+        return table
+    return table.to_pandas()
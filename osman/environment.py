@@ -1,6 +1,7 @@
 """Environment variables used by OsmanConfig."""
 OSMAN_ENVIRONMENT_VARS = [
     "OPENSEARCH_HOST",
+    "OPENSEARCH_HOSTS",
     "OPENSEARCH_PORT",
     "OPENSEARCH_SSL_ENABLED",
     "OPENSEARCH_USER",
@@ -10,4 +11,5 @@ OSMAN_ENVIRONMENT_VARS = [
     "AWS_SECRET_ACCESS_KEY",
     "AWS_REGION",
     "AWS_SERVICE",
+    "AWS_SESSION_TOKEN",
 ]
@@ -0,0 +1,195 @@
+"""Local store of document fingerprints for the incremental sync."""
+import hashlib
+import json
+import sqlite3
+import threading
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fingerprints (
+    index_name TEXT NOT NULL,
+    doc_id TEXT NOT NULL,
+    hash BLOB NOT NULL,
+    generation INTEGER NOT NULL,
+    PRIMARY KEY (index_name, doc_id)
+) WITHOUT ROWID
+"""
+
+
+def fingerprint(document: dict) -> bytes:
+    """
+    Return the content hash of a document.
+
+    Parameters
+    ----------
+    document: dict
+        the document, its keys order doesn't matter
+    Returns
+    -------
+    bytes
+        16 bytes BLAKE2b digest of the canonical JSON of the document
+    """
+    canonical = json.dumps(
+        document, sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.blake2b(canonical.encode(), digest_size=16).digest()
+
+
+class FingerprintStore(object):
+    """
+    SQLite file mapping document ids to the hashes of their content.
+
+    A sync run compares the documents with the stored hashes in a single
+    transaction. The run is committed only after the changes were indexed,
+    a failed run is rolled back so its documents are sent again by the next
+    run. The documents not seen by a run are reported by missing_ids().
+    """
+
+    def __init__(self, path: str):
+        """
+        Init FingerprintStore.
+
+        Parameters
+        ----------
+        path: str
+            path of the SQLite file, created when missing
+        """
+        self.path = path
+        # The documents may be consumed by a bulk helper thread
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(_SCHEMA)
+        self._connection.commit()
+        self._lock = threading.Lock()
+        self._generations = {}
+
+    def __enter__(self):
+        """
+        Enter the context.
+
+        Returns
+        -------
+        FingerprintStore
+            the store
+        """
+        return self
+
+    def __exit__(self, *_):
+        """Close the store."""
+        self.close()
+
+    def close(self):
+        """Roll back the uncommitted run and close the file."""
+        self._connection.rollback()
+        self._connection.close()
+
+    def changed_documents(self, index_name: str, documents, id_key: str):
+        """
+        Yield the new and changed documents, record the seen ones.
+
+        Parameters
+        ----------
+        index_name: str
+            name of the index
+        documents: Iterable
+            all documents of the index
+        id_key: str
+            key of the document id
+        Yields
+        ------
+        dict
+            document whose hash differs from the stored one
+        """
+        generation = self._next_generation(index_name)
+        select = (
+            "SELECT hash FROM fingerprints WHERE index_name = ? AND doc_id = ?"
+        )
+        upsert = (
+            "INSERT INTO fingerprints (index_name, doc_id, hash, generation) "
+            + "VALUES (?, ?, ?, ?) ON CONFLICT (index_name, doc_id) "
+            + "DO UPDATE SET hash = excluded.hash, "
+            + "generation = excluded.generation"
+        )
+        for document in documents:
+            doc_id = str(document[id_key])
+            doc_hash = fingerprint(document)
+            with self._lock:
+                row = self._connection.execute(
+                    select, (index_name, doc_id)
+                ).fetchone()
+                self._connection.execute(
+                    upsert, (index_name, doc_id, doc_hash, generation)
+                )
+            if row is None or row[0] != doc_hash:
+                yield document
+
+    def missing_ids(self, index_name: str) -> list:
+        """
+        Return the ids of the stored documents not seen by the current run.
+
+        Parameters
+        ----------
+        index_name: str
+            name of the index
+        Returns
+        -------
+        list
+            document ids
+        """
+        generation = self._generations.get(index_name)
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT doc_id FROM fingerprints "
+                + "WHERE index_name = ? AND generation != ?",
+                (index_name, generation),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def remove(self, index_name: str, ids: list):
+        """
+        Remove documents from the store.
+
+        Parameters
+        ----------
+        index_name: str
+            name of the index
+        ids: list
+            document ids
+        """
+        with self._lock:
+            self._connection.executemany(
+                "DELETE FROM fingerprints WHERE index_name = ? AND doc_id = ?",
+                ((index_name, doc_id) for doc_id in ids),
+            )
+
+    def commit(self):
+        """Commit the run."""
+        with self._lock:
+            self._connection.commit()
+        self._generations.clear()
+
+    def rollback(self):
+        """Roll back the run, its documents are compared again next time."""
+        with self._lock:
+            self._connection.rollback()
+        self._generations.clear()
+
+    def _next_generation(self, index_name: str) -> int:
+        """
+        Start a run of the index.
+
+        Parameters
+        ----------
+        index_name: str
+            name of the index
+        Returns
+        -------
+        int
+            generation marking the documents seen by the run
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT MAX(generation) FROM fingerprints WHERE index_name = ?",
+                (index_name,),
+            ).fetchone()
+        generation = (row[0] or 0) + 1
+        self._generations[index_name] = generation
+        return generation
@@ -0,0 +1,432 @@
+"""Migration of indices and stored scripts between clusters."""
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from opensearchpy import OpenSearch, exceptions, helpers
+
+from osman.config import OsmanConfig
+from osman.fingerprint import fingerprint
+from osman.osman import DEFAULT_BULK_CHUNK_SIZE, DEFAULT_COPY_SLICES, Osman
+from osman.transport import ADMIN_PROFILE, SCROLL_PROFILE, SEARCH_PROFILE
+
+# Index settings generated by the cluster, they can't be set on creation
+_GENERATED_SETTINGS = (
+    "creation_date",
+    "history",
+    "provided_name",
+    "resize",
+    "routing",
+    "uuid",
+    "verified_before_close",
+    "version",
+)
+
+# Checksums are sums of the 128 bit document fingerprints
+_CHECKSUM_MODULUS = 2**128
+
+
+def _index_settings(settings: dict) -> dict:
+    """
+    Return the settings of an index which can be set on another cluster.
+
+    Parameters
+    ----------
+    settings: dict
+        settings of the indices.get response
+    Returns
+    -------
+    dict
+        index settings without the generated ones
+    """
+    index_settings = settings.get("index", {})
+    return {
+        name: value
+        for name, value in index_settings.items()
+        if name not in _GENERATED_SETTINGS
+    }
+
+
+def checksum(
+    client: OpenSearch,
+    index_name: str,
+    slices: int = DEFAULT_COPY_SLICES,
+    chunk_size: int = DEFAULT_BULK_CHUNK_SIZE,
+) -> str:
+    """
+    Compute the checksum of the documents of an index.
+
+    The checksum is the sum of the fingerprints of the ids and sources of
+    all documents, it doesn't depend on the order of the documents nor on the
+    number of shards. The slices are scrolled in parallel.
+
+    Parameters
+    ----------
+    client: OpenSearch
+        client of the cluster
+    index_name: str
+        name of the index
+    slices: int
+        number of slices scrolled in parallel
+    chunk_size: int
+        number of documents in a scroll page
+    Returns
+    -------
+    str
+        hexadecimal checksum
+    """
+
+    def slice_checksum(slice_id: int) -> int:  # noqa: WPS430
+        body = {"query": {"match_all": {}}}
+        if slices > 1:
+            body["slice"] = {"id": slice_id, "max": slices}
+        total = 0
+        for hit in helpers.scan(
+            client,
+            query=body,
+            index=index_name,
+            size=chunk_size,
+            params=SCROLL_PROFILE,
+            scroll_kwargs={"params": SCROLL_PROFILE},
+        ):
+            document = {"_id": hit["_id"], "_source": hit.get("_source")}
+            total += int.from_bytes(fingerprint(document), "big")
+        return total
+
+    with ThreadPoolExecutor(max_workers=slices) as executor:
+        total = sum(executor.map(slice_checksum, range(slices)))
+    return f"{total % _CHECKSUM_MODULUS:032x}"
+
+
+class _MigrationState(object):
+    """JSON file recording the copied slices of the indices."""
+
+    def __init__(self, path: str = None):
+        """
+        Init _MigrationState.
+
+        Parameters
+        ----------
+        path: str
+            path of the file, the state is kept in memory only when None
+        """
+        self.path = path
+        self.indices = {}
+        self._lock = threading.Lock()
+        if path is not None and os.path.exists(path):
+            with open(path, mode="r", encoding="utf-8") as state_file:
+                self.indices = json.load(state_file)
+
+    def index(self, index_name: str) -> dict:
+        """
+        Return the state of an index.
+
+        Parameters
+        ----------
+        index_name: str
+            name of the index
+        Returns
+        -------
+        dict
+            {"slices": int, "copied": [slice ids], "done": bool} or empty
+        """
+        return self.indices.get(index_name, {})
+
+    def update(self, index_name: str, **state):
+        """
+        Update and save the state of an index.
+
+        Parameters
+        ----------
+        index_name: str
+            name of the index
+        state: dict
+            items of the state to update
+        """
+        with self._lock:
+            self.indices.setdefault(index_name, {}).update(state)
+            self._save()
+
+    def add_slice(self, index_name: str, slice_id: int):
+        """
+        Record a copied slice.
+
+        Parameters
+        ----------
+        index_name: str
+            name of the index
+        slice_id: int
+            id of the slice
+        """
+        with self._lock:
+            self.indices[index_name]["copied"].append(slice_id)
+            self._save()
+
+    def _save(self):
+        """Write the state file atomically."""
+        if self.path is None:
+            return
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, mode="w", encoding="utf-8") as state_file:
+            json.dump(self.indices, state_file)
+        os.replace(temporary_path, self.path)
+
+
+def _copy_scripts(source: Osman, target: Osman) -> list:
+    """
+    Copy the stored scripts and search templates.
+
+    Parameters
+    ----------
+    source: Osman
+        source cluster
+    target: Osman
+        target cluster
+    Returns
+    -------
+    list
+        ids of the copied scripts
+    """
+    state = source.client.cluster.state(
+        metric="metadata",
+        filter_path="metadata.stored_scripts",
+        params=ADMIN_PROFILE,
+    )
+    scripts = state.get("metadata", {}).get("stored_scripts", {})
+    for script_id, script in scripts.items():
+        target.client.put_script(
+            script_id, {"script": script}, params=ADMIN_PROFILE
+        )
+    return list(scripts)
+
+
+def _migrate_index(  # noqa: WPS211
+    source: Osman,
+    target: Osman,
+    index_name: str,
+    index: dict,
+    state: _MigrationState,
+    slices: int,
+    chunk_size: int,
+    verify: bool,
+) -> dict:
+    """
+    Migrate an index, resume its copy when it was interrupted.
+
+    Parameters
+    ----------
+    source: Osman
+        source cluster
+    target: Osman
+        target cluster
+    index_name: str
+        name of the concrete index
+    index: dict
+        aliases, mappings and settings of the source index
+    state: _MigrationState
+        state of the migration
+    slices: int
+        number of slices copied in parallel
+    chunk_size: int
+        number of documents in a scroll page and a bulk request
+    verify: bool
+        compare the checksums of the documents
+    Returns
+    -------
+    dict
+        response of the index migration
+    """
+    index_state = state.index(index_name)
+    if index_state.get("done"):
+        logging.info("Index '%s' is already migrated", index_name)
+        return {"acknowledged": True, "skipped": True}
+
+    settings = _index_settings(index["settings"])
+    if not index_state:
+        # Replicas and refreshes are restored after the copy
+        target.client.indices.create(
+            index_name,
+            body={
+                "mappings": index["mappings"],
+                "settings": {
+                    **settings,
+                    "number_of_replicas": 0,
+                    "refresh_interval": "-1",
+                },
+            },
+            params=ADMIN_PROFILE,
+        )
+        state.update(index_name, slices=slices, copied=[], done=False)
+        index_state = state.index(index_name)
+
+    slices = index_state["slices"]
+    remaining = [
+        slice_id
+        for slice_id in range(slices)
+        if slice_id not in index_state["copied"]
+    ]
+
+    def on_slice(slice_id: int, copied: dict):  # noqa: WPS430
+        # Slices with failed documents are copied again by the next run
+        if copied["acknowledged"]:
+            state.add_slice(index_name, slice_id)
+
+    started = time.monotonic()
+    copied = target.copy_documents(
+        source.client,
+        index_name,
+        index_name,
+        slices=slices,
+        chunk_size=chunk_size,
+        slice_ids=remaining,
+        on_slice=on_slice,
+    )
+    seconds = time.monotonic() - started
+
+    target.client.indices.put_settings(
+        {
+            "index": {
+                "number_of_replicas": settings.get("number_of_replicas", 1),
+                "refresh_interval": settings.get("refresh_interval", None),
+            }
+        },
+        index=index_name,
+        params=ADMIN_PROFILE,
+    )
+    target.client.indices.refresh(index_name, params=ADMIN_PROFILE)
+    if index["aliases"]:
+        target.client.indices.update_aliases(
+            {
+                "actions": [
+                    {"add": {"index": index_name, "alias": alias, **config}}
+                    for alias, config in index["aliases"].items()
+                ]
+            },
+            params=ADMIN_PROFILE,
+        )
+
+    source_count = source.client.count(index=index_name, params=SEARCH_PROFILE)
+    target_count = target.client.count(index=index_name, params=SEARCH_PROFILE)
+    result = {
+        "acknowledged": copied["acknowledged"],
+        "documents": copied["succeeded"],
+        "failed": copied["failed"],
+        "errors": copied["errors"],
+        "seconds": round(seconds, 3),
+        "docs_per_second": round(copied["succeeded"] / max(seconds, 1e-3)),
+        "source_count": source_count["count"],
+        "target_count": target_count["count"],
+    }
+    result["acknowledged"] &= result["source_count"] == result["target_count"]
+    if verify:
+        source_checksum = checksum(
+            source.client, index_name, slices, chunk_size
+        )
+        target_checksum = checksum(
+            target.client, index_name, slices, chunk_size
+        )
+        result["checksum"] = source_checksum
+        result["checksum_match"] = source_checksum == target_checksum
+        result["acknowledged"] &= result["checksum_match"]
+
+    state.update(index_name, done=result["acknowledged"])
+    logging.info(
+        "Migrated %d documents of '%s' in %.1fs (%d/s)",
+        result["documents"],
+        index_name,
+        result["seconds"],
+        result["docs_per_second"],
+    )
+    return result
+
+
+def migrate(  # noqa: WPS211
+    source_config: OsmanConfig,
+    target_config: OsmanConfig,
+    index_names: list,
+    state_path: str = None,
+    scripts: bool = True,
+    slices: int = DEFAULT_COPY_SLICES,
+    chunk_size: int = DEFAULT_BULK_CHUNK_SIZE,
+    verify: bool = True,
+) -> dict:
+    """
+    Migrate indices and stored scripts to another cluster.
+
+    The indices are created on the target with the mappings and settings of
+    the source, without replicas and refreshes while the documents are
+    copied by parallel sliced scrolls and bulk requests. Then the replicas,
+    the refresh interval and the aliases are set and the documents are
+    verified by their counts and checksums.
+
+    With a state file the migration is resumable, a new run skips the
+    migrated indices and the copied slices of an interrupted index.
+
+    Parameters
+    ----------
+    source_config: OsmanConfig
+        configuration of the source cluster
+    target_config: OsmanConfig
+        configuration of the target cluster
+    index_names: list
+        names of the indices, aliases or patterns to migrate
+    state_path: str
+        path of the JSON state file of a resumable migration
+    scripts: bool
+        copy the stored scripts and search templates
+    slices: int
+        number of slices copied in parallel
+    chunk_size: int
+        number of documents in a scroll page and a bulk request
+    verify: bool
+        compare the checksums of the documents, reads both indices again
+    Returns
+    -------
+    dict
+        Dictionary with response, the responses of the indices under
+        "indices"
+    Raises
+    ------
+    RuntimeError
+        if a request fails, the state of the copied slices is kept.
+    """
+    state = _MigrationState(state_path)
+    result = {"acknowledged": True, "indices": {}, "scripts": []}
+    started = time.monotonic()
+    with Osman(source_config) as source, Osman(target_config) as target:
+        try:
+            if scripts:
+                result["scripts"] = _copy_scripts(source, target)
+            indices = source.client.indices.get(
+                ",".join(index_names), params=ADMIN_PROFILE
+            )
+            for index_name, index in indices.items():
+                if index_name.startswith("."):
+                    continue
+                index_result = _migrate_index(
+                    source,
+                    target,
+                    index_name,
+                    index,
+                    state,
+                    slices,
+                    chunk_size,
+                    verify,
+                )
+                result["indices"][index_name] = index_result
+                result["acknowledged"] &= index_result["acknowledged"]
+        except exceptions.OpenSearchException as exc:
+            logging.debug("Failed: '%s'", exc)
+            raise RuntimeError("Migration failed") from exc
+
+    seconds = time.monotonic() - started
+    documents = sum(
+        index.get("documents", 0) for index in result["indices"].values()
+    )
+    result["documents"] = documents
+    result["seconds"] = round(seconds, 3)
+    result["docs_per_second"] = round(documents / max(seconds, 1e-3))
+    return result
@@ -1,17 +1,113 @@
 """Osman -- OpenSearch Manager."""
+import collections
+import functools
+import itertools
 import json
 import logging
+import math
+import os
+import pickle
+import threading
+import time
 import uuid
-from typing import Union
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, Union
 
 import deepdiff
-from opensearchpy import OpenSearch, RequestsHttpConnection, exceptions, helpers
-from requests_aws4auth import AWS4Auth
+from opensearchpy import OpenSearch, exceptions, helpers
 
+from osman import dataframe
+from osman.awsauth import build_aws_auth
 from osman.config import OsmanConfig
-
-
-def _bulk_json_data(index_name: str, documents: list, id_key: str = None):
+from osman.connection import OsmanConnection
+from osman.fingerprint import FingerprintStore
+from osman.resilience import LatencyWindow
+from osman.selector import SELECTORS, ZoneAwareSelector, zone_host_info
+from osman.sizing import apply_recommendation, recommend_shards
+from osman.snapshot import ClusterSnapshot
+from osman.template import RenderCache, render_mustache
+from osman.transport import (
+    ADMIN_PROFILE,
+    BULK_PROFILE,
+    LONG_RUNNING_PROFILE,
+    SCROLL_PROFILE,
+    SEARCH_PROFILE,
+    OsmanTransport,
+)
+from osman.validation import MappingValidator
+
+# Used when Osman is created without any configuration
+DEFAULT_HOST_URL = "http://opensearch-node:9200"
+
+# Query parameters selecting the request profile, see OsmanConfig.profiles
+_SEARCH = SEARCH_PROFILE
+_BULK = BULK_PROFILE
+_ADMIN = ADMIN_PROFILE
+_LONG_RUNNING = LONG_RUNNING_PROFILE
+_SCROLL = SCROLL_PROFILE
+
+# Bulk requests are split by the number of actions and by the size in bytes
+DEFAULT_BULK_CHUNK_SIZE = 500
+DEFAULT_BULK_CHUNK_BYTES = 100 * 1024 * 1024
+
+# Counters of the by query task status
+_BY_QUERY_COUNTERS = (
+    "total",
+    "created",
+    "updated",
+    "deleted",
+    "batches",
+    "version_conflicts",
+    "noops",
+)
+
+# Number of parallel slices of the documents copy
+DEFAULT_COPY_SLICES = 4
+
+# Statistics of the performance snapshots
+_SNAPSHOT_INDEX_METRICS = (
+    "docs,store,indexing,search,merge,refresh,segments,fielddata"
+)
+_SNAPSHOT_NODE_METRICS = "jvm,os,thread_pool,indices"
+
+# Types of the results of the painless script contexts
+_PAINLESS_RESULT_TYPES = {"score": (float, int), "filter": bool}
+
+# Index with the lock documents of reindexed indices
+LOCK_INDEX = "osman-locks"
+DEFAULT_LOCK_TIMEOUT = 3600
+# Writes of a lock document retried after a conflicting write
+LOCK_WRITE_ATTEMPTS = 3
+
+# Maximal wait in seconds for the green health of a reindexed index
+DEFAULT_READY_TIMEOUT = 1800
+
+# Name of the aggregation run by aggregate_buckets
+_AGGREGATION = "osman_buckets"
+
+# Parts of a search response read by the columnar output
+_HITS_FILTER_PATH = (
+    "_scroll_id",
+    "hits.hits._id",
+    "hits.hits._score",
+    "hits.hits._source",
+)
+
+
+def _bulk_json_data(
+    index_name: str,
+    documents: list,
+    id_key: str = None,
+    validator: MappingValidator = None,
+    rejected: dict = None,
+    max_rejected: int = 10,
+):
     """
     Generate data dictionary.
 
@@ -25,6 +121,13 @@ def _bulk_json_data(index_name: str, documents: list, id_key: str = None):
         iterable yielding documents. TODO iterable instead of list?
     id_key: str
         key from a document used for indexing or None
+    validator: MappingValidator
+        validator of the documents, the invalid documents are skipped
+    rejected: dict
+        counts the skipped documents in "count", the first max_rejected of
+        them and their errors are appended to "documents"
+    max_rejected: int
+        maximal number of the kept skipped documents
     Yields
     ------
     dict
@@ -33,9 +136,489 @@ def _bulk_json_data(index_name: str, documents: list, id_key: str = None):
     """
     for doc in documents:
         index_id = doc[id_key] if id_key else uuid.uuid4()
+        if validator is not None:
+            coerced, errors = validator.validate(doc)
+            if errors:
+                rejected["count"] += 1
+                if len(rejected["documents"]) < max_rejected:
+                    rejected["documents"].append(
+                        {"document": doc, "errors": errors}
+                    )
+                continue
+            doc = coerced
         yield {"_index": index_name, "_id": index_id, "_source": doc}
 
 
+def _bulk_actions(index_name: str, actions, id_key: str = None):
+    """
+    Generate bulk actions from Osman actions.
+
+    Helper method for bulk_actions.
+
+    Parameters
+    ----------
+    index_name: str
+        name of the index
+    actions: Iterable
+        Osman actions, see bulk_actions
+    id_key: str
+        key from the action's doc used as the id when _id is missing
+    Yields
+    ------
+    dict
+        action for opensearchpy.helpers, with _op_type, _index and _id
+    Raises
+    ------
+    ValueError
+        for an unknown operation or a missing id
+    """
+    for action in actions:
+        operation = action.get("op", "index")
+        doc = action.get("doc")
+        index_id = action.get("_id")
+        if index_id is None and id_key and doc:
+            index_id = doc[id_key]
+
+        if operation == "index":
+            if index_id is None:
+                index_id = uuid.uuid4()
+            yield {"_index": index_name, "_id": index_id, "_source": doc}
+            continue
+
+        if index_id is None:
+            raise ValueError(f"Bulk '{operation}' action without _id")
+        bulk_action = {"_index": index_name, "_id": index_id}
+        if operation == "delete":
+            bulk_action["_op_type"] = "delete"
+            yield bulk_action
+            continue
+
+        bulk_action["_op_type"] = "update"
+        if operation == "update":
+            bulk_action["doc"] = doc
+        elif operation == "upsert":
+            bulk_action["doc"] = doc
+            bulk_action["doc_as_upsert"] = True
+        elif operation == "script":
+            bulk_action["script"] = action["script"]
+            if "upsert" in action:
+                bulk_action["upsert"] = action["upsert"]
+        else:
+            raise ValueError(f"Unknown bulk operation '{operation}'")
+        if "retry_on_conflict" in action:
+            bulk_action["retry_on_conflict"] = action["retry_on_conflict"]
+        yield bulk_action
+
+
+def _batched(iterable, size: int):
+    """
+    Split an iterable into lists.
+
+    Parameters
+    ----------
+    iterable: Iterable
+        items to split
+    size: int
+        maximal length of a list
+    Yields
+    ------
+    list
+        up to size consecutive items
+    """
+    iterator = iter(iterable)
+    batch = list(itertools.islice(iterator, size))
+    while batch:
+        yield batch
+        batch = list(itertools.islice(iterator, size))
+
+
+def _transform_sources(transform, sources: list) -> list:
+    """
+    Transform the sources of documents, run in a worker process.
+
+    Parameters
+    ----------
+    transform: Callable
+        function transforming a _source, returns None to drop the document
+    sources: list
+        the _source of the documents
+    Returns
+    -------
+    list
+        the transformed sources
+    """
+    return [transform(source) for source in sources]
+
+
+def _check_transform(transform):
+    """
+    Check the transform can be sent to the worker processes.
+
+    Parameters
+    ----------
+    transform: Callable
+        function transforming a _source
+    Raises
+    ------
+    RuntimeError
+        if the transform can't be pickled, e.g. a lambda or a local function.
+    """
+    try:
+        pickle.dumps(transform)
+    except (pickle.PicklingError, AttributeError, TypeError) as exc:
+        raise RuntimeError(
+            f"The transform can't be sent to the worker processes: {exc}"
+        ) from exc
+
+
+def _transformed(task) -> list:
+    """
+    Return the transformed sources of a batch.
+
+    Parameters
+    ----------
+    task: Callable
+        returns the transformed sources, e.g. future.result
+    Returns
+    -------
+    list
+        the transformed sources
+    Raises
+    ------
+    RuntimeError
+        if the transform fails.
+    """
+    try:
+        return task()
+    except Exception as exc:
+        raise RuntimeError(f"The transform failed: {exc!r}") from exc
+
+
+def _copy_actions(  # noqa: WPS231
+    hits,
+    index_name: str,
+    transform=None,
+    pool=None,
+    batch_size: int = DEFAULT_BULK_CHUNK_SIZE,
+) -> Iterator[dict]:
+    """
+    Convert search hits to index actions, optionally transformed.
+
+    With a process pool two batches are transformed at once, so the pool
+    works while the previous batch is indexed.
+
+    Parameters
+    ----------
+    hits: Iterable
+        search hits with _id and _source
+    index_name: str
+        name of the destination index
+    transform: Callable
+        function transforming a _source, returns None to drop the document
+    pool: concurrent.futures.Executor
+        pool running the transform, in the calling thread when None
+    batch_size: int
+        number of documents transformed in a task
+    Yields
+    ------
+    dict
+        bulk index action
+    Raises
+    ------
+    RuntimeError
+        if the transform fails.
+    """
+
+    def actions(batch: list, sources: list) -> Iterator[dict]:  # noqa: WPS430
+        for hit, source in zip(batch, sources):
+            if source is None:
+                continue
+            action = {
+                "_index": index_name,
+                "_id": hit["_id"],
+                "_source": source,
+            }
+            if "_routing" in hit:
+                action["_routing"] = hit["_routing"]
+            yield action
+
+    pending = collections.deque()
+    for batch in _batched(hits, batch_size):
+        sources = [hit["_source"] for hit in batch]
+        if transform is None:
+            yield from actions(batch, sources)
+        elif pool is None:
+            yield from actions(
+                batch,
+                _transformed(
+                    functools.partial(_transform_sources, transform, sources)
+                ),
+            )
+        else:
+            pending.append(
+                (batch, pool.submit(_transform_sources, transform, sources))
+            )
+            if len(pending) >= 2:
+                batch, future = pending.popleft()
+                yield from actions(batch, _transformed(future.result))
+    while pending:
+        batch, future = pending.popleft()
+        yield from actions(batch, _transformed(future.result))
+
+
+def _merge_bulk_results(results: list, max_errors: int = 10) -> dict:
+    """
+    Merge the responses of _stream_bulk calls.
+
+    Parameters
+    ----------
+    results: list
+        responses of _stream_bulk
+    max_errors: int
+        maximal number of failed items kept
+    Returns
+    -------
+    dict
+        the summed response
+    """
+    counts = collections.Counter()
+    errors = []
+    for result in results:
+        counts.update(result["results"])
+        errors.extend(result["errors"])
+    failed = sum(result["failed"] for result in results)
+    return {
+        "acknowledged": not failed,
+        "succeeded": sum(result["succeeded"] for result in results),
+        "failed": failed,
+        "results": dict(counts),
+        "errors": errors[:max_errors],
+    }
+
+
+def _composite_keys(name: str, futures) -> Iterator[dict]:
+    """
+    Yield the terms buckets of finished partitions with composite keys.
+
+    Parameters
+    ----------
+    name: str
+        name of the composite source
+    futures: Iterable
+        finished futures of the partitions buckets
+    Yields
+    ------
+    dict
+        bucket {"key": {name: value}, "doc_count": int, ...}
+    """
+    for future in futures:
+        for bucket in future.result():
+            key = bucket.pop("key")
+            bucket.pop("key_as_string", None)
+            yield {"key": {name: key}, **bucket}
+
+
+def _index_version(name: str, index: str) -> Union[int, None]:
+    """
+    Return the version of a versioned index name.
+
+    Parameters
+    ----------
+    name: str
+        the name of the index (alias)
+    index: str
+        name of an index, {name}-{version} for a version
+    Returns
+    -------
+    Union[int, None]
+        the version or None when the index is not a version of the alias
+    """
+    if index is None or not index.startswith(f"{name}-"):
+        return None
+    suffix = index[len(name) + 1 :]
+    return int(suffix) if suffix.isdigit() else None
+
+
+def _results_match(result, expected, tolerance: float) -> bool:
+    """
+    Compare a painless script result with the expected one.
+
+    Parameters
+    ----------
+    result: Union[int, float, bool]
+        result of the script
+    expected: Union[int, float, bool]
+        expected result
+    tolerance: float
+        relative and absolute tolerance of numbers
+    Returns
+    -------
+    bool
+        whether the result matches
+    """
+    numbers = (int, float)
+    if isinstance(expected, bool) or not isinstance(result, numbers):
+        return result == expected
+    return math.isclose(result, expected, rel_tol=tolerance, abs_tol=tolerance)
+
+
+def _error_reason(error: exceptions.TransportError) -> str:
+    """
+    Return the reason of a failed request.
+
+    Parameters
+    ----------
+    error: exceptions.TransportError
+        the error
+    Returns
+    -------
+    str
+        the reason of the root cause reported by OpenSearch
+    """
+    info = error.info if isinstance(error.info, dict) else {}
+    reason = info.get("error", {})
+    if isinstance(reason, dict):
+        reason = reason.get("caused_by", reason).get("reason")
+    return reason or str(error)
+
+
+def _params_grid(params_grid: Union[dict, list]) -> list:
+    """
+    Expand a grid of search template parameters.
+
+    Parameters
+    ----------
+    params_grid: Union[dict, list]
+        lists of values by parameter name, expanded to their cartesian
+        product, or a list of parameter dictionaries
+    Returns
+    -------
+    list
+        parameter dictionaries
+    """
+    if isinstance(params_grid, list):
+        return params_grid
+    names = list(params_grid)
+    return [
+        dict(zip(names, values))
+        for values in itertools.product(*params_grid.values())
+    ]
+
+
+def _profile_breakdown(profile: dict) -> list:
+    """
+    Summarize the search profile per shard.
+
+    Parameters
+    ----------
+    profile: dict
+        profile of a search response
+    Returns
+    -------
+    list
+        per shard the nanoseconds of the queries, the rewrites and the
+        collectors, the summed breakdown of the top level queries and the
+        collectors by name, the slowest shard first
+    """
+    shards = []
+    for shard in profile.get("shards", []):
+        breakdown = collections.Counter()
+        collectors = collections.Counter()
+        query_nanos = 0
+        rewrite_nanos = 0
+        for search in shard.get("searches", []):
+            rewrite_nanos += search.get("rewrite_time", 0)
+            for query in search.get("query", []):
+                query_nanos += query.get("time_in_nanos", 0)
+                breakdown.update(
+                    {
+                        timing: nanos
+                        for timing, nanos in query.get("breakdown", {}).items()
+                        if not timing.endswith("_count")
+                    }
+                )
+            for collector in search.get("collector", []):
+                collectors[collector["name"]] += collector["time_in_nanos"]
+        shards.append(
+            {
+                "id": shard.get("id"),
+                "query_nanos": query_nanos,
+                "rewrite_nanos": rewrite_nanos,
+                "collector_nanos": sum(collectors.values()),
+                "breakdown": dict(breakdown.most_common()),
+                "collectors": dict(collectors),
+            }
+        )
+    return sorted(shards, key=lambda shard: shard["query_nanos"], reverse=True)
+
+
+def _hits_params(fields: list = None) -> dict:
+    """
+    Return search parameters limiting the response to the hits.
+
+    Parameters
+    ----------
+    fields: list
+        fields of the _source returned, all when None
+    Returns
+    -------
+    dict
+        filter_path and _source parameters of the search
+    """
+    hits_params = {"filter_path": _HITS_FILTER_PATH}
+    if fields is not None:
+        if fields:
+            hits_params["_source_includes"] = fields
+        else:
+            hits_params["_source"] = False
+    return hits_params
+
+
+def _by_query_stats(task: dict, max_errors: int = 10) -> dict:
+    """
+    Return the statistics of a delete/update by query task.
+
+    Helper method for delete_by_query and update_by_query.
+
+    Parameters
+    ----------
+    task: dict
+        response of the tasks API
+    max_errors: int
+        maximal number of failures returned
+    Returns
+    -------
+    dict
+        counters of the task, its duration in seconds, throughput in
+        documents per second and the first max_errors failures
+    """
+    completed = task.get("completed", False)
+    # The response of a completed task, the status of a running one
+    status = task.get("response") if completed else None
+    status = status or task.get("task", {}).get("status", {})
+
+    stats = {name: status.get(name, 0) for name in _BY_QUERY_COUNTERS}
+    processed = stats["created"] + stats["updated"] + stats["deleted"]
+    took = status.get("took")
+    if took is None:
+        took = task.get("task", {}).get("running_time_in_nanos", 0) / 1e6
+    took /= 1000
+    failures = status.get("failures", [])
+
+    stats.update(
+        {
+            "completed": completed,
+            "took": took,
+            "docs_per_second": processed / took if took else None,
+            "retries": status.get("retries", {"bulk": 0, "search": 0}),
+            "throttled_millis": status.get("throttled_millis", 0),
+            "failures_count": len(failures),
+            "failures": failures[:max_errors],
+        }
+    )
+    return stats
+
+
 def _compare_scripts(script_local: str, script_os: str) -> dict:
     """
     Compare two scripts and return the differences.
@@ -72,6 +655,8 @@ class Osman(object):
     ----------
     client: OpenSearch
         OpenSearch initialized client
+    closed: bool
+        True after close() was called, the client must not be used anymore
     """
 
     def __init__(self, config: OsmanConfig = None):
@@ -92,11 +677,12 @@ class Osman(object):
         """
         if not config:
             logging.info("No config provided, using a default one")
-            config = OsmanConfig(host_url="http://opensearch-node:9200")
+            config = OsmanConfig(host_url=DEFAULT_HOST_URL)
 
         assert isinstance(config, OsmanConfig)
         self.config = config
 
+        self._aws_auth = None
         os_params = {}
         if config.auth_method == "http":
             logging.info(
@@ -106,7 +692,13 @@ class Osman(object):
                 {config.opensearch_port},
             )
 
-            os_params["hosts"] = [config.host_url]
+            os_params["hosts"] = config.host_urls
+            # Nodes discovered by sniffing are passed without credentials
+            if getattr(config, "opensearch_user", None):
+                os_params["http_auth"] = (
+                    config.opensearch_user,
+                    config.opensearch_secret,
+                )
 
         elif config.auth_method == "awsauth":
             logging.info(
@@ -116,40 +708,96 @@ class Osman(object):
                 {config.opensearch_port},
             )
 
-            os_params["http_auth"] = AWS4Auth(
-                config.aws_access_key_id,
-                config.aws_secret_access_key,
-                config.aws_region,
-                config.aws_service,
-            )
-            os_params["hosts"] = [
-                {"host": config.opensearch_host, "port": config.opensearch_port}
-            ]
+            self._aws_auth = build_aws_auth(config)
+            os_params["http_auth"] = self._aws_auth
+            os_params["hosts"] = config.opensearch_hosts
         else:
             # We should never get here
             raise AssertionError()
 
         os_params["use_ssl"] = config.opensearch_ssl_enabled
-        os_params["http_compress"] = True
-        os_params["connection_class"] = RequestsHttpConnection
+        os_params["compression"] = config.compression
+        os_params["compression_threshold"] = config.compression_threshold
+        os_params["compression_level"] = config.compression_level
+        os_params["connection_class"] = OsmanConnection
+        os_params["transport_class"] = OsmanTransport
+        os_params["circuit_breaker"] = config.circuit_breaker
+        os_params["adaptive_timeout"] = config.adaptive_timeout
+        os_params["retry_backoff"] = config.retry_backoff
+        os_params["retry_backoff_max"] = config.retry_backoff_max
+        os_params["retry_budget"] = config.retry_budget
+        os_params["profiles"] = config.profiles
         os_params["timeout"] = config.timeout
+        os_params["pool_maxsize"] = config.pool_maxsize
         os_params["max_retries"] = config.max_retries
         os_params["retry_on_timeout"] = config.retry_on_timeout
+        os_params["sniff_on_start"] = config.sniff_on_start
+        os_params["sniff_on_connection_fail"] = config.sniff_on_connection_fail
+        os_params["sniffer_timeout"] = config.sniffer_timeout
+        os_params["dead_timeout"] = config.dead_timeout
+        os_params["latency_ewma_alpha"] = config.latency_ewma_alpha
+        os_params["host_zones"] = config.host_zones
+        os_params["host_info_callback"] = functools.partial(
+            zone_host_info, zone_attribute=config.zone_attribute
+        )
+        os_params["selector_class"] = SELECTORS[config.host_selector]
+        if config.availability_zone:
+            os_params["selector_class"] = functools.partial(
+                ZoneAwareSelector,
+                selector_class=os_params["selector_class"],
+                local_zone=config.availability_zone,
+            )
         self.client = OpenSearch(**os_params)
+        self.closed = False
+        self.render_cache = RenderCache()
+        # Serializes the writes of the reindex lock documents
+        self._lock_writes = threading.Lock()
 
         # Test the connection
         logging.info("Getting cluster settings")
         try:
-            self.client.cluster.get_settings()
+            self.client.cluster.get_settings(params=_ADMIN)
         except Exception:
             logging.error("Getting cluster settings failed")
             raise
 
+    def __enter__(self):
+        """
+        Enter the runtime context, the client is closed on exit.
+
+        Returns
+        -------
+        Osman
+            self
+        """
+        return self
+
+    def __exit__(self, *_):
+        """Exit the runtime context and close the client."""
+        self.close()
+
+    def close(self):
+        """
+        Close the client and release its pooled connections.
+
+        Closing an instance obtained from osman.get_osman() removes it from
+        the shared registry, the next get_osman() call creates a new one.
+        """
+        if self.closed:
+            return
+
+        logging.info("Closing OpenSearch client")
+        self.closed = True
+        self.client.close()
+        if self._aws_auth is not None:
+            self._aws_auth.close()
+
     def create_index(
         self,
         name: str,
         mapping: dict = None,
         settings: dict = None,
+        sizing: dict = None,
     ) -> dict:
         """
         Create an index.
@@ -162,6 +810,10 @@ class Osman(object):
             Index mapping
         settings: dict
             Index settings
+        sizing: dict
+            arguments of recommend_index_settings, the recommended number of
+            shards, replicas and refresh interval are used unless they are
+            set in settings
 
         Returns
         -------
@@ -170,6 +822,16 @@ class Osman(object):
         """
         if mapping is None:
             mapping = {"mappings": {}}
+        if sizing is not None:
+            recommendation = self.recommend_index_settings(
+                **{"mapping": mapping, **sizing}
+            )
+            logging.info(
+                "Recommended settings of '%s': %s",
+                name,
+                recommendation["settings"],
+            )
+            settings = apply_recommendation(settings, recommendation)
         if settings is None:
             settings = {"settings": {}}
 
@@ -179,8 +841,126 @@ class Osman(object):
         }
 
         return self.client.indices.create(
-            index=name, body=body, ignore=[400, 404]
+            index=name, body=body, ignore=[400, 404], params=_ADMIN
+        )
+
+    def recommend_index_settings(  # noqa: WPS211
+        self,
+        document_count: int,
+        document_bytes: float = None,
+        sample_documents: list = None,
+        mapping: dict = None,
+        growth: float = 1.0,
+        indexing_rate: float = None,
+    ) -> dict:
+        """
+        Recommend the shards, replicas and refresh interval of an index.
+
+        The number of data nodes is read from the cluster. The size of a
+        document is measured by a sample ingest when document_bytes is not
+        given: the sample documents are indexed to a temporary index with the
+        mapping and force-merged, the store size is divided by their count.
+
+        Parameters
+        ----------
+        document_count: int
+            expected number of documents
+        document_bytes: float
+            stored bytes per document
+        sample_documents: list
+            documents measured when document_bytes is None, the more the
+            more precise, at least a few thousand
+        mapping: dict
+            index mapping of the sample index
+        growth: float
+            expected growth of the index over its lifetime, 2 for doubling
+        indexing_rate: float
+            expected indexed documents per second, None when unknown
+
+        Returns
+        -------
+        dict
+            {"settings": {...}} for create_index and the estimates the
+            recommendation is based on, see osman.sizing.recommend_shards
+        """
+        assert (
+            document_bytes is not None or sample_documents
+        ), "document_bytes or sample_documents must be given"
+        if document_bytes is None:
+            document_bytes = self._sample_document_bytes(
+                sample_documents, mapping
+            )
+        health = self.client.cluster.health(params=_ADMIN)
+        return recommend_shards(
+            document_count,
+            document_bytes,
+            data_nodes=health["number_of_data_nodes"],
+            growth=growth,
+            indexing_rate=indexing_rate,
+        )
+
+    def _sample_document_bytes(self, documents: list, mapping: dict) -> float:
+        """
+        Measure the stored bytes per document by a sample ingest.
+
+        Parameters
+        ----------
+        documents: list
+            sample documents
+        mapping: dict
+            index mapping
+
+        Returns
+        -------
+        float
+            store size of the force-merged sample divided by its count
+        """
+        index_name = f"osman-sizing-{uuid.uuid4().hex}"
+        self.create_index(
+            index_name,
+            mapping,
+            {"settings": {"number_of_shards": 1, "number_of_replicas": 0}},
+        )
+        try:
+            self.add_data_to_index(index_name, documents, refresh=True)
+            self.client.indices.forcemerge(
+                index_name, max_num_segments=1, params=_LONG_RUNNING
+            )
+            self.client.indices.refresh(index_name, params=_ADMIN)
+            stats = self.client.indices.stats(
+                index=index_name, metric="docs,store", params=_ADMIN
+            )
+        finally:
+            self.delete_index(index_name)
+        primaries = stats["indices"][index_name]["primaries"]
+        return primaries["store"]["size_in_bytes"] / max(
+            primaries["docs"]["count"], 1
+        )
+
+    def _index_size(self, index_name: str) -> dict:
+        """
+        Return the number of documents and their stored size of an index.
+
+        Parameters
+        ----------
+        index_name: str
+            name of the index
+
+        Returns
+        -------
+        dict
+            document_count and document_bytes of the primaries
+        """
+        stats = self.client.indices.stats(
+            index=index_name, metric="docs,store", params=_ADMIN
         )
+        primaries = stats["indices"][index_name]["primaries"]
+        count = primaries["docs"]["count"]
+        return {
+            "document_count": count,
+            "document_bytes": primaries["store"]["size_in_bytes"]
+            / max(count, 1),
+        }
 
     def delete_index(self, name: str) -> dict:
         """
@@ -195,7 +975,9 @@ class Osman(object):
         dict
             Dictionary with response
         """
-        return self.client.indices.delete(index=name, ignore=[400, 404])
+        return self.client.indices.delete(
+            index=name, ignore=[400, 404], params=_ADMIN
+        )
 
     def index_exists(self, name: str) -> dict:
         """
@@ -210,179 +992,1874 @@ class Osman(object):
         dict
             Dictionary with response
         """
-        return self.client.indices.exists(index=name)
-
-    def reindex(
+        return self.client.indices.exists(index=name, params=_ADMIN)
+
+    def reindex(  # noqa: WPS211
+        self,
+        name: str,
+        mapping: dict = None,
+        settings: dict = None,
+        transform=None,
+        slices: int = DEFAULT_COPY_SLICES,
+        process_count: int = None,
+        chunk_size: int = DEFAULT_BULK_CHUNK_SIZE,
+        retained_versions: int = 0,
+        lock_timeout: float = DEFAULT_LOCK_TIMEOUT,
+        defer_replicas: bool = False,
+        max_num_segments: int = None,
+        wait_for_green: bool = False,
+        warm_up: list = None,
+        ready_timeout: float = DEFAULT_READY_TIMEOUT,
+        sizing: dict = None,
+    ) -> dict:
+        """
+        Reindex with a new index mapping.
+
+        When reindexing, a version suffix [1, 2, 3, ...] is added to the
+        index name and the alias with the index name is moved to the new
+        version. An index should always be referenced by its name without the
+        suffix (alias). The previous versions are found by a single alias
+        lookup, retained_versions of them are kept for rollback_index.
+
+        A lock document in the osman-locks index prevents concurrent
+        reindexing of the same index.
+
+        The alias is moved only when the new index is ready: optionally
+        force-merged, green and warmed up by queries. Otherwise the new index
+        is deleted and the alias stays.
+
+        With a transform the documents are not copied by OpenSearch. They are
+        read by slices scrolled in parallel, transformed in a process pool and
+        bulk indexed to the new index.
+
+        Parameters
+        ----------
+        name: str
+            the name of the index
+        mapping: dict
+            index mapping
+        settings: dict
+            index settings
+        transform: Callable
+            function transforming the _source of a document, returns None to
+            drop the document. It is run in worker processes, so it must be
+            picklable (a module level function).
+        slices: int
+            number of slices copied in parallel with a transform
+        process_count: int
+            number of transform processes, all cores when None, 0 runs the
+            transform in the slice threads
+        chunk_size: int
+            number of documents in a bulk request and in a transform task
+        retained_versions: int
+            number of previous versions kept for rollback
+        lock_timeout: float
+            seconds after which the lock of a failed reindex is taken over,
+            the lock of a running reindex is renewed within them. The reindex
+            fails if its lock was taken over anyway.
+        defer_replicas: bool
+            create the new index without replicas and refreshes, restore them
+            after the copy
+        max_num_segments: int
+            force-merge the new index to the number of segments per shard
+        wait_for_green: bool
+            wait for the green health of the new index
+        warm_up: list
+            search bodies, or {"id": template_id, "params": {...}} of stored
+            search templates, run on the new index
+        ready_timeout: float
+            maximal seconds to wait for the green health
+        sizing: dict
+            arguments of recommend_index_settings for the new index, the
+            document_count and document_bytes default to those of the
+            current index
+
+        Returns
+        -------
+        dict
+            Dictionary with response
+        Raises
+        ------
+        RuntimeError
+            if the transform can't be sent to the worker processes, nothing is
+            created then.
+        """
+        if not mapping and not settings:
+            logging.warning("Mapping and settings cannot both be empty")
+            return {"acknowledged": False}
+        if transform is not None and process_count != 0:
+            _check_transform(transform)
+
+        owner = self._acquire_lock(name, lock_timeout)
+        if owner is None:
+            logging.warning("The index '%s' is locked by another reindex", name)
+            return {"acknowledged": False, "alias": name, "locked": True}
+        stop, heartbeat = self._start_heartbeat(name, owner, lock_timeout)
+        try:
+            response = self._reindex_locked(
+                name,
+                owner,
+                mapping,
+                settings,
+                retained_versions,
+                sizing,
+                {
+                    "defer_replicas": defer_replicas,
+                    "max_num_segments": max_num_segments,
+                    "wait_for_green": wait_for_green,
+                    "warm_up": warm_up,
+                    "ready_timeout": ready_timeout,
+                },
+                transform=transform,
+                slices=slices,
+                process_count=process_count,
+                chunk_size=chunk_size,
+            )
+        finally:
+            # a renewal in flight must not race the release
+            stop.set()
+            heartbeat.join()
+            released = self._release_lock(name, owner)
+        if not released and response["acknowledged"]:
+            # another process may have reindexed concurrently
+            logging.error("The lock of '%s' was lost during the reindex", name)
+            return {**response, "acknowledged": False, "lock_lost": True}
+        return response
+
+    def _reindex_locked(  # noqa: WPS211, WPS231
+        self,
+        name: str,
+        owner: str,
+        mapping: dict,
+        settings: dict,
+        retained_versions: int,
+        sizing: dict,
+        readiness: dict,
+        **copy_params,
+    ) -> dict:
+        """
+        Reindex to the next version while holding the lock of the alias.
+
+        Parameters
+        ----------
+        name: str
+            the name of the index (alias)
+        owner: str
+            owner id of the held lock
+        mapping: dict
+            index mapping
+        settings: dict
+            index settings
+        retained_versions: int
+            number of previous versions kept
+        sizing: dict
+            arguments of recommend_index_settings or None
+        readiness: dict
+            arguments of _prepare_index
+        copy_params: dict
+            transform, slices, process_count and chunk_size, see reindex
+        Returns
+        -------
+        dict
+            Dictionary with response
+        """
+        current, versions = self._index_versions(name)
+
+        # only reindex when the index already exists
+        if current is None:
+            logging.warning("The index does not exist")
+            return {"acknowledged": False}
+
+        os_mapping = self.client.indices.get_mapping(current, params=_ADMIN)
+        os_mapping = os_mapping.get(current)
+        diffs = _compare_scripts(json.dumps(mapping), json.dumps(os_mapping))
+
+        if diffs is None:
+            logging.warning(
+                "No difference betweeen OS and local source. Terminating reindexing.."
+            )
+            return {"acknowledged": False}
+
+        version = max(versions, default=0) + 1
+        index_to_create = f"{name}-{version}"
+
+        # create the new index, sized by the current one
+        if sizing is not None:
+            defaults = self._index_size(current)
+            if sizing.get("sample_documents"):
+                defaults.pop("document_bytes")
+            sizing = {**defaults, **sizing}
+        defer_replicas = readiness.pop("defer_replicas")
+
+        # move all the documents from the old index to the new index
+        # if it fails, ensure to delete the newly created index and
+        # stick to the old one
+        try:
+            created = self.create_index(
+                name=index_to_create,
+                mapping=mapping,
+                settings=settings,
+                sizing=sizing,
+            )
+            if not created.get("acknowledged"):
+                raise RuntimeError(
+                    "Creating the index failed: "
+                    + json.dumps(created.get("error"))
+                )
+            restore = None
+            if defer_replicas:
+                restore = self._defer_replicas(index_to_create)
+
+            if copy_params.get("transform") is None:
+                self.client.reindex(
+                    {
+                        "source": {"index": current},
+                        "dest": {"index": index_to_create},
+                    },
+                    wait_for_completion=True,
+                    params=_LONG_RUNNING,
+                )
+            else:
+                copied = self.copy_documents(
+                    self.client, current, index_to_create, **copy_params
+                )
+                if not copied["acknowledged"]:
+                    raise RuntimeError(
+                        f"{copied['failed']} documents failed: "
+                        + json.dumps(copied["errors"])
+                    )
+            warm_up_took = self._prepare_index(
+                index_to_create, restore, **readiness
+            )
+            # the alias must not be switched by a process without the lock
+            if not self._renew_lock(name, owner):
+                raise RuntimeError(f"The lock of '{name}' was taken over")
+
+        except (exceptions.OpenSearchException, RuntimeError) as exc:
+            logging.warning("Reindexing failed: '%s'", exc)
+            self.delete_index(name=index_to_create)
+            return {
+                "acknowledged": False,
+                "name": index_to_create,
+                "alias": name,
+            }
+        except BaseException:
+            # unexpected errors and interrupts leave no index behind either
+            self.delete_index(name=index_to_create)
+            raise
+
+        # move the alias, an index without suffix is replaced by the alias
+        self._switch_alias(name, current, index_to_create)
+        retained = self._prune_versions(
+            name, versions, index_to_create, retained_versions
+        )
+
+        # extract new settings
+        os_settings = (
+            self.client.indices.get_settings(name, params=_ADMIN)
+            .get(index_to_create, {})
+            .get("settings")
+        )
+
+        return {
+            "acknowledged": True,
+            "name": index_to_create,
+            "alias": name,
+            "version": version,
+            "retained": retained,
+            "warm_up_took": warm_up_took,
+            "mapping_differences": diffs,
+            "settings": os_settings,
+        }
+
+    def _defer_replicas(self, index: str) -> dict:
+        """
+        Disable the replicas and refreshes of an index before a copy.
+
+        Parameters
+        ----------
+        index: str
+            name of the index
+        Returns
+        -------
+        dict
+            the index settings to restore
+        """
+        index_settings = self.client.indices.get_settings(index, params=_ADMIN)[
+            index
+        ]["settings"]["index"]
+        self.client.indices.put_settings(
+            {"index": {"number_of_replicas": 0, "refresh_interval": "-1"}},
+            index=index,
+            params=_ADMIN,
+        )
+        return {
+            "number_of_replicas": index_settings["number_of_replicas"],
+            "refresh_interval": index_settings.get("refresh_interval"),
+        }
+
+    def _prepare_index(  # noqa: WPS211
+        self,
+        index: str,
+        restore: dict = None,
+        max_num_segments: int = None,
+        wait_for_green: bool = False,
+        warm_up: list = None,
+        ready_timeout: float = DEFAULT_READY_TIMEOUT,
+    ) -> list:
+        """
+        Make a new index ready for the alias switch.
+
+        The index is refreshed and force-merged while it has no replicas,
+        then the replicas are restored, so they copy the merged segments.
+
+        Parameters
+        ----------
+        index: str
+            name of the index
+        restore: dict
+            settings deferred during the copy, see _defer_replicas
+        max_num_segments: int
+            force-merge to the number of segments per shard
+        wait_for_green: bool
+            wait for the green health of the index
+        warm_up: list
+            search bodies or stored search templates run on the index
+        ready_timeout: float
+            maximal seconds to wait for the green health
+        Returns
+        -------
+        list
+            milliseconds took by the warm-up queries
+        Raises
+        ------
+        RuntimeError
+            if the index does not get green in time.
+        """
+        self.client.indices.refresh(index, params=_ADMIN)
+        if max_num_segments is not None:
+            logging.info("Force-merging '%s'...", index)
+            self.client.indices.forcemerge(
+                index, max_num_segments=max_num_segments, params=_LONG_RUNNING
+            )
+        if restore is not None:
+            self.client.indices.put_settings(
+                {"index": restore}, index=index, params=_ADMIN
+            )
+        if wait_for_green:
+            logging.info("Waiting for '%s' to get green...", index)
+            # the request waits a bit longer than the cluster, which answers
+            # 408 with the health when the index isn't green in time
+            health = self.client.cluster.health(
+                index=index,
+                wait_for_status="green",
+                timeout=f"{ready_timeout}s",
+                request_timeout=ready_timeout + 30,
+                ignore=408,
+                params=_LONG_RUNNING,
+            )
+            if health.get("timed_out"):
+                status = health.get("status")
+                raise RuntimeError(
+                    f"'{index}' is {status} after {ready_timeout}s"
+                )
+
+        warm_up_took = []
+        for query in warm_up or []:
+            if "id" in query:
+                response = self.client.search_template(
+                    body=query, index=index, params=_SEARCH
+                )
+            else:
+                response = self.client.search(
+                    body=query, index=index, params=_SEARCH
+                )
+            warm_up_took.append(response.get("took"))
+        return warm_up_took
+
+    def rollback_index(self, name: str, version: int = None) -> dict:
+        """
+        Move the alias back to a retained version of the index.
+
+        The alias is switched atomically, the newer version is kept and can
+        be restored by another rollback_index call.
+
+        Parameters
+        ----------
+        name: str
+            the name of the index (alias)
+        version: int
+            version to switch to, the newest version older than the current
+            one when None
+
+        Returns
+        -------
+        dict
+            Dictionary with response
+        """
+        owner = self._acquire_lock(name, DEFAULT_LOCK_TIMEOUT)
+        if owner is None:
+            logging.warning("The index '%s' is locked by another reindex", name)
+            return {"acknowledged": False, "alias": name, "locked": True}
+        try:
+            current, versions = self._index_versions(name)
+            current_version = _index_version(name, current) or 0
+            if version is None:
+                older = [ver for ver in versions if ver < current_version]
+                version = max(older, default=None)
+            if version not in versions or versions[version] == current:
+                logging.warning("No version of '%s' to roll back to", name)
+                return {"acknowledged": False, "alias": name}
+
+            self._switch_alias(name, current, versions[version])
+        finally:
+            self._release_lock(name, owner)
+        return {
+            "acknowledged": True,
+            "name": versions[version],
+            "alias": name,
+            "version": version,
+            "previous": current,
+        }
+
+    def _index_versions(self, name: str) -> tuple:
+        """
+        Find the versions of an index by a single alias lookup.
+
+        Parameters
+        ----------
+        name: str
+            the name of the index (alias)
+        Returns
+        -------
+        tuple
+            name of the index the alias points to (or of the index without
+            suffix) or None, and the versioned index names by version
+        """
+        response = self.client.indices.get_alias(
+            index=f"{name},{name}-*",
+            ignore_unavailable=True,
+            params=_ADMIN,
+        )
+        holders, versions = [], {}
+        for index, info in response.items():
+            version = _index_version(name, index)
+            if version is not None:
+                versions[version] = index
+            if index == name or name in info.get("aliases", {}):
+                holders.append((version or 0, index))
+        current = max(holders)[1] if holders else None
+        return current, versions
+
+    def _switch_alias(self, name: str, current: str, index: str):
+        """
+        Move the alias to another index atomically.
+
+        Parameters
+        ----------
+        name: str
+            the name of the alias
+        current: str
+            index the alias points to, or the index named as the alias which
+            is deleted
+        index: str
+            index the alias is moved to
+        """
+        if current == name:
+            remove = {"remove_index": {"index": current}}
+        else:
+            remove = {"remove": {"index": current, "alias": name}}
+        self.client.indices.update_aliases(
+            {"actions": [remove, {"add": {"index": index, "alias": name}}]},
+            params=_ADMIN,
+        )
+
+    def _prune_versions(
+        self, name: str, versions: dict, current: str, retained_versions: int
+    ) -> list:
+        """
+        Delete the versions of an index exceeding the retained number.
+
+        Parameters
+        ----------
+        name: str
+            the name of the index (alias)
+        versions: dict
+            previous versioned index names by version
+        current: str
+            index the alias points to
+        retained_versions: int
+            number of previous versions kept
+        Returns
+        -------
+        list
+            names of the retained previous versions, newest first
+        """
+        previous = [
+            versions[version]
+            for version in sorted(versions, reverse=True)
+            if versions[version] != current
+        ]
+        retained = previous[:retained_versions]
+        expired = previous[retained_versions:]
+        if expired:
+            logging.info("Deleting old versions of '%s': %s", name, expired)
+            self.client.indices.delete(",".join(expired), params=_ADMIN)
+        return retained
+
+    def _acquire_lock(self, name: str, timeout: float) -> Union[str, None]:
+        """
+        Acquire the lock of an index by creating its lock document.
+
+        Parameters
+        ----------
+        name: str
+            the name of the index (alias)
+        timeout: float
+            seconds after which a lock is considered stale and taken over
+        Returns
+        -------
+        Union[str, None]
+            owner id of the acquired lock, None when it is held by another
+        """
+        owner = uuid.uuid4().hex
+        lock = {"owner": owner, "acquired": time.time()}
+        try:
+            self.client.create(LOCK_INDEX, name, lock, params=_ADMIN)
+            return owner
+        except exceptions.ConflictError:
+            logging.debug("The lock of '%s' is held", name)
+
+        try:
+            held = self.client.get(LOCK_INDEX, name, params=_ADMIN)
+            if time.time() - held["_source"]["acquired"] < timeout:
+                return None
+            # replace the stale lock unless another process did it first
+            self.client.index(
+                LOCK_INDEX,
+                lock,
+                id=name,
+                if_seq_no=held["_seq_no"],
+                if_primary_term=held["_primary_term"],
+                params=_ADMIN,
+            )
+        except (exceptions.ConflictError, exceptions.NotFoundError):
+            return None
+        logging.warning("Took over the stale lock of '%s'", name)
+        return owner
+
+    def _update_lock(self, name: str, owner: str, delete: bool = False) -> bool:
+        """
+        Renew or delete the lock document if it is still held by the owner.
+
+        The writes of the heartbeat and of the reindex are serialized. After
+        a conflicting write the document is read again, the lock was taken
+        over only if its owner changed.
+
+        Parameters
+        ----------
+        name: str
+            the name of the index (alias)
+        owner: str
+            owner id returned by _acquire_lock
+        delete: bool
+            delete the document instead of refreshing its acquisition time
+        Returns
+        -------
+        bool
+            False if the lock was taken over
+        """
+        with self._lock_writes:
+            for _ in range(LOCK_WRITE_ATTEMPTS):
+                try:
+                    held = self.client.get(LOCK_INDEX, name, params=_ADMIN)
+                    if held["_source"]["owner"] != owner:
+                        return False
+                    version = {
+                        "if_seq_no": held["_seq_no"],
+                        "if_primary_term": held["_primary_term"],
+                    }
+                    if delete:
+                        self.client.delete(
+                            LOCK_INDEX, name, params=_ADMIN, **version
+                        )
+                    else:
+                        self.client.index(
+                            LOCK_INDEX,
+                            {"owner": owner, "acquired": time.time()},
+                            id=name,
+                            params=_ADMIN,
+                            **version,
+                        )
+                    return True
+                except exceptions.NotFoundError:
+                    return False
+                except exceptions.ConflictError:
+                    logging.debug("The lock of '%s' changed, reading it", name)
+        # rewritten on every attempt, by another process
+        return False
+
+    def _renew_lock(self, name: str, owner: str) -> bool:
+        """
+        Refresh the acquisition time of a lock still held by the owner.
+
+        Parameters
+        ----------
+        name: str
+            the name of the index (alias)
+        owner: str
+            owner id returned by _acquire_lock
+        Returns
+        -------
+        bool
+            False if the lock was taken over
+        """
+        return self._update_lock(name, owner)
+
+    def _start_heartbeat(self, name: str, owner: str, timeout: float) -> tuple:
+        """
+        Renew the lock in a thread, so a long reindex doesn't look stale.
+
+        Parameters
+        ----------
+        name: str
+            the name of the index (alias)
+        owner: str
+            owner id returned by _acquire_lock
+        timeout: float
+            seconds after which the lock is considered stale, it is renewed
+            three times within it
+        Returns
+        -------
+        tuple
+            the threading.Event stopping the renewals and the thread, join it
+            before releasing the lock
+        """
+        stop = threading.Event()
+
+        def heartbeat():  # noqa: WPS430
+            while not stop.wait(timeout / 3):
+                try:
+                    if not self._renew_lock(name, owner):
+                        logging.warning("The lock of '%s' was taken over", name)
+                        return
+                except exceptions.OpenSearchException as exc:
+                    logging.warning(
+                        "Renewing the lock of '%s' failed: '%s'", name, exc
+                    )
+
+        thread = threading.Thread(
+            target=heartbeat, name="osman-lock-heartbeat", daemon=True
+        )
+        thread.start()
+        return stop, thread
+
+    def _release_lock(self, name: str, owner: str) -> bool:
+        """
+        Release the lock of an index if it is still held by the owner.
+
+        Parameters
+        ----------
+        name: str
+            the name of the index (alias)
+        owner: str
+            owner id returned by _acquire_lock
+        Returns
+        -------
+        bool
+            False if the lock was taken over
+        """
+        released = self._update_lock(name, owner, delete=True)
+        if not released:
+            logging.warning("The lock of '%s' was taken over", name)
+        return released
+
+    def copy_documents(  # noqa: WPS211
+        self,
+        source_client: OpenSearch,
+        source_index: str,
+        dest_index: str,
+        query: dict = None,
+        transform=None,
+        slices: int = DEFAULT_COPY_SLICES,
+        process_count: int = None,
+        chunk_size: int = DEFAULT_BULK_CHUNK_SIZE,
+        slice_ids: list = None,
+        on_slice=None,
+    ) -> dict:
+        """
+        Copy documents by parallel sliced scrolls and bulk requests.
+
+        Every slice is scrolled and bulk indexed by its own thread, the
+        transform of all slices runs in a shared process pool. The source
+        index may be in another cluster, reindex and migrate copy by it.
+
+        Parameters
+        ----------
+        source_client: OpenSearch
+            client of the cluster with the source index
+        source_index: str
+            name of the source index
+        dest_index: str
+            name of the destination index in this cluster
+        query: dict
+            query selecting the documents, all when None
+        transform: Callable
+            function transforming a _source, see reindex
+        slices: int
+            number of slices copied in parallel
+        process_count: int
+            number of transform processes, see reindex
+        chunk_size: int
+            number of documents in a scroll page, a bulk request and a
+            transform task
+        slice_ids: list
+            ids of the slices to copy, all when None
+        on_slice: Callable
+            called with the slice id and its response when a slice is copied
+        Returns
+        -------
+        dict
+            merged response of the bulk requests, see bulk_actions
+        Raises
+        ------
+        RuntimeError
+            if scrolling, transforming or a bulk request fails.
+        """
+
+        def copy_slice(slice_id: int) -> dict:  # noqa: WPS430
+            body = {"query": query or {"match_all": {}}}
+            if slices > 1:
+                body["slice"] = {"id": slice_id, "max": slices}
+            hits = helpers.scan(
+                source_client,
+                query=body,
+                index=source_index,
+                size=chunk_size,
+                params=_SCROLL,
+                scroll_kwargs={"params": _SCROLL},
+            )
+            result = self._stream_bulk(
+                dest_index,
+                _copy_actions(hits, dest_index, transform, pool, chunk_size),
+                refresh=False,
+                chunk_size=chunk_size,
+                max_chunk_bytes=DEFAULT_BULK_CHUNK_BYTES,
+                thread_count=1,
+                max_errors=10,
+            )
+            if on_slice is not None:
+                on_slice(slice_id, result)
+            return result
+
+        if slice_ids is None:
+            slice_ids = range(slices)
+        pool = None
+        try:
+            if transform is not None and process_count != 0:
+                _check_transform(transform)
+                pool = ProcessPoolExecutor(
+                    max_workers=process_count or os.cpu_count()
+                )
+                # Start the workers before the slice threads, a worker fails
+                # when the transform can't be imported there
+                try:
+                    pool.submit(_transform_sources, transform, []).result()
+                except BrokenProcessPool as exc:
+                    raise RuntimeError(
+                        f"The transform processes failed to start: {exc}"
+                    ) from exc
+            with ThreadPoolExecutor(max_workers=slices) as executor:
+                results = list(executor.map(copy_slice, slice_ids))
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+        return _merge_bulk_results(results)
+
+    def search_index(self, name: str, search_query: dict) -> dict:
+        """
+        Search the index with provided search query.
+
+        Parameters
+        ----------
+        name: str
+            The name of the index
+        search_query: dict
+            Search query as dictionary {'query': {....}}
+        Returns
+        -------
+        dict
+            Dictionary with response
+        """
+        return self.client.search(body=search_query, index=name, params=_SEARCH)
+
+    def search_index_columns(
+        self,
+        name: str,
+        search_query: dict,
+        fields: list = None,
+        output: str = "columns",
+    ):
+        """
+        Search the index and return the hits as columns.
+
+        Only _id, _score and the selected fields of the _source are
+        requested, the hits are converted to column arrays without keeping
+        the rest of the response.
+
+        Parameters
+        ----------
+        name: str
+            The name of the index
+        search_query: dict
+            Search query as dictionary {'query': {....}}
+        fields: list
+            Fields of the _source, dotted paths for object fields, all when
+            None
+        output: str
+            "columns" for a dictionary of lists, "arrow" for a pyarrow.Table,
+            "pandas" for a pandas.DataFrame
+        Returns
+        -------
+        Union[dict, pyarrow.Table, pandas.DataFrame]
+            _id, _score and fields columns
+        """
+        response = self.client.search(
+            body=search_query,
+            index=name,
+            params=_SEARCH,
+            **_hits_params(fields),
+        )
+        hits = response.get("hits", {}).get("hits", [])
+        return dataframe.convert_columns(
+            dataframe.hits_columns(hits, fields), output
+        )
+
+    def scroll_index_columns(  # noqa: WPS211
+        self,
+        name: str,
+        search_query: dict,
+        fields: list = None,
+        output: str = "columns",
+        size: int = 1000,
+        scroll: str = "1m",
+    ) -> Iterator:
+        """
+        Scroll through all hits of the search and yield them as columns.
+
+        Each page of size hits is converted to columns as soon as it
+        arrives, so only a single page of hits is kept as dictionaries.
+
+        Parameters
+        ----------
+        name: str
+            The name of the index
+        search_query: dict
+            Search query as dictionary {'query': {....}}, sort by "_doc" is
+            the fastest when the order doesn't matter
+        fields: list
+            Fields of the _source, dotted paths for object fields, all when
+            None
+        output: str
+            "columns" for dictionaries of lists, "arrow" for pyarrow.Table,
+            "pandas" for pandas.DataFrame pages
+        size: int
+            Number of hits in a page
+        scroll: str
+            Time the search context is kept between pages
+        Yields
+        ------
+        Union[dict, pyarrow.Table, pandas.DataFrame]
+            _id, _score and fields columns of a page
+        Raises
+        ------
+        RuntimeError
+            if a scroll request fails.
+        """
+        assert output in dataframe.OUTPUTS, "Unknown output"
+        body = dict(search_query, size=size)
+        hits_params = _hits_params(fields)
+        scroll_id = None
+        try:
+            response = self.client.search(
+                body=body,
+                index=name,
+                scroll=scroll,
+                params=_SCROLL,
+                **hits_params,
+            )
+            while True:
+                scroll_id = response.get("_scroll_id", scroll_id)
+                hits = response.get("hits", {}).get("hits", [])
+                if not hits:
+                    break
+                yield dataframe.convert_columns(
+                    dataframe.hits_columns(hits, fields), output
+                )
+                response = self.client.scroll(
+                    body={"scroll": scroll, "scroll_id": scroll_id},
+                    params=_SCROLL,
+                    filter_path=hits_params["filter_path"],
+                )
+        except exceptions.OpenSearchException as exc:
+            logging.debug("Failed: '%s'", exc)
+            raise RuntimeError("Scrolling the search failed") from exc
+        finally:
+            if scroll_id is not None:
+                self.client.clear_scroll(
+                    body={"scroll_id": [scroll_id]},
+                    params={**_SCROLL, "ignore": (404,)},
+                )
+
+    def aggregate_buckets(  # noqa: WPS211
+        self,
+        index_name: str,
+        sources: list,
+        query: dict = None,
+        aggs: dict = None,
+        size: int = 1000,
+        partitions: int = None,
+        thread_count: int = 4,
+    ) -> Iterator[dict]:
+        """
+        Yield all buckets of a group by aggregation.
+
+        Without partitions a composite aggregation is paged through by its
+        after_key, size buckets per request. With partitions a single terms
+        source is split by the terms include partitioning into requests run
+        thread_count at a time, the buckets are yielded as the partitions
+        arrive, not ordered.
+
+        Parameters
+        ----------
+        index_name: str
+            Name of the index
+        sources: list
+            Composite aggregation sources, e.g.
+            [{"name": {"terms": {"field": "name"}}}]. A single terms source
+            with partitions.
+        query: dict
+            Query filtering the documents, all documents when None
+        aggs: dict
+            Sub-aggregations computed for every bucket
+        size: int
+            Number of buckets in a request, the maximal number of terms in a
+            partition
+        partitions: int
+            Number of terms partitions, composite pagination when None
+        thread_count: int
+            Number of partitions requested concurrently
+        Yields
+        ------
+        dict
+            bucket {"key": {source_name: value}, "doc_count": int, ...}
+        Raises
+        ------
+        RuntimeError
+            if a request fails or a partition has more than size terms.
+        """
+        body = {"size": 0, "track_total_hits": False}
+        if query is not None:
+            body["query"] = query
+        try:
+            if partitions is None:
+                yield from self._composite_buckets(
+                    index_name, body, sources, aggs, size
+                )
+            else:
+                yield from self._partition_buckets(
+                    index_name,
+                    body,
+                    sources,
+                    aggs,
+                    size,
+                    partitions,
+                    thread_count,
+                )
+        except exceptions.OpenSearchException as exc:
+            logging.debug("Failed: '%s'", exc)
+            raise RuntimeError("Aggregation failed") from exc
+
+    def _composite_buckets(
+        self,
+        index_name: str,
+        body: dict,
+        sources: list,
+        aggs: dict,
+        size: int,
+    ) -> Iterator[dict]:
+        """
+        Page through a composite aggregation.
+
+        Parameters
+        ----------
+        index_name: str
+            Name of the index
+        body: dict
+            Search body without the aggregation
+        sources: list
+            Composite aggregation sources
+        aggs: dict
+            Sub-aggregations
+        size: int
+            Number of buckets in a request
+        Yields
+        ------
+        dict
+            bucket of the composite aggregation
+        """
+        composite = {"sources": sources, "size": size}
+        aggregation = {"composite": composite}
+        if aggs:
+            aggregation["aggs"] = aggs
+        body = dict(body, aggs={_AGGREGATION: aggregation})
+        while True:
+            response = self.client.search(
+                body=body,
+                index=index_name,
+                params=_SEARCH,
+                filter_path="aggregations",
+            )
+            result = response["aggregations"][_AGGREGATION]
+            yield from result["buckets"]
+            if len(result["buckets"]) < size or "after_key" not in result:
+                return
+            composite["after"] = result["after_key"]
+
+    def _partition_buckets(  # noqa: WPS211
+        self,
+        index_name: str,
+        body: dict,
+        sources: list,
+        aggs: dict,
+        size: int,
+        partitions: int,
+        thread_count: int,
+    ) -> Iterator[dict]:
+        """
+        Run the terms partitions concurrently.
+
+        Parameters
+        ----------
+        index_name: str
+            Name of the index
+        body: dict
+            Search body without the aggregation
+        sources: list
+            A single composite terms source
+        aggs: dict
+            Sub-aggregations
+        size: int
+            Maximal number of terms in a partition
+        partitions: int
+            Number of partitions
+        thread_count: int
+            Number of concurrent requests
+        Yields
+        ------
+        dict
+            bucket with the key in the composite format
+        Raises
+        ------
+        RuntimeError
+            if a partition has more than size terms.
+        """
+        assert len(sources) == 1, "Partitions need a single source"
+        name, source = next(iter(sources[0].items()))
+        assert "terms" in source, "Partitions need a terms source"
+        terms = {
+            param: value
+            for param, value in source["terms"].items()
+            if param in {"field", "script", "value_type"}
+        }
+        terms["size"] = size
+
+        def fetch(partition: int) -> list:  # noqa: WPS430
+            aggregation = {
+                "terms": dict(
+                    terms,
+                    include={
+                        "partition": partition,
+                        "num_partitions": partitions,
+                    },
+                )
+            }
+            if aggs:
+                aggregation["aggs"] = aggs
+            response = self.client.search(
+                body=dict(body, aggs={_AGGREGATION: aggregation}),
+                index=index_name,
+                params=_SEARCH,
+                filter_path="aggregations",
+            )
+            result = response["aggregations"][_AGGREGATION]
+            if result.get("sum_other_doc_count"):
+                raise RuntimeError(
+                    f"Partition {partition} has more than {size} terms, "
+                    + "increase partitions or size"
+                )
+            return result["buckets"]
+
+        with ThreadPoolExecutor(max_workers=thread_count) as executor:
+            pending = set()
+            try:
+                for partition in range(partitions):
+                    pending.add(executor.submit(fetch, partition))
+                    if len(pending) < 2 * thread_count:
+                        continue
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    yield from _composite_keys(name, done)
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    yield from _composite_keys(name, done)
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def add_data_to_index(
+        self,
+        index_name: str,
+        documents: list,
+        id_key: str = None,
+        refresh: bool = False,
+        validate: bool = False,
+        max_rejected: int = 10,
+    ) -> dict:
+        """
+        Bulk insert data to index.
+
+        With validate the documents are checked against the index mapping
+        before they are sent, the invalid ones are skipped and reported.
+
+        Parameters
+        ----------
+        index_name: str
+            Name of the index
+        documents: list
+            Documents in the following format: [{document}, {document}, ...]
+        id_key: str
+            Key from the document used as id for indexing. If None uuid4
+            is created as id.
+        refresh: bool
+            Should the shards in OS refresh automatically?
+            True hurts the cluster performance
+        validate: bool
+            Validate and coerce the documents by the index mapping
+        max_rejected: int
+            Maximal number of rejected documents returned
+        Returns
+        -------
+        dict
+            Dictionary with response, with validate also the number of
+            rejected documents and the first max_rejected of them
+        Raises
+        ------
+        RuntimeError
+            if the helpers.bul call fails.
+        ValueError
+            with validate, if index_name is an alias of several indices.
+        """
+        logging.info("Creating data in index '%s'...", index_name)
+        validator = None
+        rejected = {"count": 0, "documents": []}
+        if validate:
+            validator = MappingValidator.from_response(
+                self.client.indices.get_mapping(index_name, params=_ADMIN)
+            )
+        try:
+            docs_inserted, _ = helpers.bulk(
+                self.client,
+                _bulk_json_data(
+                    index_name=index_name,
+                    documents=documents,
+                    id_key=id_key,
+                    validator=validator,
+                    rejected=rejected,
+                    max_rejected=max_rejected,
+                ),
+                refresh=refresh,
+                stats_only=True,
+                params=_BULK,
+            )
+        except Exception as exc:
+            logging.debug("Failed: '%s'", exc)
+            raise RuntimeError("Bulk insert failed") from exc
+
+        response = {
+            "acknowledged": True,
+            "documents_inserted": docs_inserted,
+            "index": index_name,
+        }
+        if validate:
+            if rejected["count"]:
+                logging.warning("%d documents rejected", rejected["count"])
+            response["documents_rejected"] = rejected["count"]
+            response["rejected"] = rejected["documents"]
+        return response
+
+    def bulk_actions(  # noqa: WPS211
+        self,
+        index_name: str,
+        actions,
+        id_key: str = None,
+        refresh: bool = False,
+        chunk_size: int = DEFAULT_BULK_CHUNK_SIZE,
+        max_chunk_bytes: int = DEFAULT_BULK_CHUNK_BYTES,
+        thread_count: int = 1,
+        max_errors: int = 10,
+    ) -> dict:
+        """
+        Stream index, update, upsert and delete actions to the index.
+
+        The actions are consumed lazily and sent in chunks, so an iterable
+        of any size can be passed. The operation of an action is set by its
+        "op" key:
+        {"op": "index", "doc": {...}, "_id": 1} -- index the whole document
+        {"op": "update", "_id": 1, "doc": {...}} -- update the given fields
+        {"op": "upsert", "_id": 1, "doc": {...}} -- update the given fields
+            or index the doc when the document doesn't exist
+        {"op": "script", "_id": 1, "script": {...}, "upsert": {...}} --
+            update by a script, optionally index upsert when the document
+            doesn't exist
+        {"op": "delete", "_id": 1} -- delete the document
+        Update actions accept "retry_on_conflict". Deleting a missing
+        document is not an error.
+
+        Parameters
+        ----------
+        index_name: str
+            Name of the index
+        actions: Iterable
+            Actions in the format described above
+        id_key: str
+            Key from the action's doc used as id when _id is missing. If
+            both are missing uuid4 is used for the index action.
+        refresh: bool
+            Should the shards in OS refresh automatically?
+            True hurts the cluster performance
+        chunk_size: int
+            Maximal number of actions in a bulk request
+        max_chunk_bytes: int
+            Maximal size of a bulk request in bytes
+        thread_count: int
+            Number of bulk requests sent in parallel
+        max_errors: int
+            Maximal number of failed items returned
+        Returns
+        -------
+        dict
+            Dictionary with response, number of succeeded and failed actions,
+            number of actions by result ("created", "updated", "noop",
+            "deleted", "not_found") and the first max_errors failed items
+        Raises
+        ------
+        RuntimeError
+            if the bulk requests fail.
+        """
+        logging.info("Running bulk actions in index '%s'...", index_name)
+        return self._stream_bulk(
+            index_name,
+            _bulk_actions(index_name, actions, id_key=id_key),
+            refresh=refresh,
+            chunk_size=chunk_size,
+            max_chunk_bytes=max_chunk_bytes,
+            thread_count=thread_count,
+            max_errors=max_errors,
+        )
+
+    def add_dataframe_to_index(  # noqa: WPS211
+        self,
+        index_name: str,
+        data,
+        id_key: str = None,
+        refresh: bool = False,
+        batch_size: int = dataframe.DEFAULT_BATCH_SIZE,
+        chunk_size: int = DEFAULT_BULK_CHUNK_SIZE,
+        max_chunk_bytes: int = DEFAULT_BULK_CHUNK_BYTES,
+        thread_count: int = 1,
+        max_errors: int = 10,
+    ) -> dict:
+        """
+        Bulk insert a DataFrame, an Arrow table or a Parquet file.
+
+        The rows are serialized to bulk actions batch by batch, column-wise,
+        without converting them to dictionaries. Requires the optional
+        pyarrow and pandas packages.
+
+        Parameters
+        ----------
+        index_name: str
+            Name of the index
+        data: Union[pandas.DataFrame, pyarrow.Table, pyarrow.RecordBatch, str]
+            Data to insert or path of a Parquet file
+        id_key: str
+            Column used as id for indexing. If None the ids are generated by
+            OpenSearch.
+        refresh: bool
+            Should the shards in OS refresh automatically?
+            True hurts the cluster performance
+        batch_size: int
+            Number of rows serialized at once
+        chunk_size: int
+            Maximal number of documents in a bulk request
+        max_chunk_bytes: int
+            Maximal size of a bulk request in bytes
+        thread_count: int
+            Number of bulk requests sent in parallel
+        max_errors: int
+            Maximal number of failed items returned
+        Returns
+        -------
+        dict
+            Dictionary with response, see bulk_actions
+        Raises
+        ------
+        ImportError
+            if pyarrow or pandas is not installed.
+        RuntimeError
+            if the bulk requests fail.
+        """
+        logging.info("Creating data in index '%s'...", index_name)
+        stream = dataframe.bulk_ndjson(
+            dataframe.record_batches(data, batch_size), index_name, id_key
+        )
+        return self._stream_bulk(
+            index_name,
+            stream,
+            refresh=refresh,
+            chunk_size=chunk_size,
+            max_chunk_bytes=max_chunk_bytes,
+            thread_count=thread_count,
+            max_errors=max_errors,
+            expand_action_callback=dataframe.raw_action,
+        )
+
+    def _stream_bulk(  # noqa: WPS211
+        self,
+        index_name: str,
+        stream,
+        refresh: bool,
+        chunk_size: int,
+        max_chunk_bytes: int,
+        thread_count: int,
+        max_errors: int,
+        expand_action_callback=helpers.expand_action,
+    ) -> dict:
+        """
+        Send bulk actions and count their results.
+
+        For the parameters see bulk_actions.
+
+        Parameters
+        ----------
+        index_name: str
+            Name of the index
+        stream: Iterable
+            Actions for opensearchpy.helpers
+        refresh: bool
+            Refresh the shards
+        chunk_size: int
+            Maximal number of actions in a bulk request
+        max_chunk_bytes: int
+            Maximal size of a bulk request in bytes
+        thread_count: int
+            Number of bulk requests sent in parallel
+        max_errors: int
+            Maximal number of failed items returned
+        expand_action_callback: Callable
+            Conversion of an action to the bulk action and data
+        Returns
+        -------
+        dict
+            Dictionary with response, see bulk_actions
+        Raises
+        ------
+        RuntimeError
+            if the bulk requests fail.
+        """
+        bulk_params = {
+            "chunk_size": chunk_size,
+            "max_chunk_bytes": max_chunk_bytes,
+            "raise_on_error": False,
+            "expand_action_callback": expand_action_callback,
+            "refresh": refresh,
+            "params": _BULK,
+        }
+        if thread_count > 1:
+            results = helpers.parallel_bulk(
+                self.client, stream, thread_count=thread_count, **bulk_params
+            )
+        else:
+            results = helpers.streaming_bulk(self.client, stream, **bulk_params)
+
+        succeeded, failed = 0, 0
+        counts = collections.Counter()
+        errors = []
+        try:
+            for ok, item in results:
+                op_type, result = next(iter(item.items()))
+                if ok or (op_type == "delete" and result.get("status") == 404):
+                    succeeded += 1
+                    counts[result.get("result")] += 1
+                    continue
+                failed += 1
+                if len(errors) < max_errors:
+                    errors.append(item)
+        except Exception as exc:
+            logging.debug("Failed: '%s'", exc)
+            raise RuntimeError("Bulk actions failed") from exc
+
+        if failed:
+            logging.warning("%d bulk actions failed", failed)
+        return {
+            "acknowledged": not failed,
+            "index": index_name,
+            "succeeded": succeeded,
+            "failed": failed,
+            "results": dict(counts),
+            "errors": errors,
+        }
+
+    def sync_data_to_index(  # noqa: WPS211, WPS231
+        self,
+        index_name: str,
+        documents,
+        id_key: str,
+        store: Union[str, FingerprintStore],
+        delete_missing: bool = True,
+        refresh: bool = False,
+        chunk_size: int = DEFAULT_BULK_CHUNK_SIZE,
+        thread_count: int = 1,
+    ) -> dict:
+        """
+        Index only the new and changed documents, delete the removed ones.
+
+        The hashes of the documents are kept in a local fingerprint store.
+        The documents whose hash didn't change since the last sync are
+        skipped. The documents of the previous sync missing from documents
+        are deleted from the index. The store is updated only when all bulk
+        actions succeed, otherwise the next sync sends the changes again.
+        An empty documents iterable deletes nothing.
+
+        Parameters
+        ----------
+        index_name: str
+            Name of the index
+        documents: Iterable
+            All documents of the index
+        id_key: str
+            Key from the document used as id
+        store: Union[str, FingerprintStore]
+            Fingerprint store or path of its SQLite file
+        delete_missing: bool
+            Delete the documents missing since the last sync
+        refresh: bool
+            Should the shards in OS refresh automatically?
+        chunk_size: int
+            Maximal number of actions in a bulk request
+        thread_count: int
+            Number of bulk requests sent in parallel
+        Returns
+        -------
+        dict
+            Dictionary with response, number of the documents, indexed,
+            unchanged and deleted documents, no deleted documents unless
+            acknowledged
+        Raises
+        ------
+        RuntimeError
+            if the bulk requests fail.
+        """
+        assert id_key, "id_key is required by the sync"
+        own_store = isinstance(store, str)
+        if own_store:
+            store = FingerprintStore(store)
+
+        counts = collections.Counter()
+
+        def counted(docs, name: str):  # noqa: WPS430
+            for doc in docs:
+                counts[name] += 1
+                yield doc
+
+        changed = store.changed_documents(
+            index_name, counted(documents, "documents"), id_key
+        )
+        actions = (
+            {"op": "index", "doc": doc} for doc in counted(changed, "changed")
+        )
+        bulk_params = {
+            "id_key": id_key,
+            "refresh": refresh,
+            "chunk_size": chunk_size,
+            "thread_count": thread_count,
+        }
+        result = {"acknowledged": False, "index": index_name}
+        deleted = 0
+        try:  # noqa: WPS229
+            response = self.bulk_actions(index_name, actions, **bulk_params)
+            result["errors"] = response["errors"]
+            # the deletes are skipped when indexing failed
+            missing = []
+            if response["acknowledged"] and delete_missing:
+                if counts["documents"]:
+                    missing = store.missing_ids(index_name)
+            if missing:
+                response = self.bulk_actions(
+                    index_name,
+                    ({"op": "delete", "_id": doc_id} for doc_id in missing),
+                    **bulk_params,
+                )
+                result["errors"] = response["errors"]
+
+            if response["acknowledged"]:
+                store.remove(index_name, missing)
+                store.commit()
+                result["acknowledged"] = True
+                deleted = len(missing)
+            else:
+                store.rollback()
+        except Exception:
+            store.rollback()
+            raise
+        finally:
+            if own_store:
+                store.close()
+
+        result.update(
+            {
+                "documents": counts["documents"],
+                "indexed": counts["changed"],
+                "unchanged": counts["documents"] - counts["changed"],
+                "deleted": deleted,
+            }
+        )
+        logging.info(
+            "Synced index '%s': %d indexed, %d unchanged, %d deleted",
+            index_name,
+            result["indexed"],
+            result["unchanged"],
+            result["deleted"],
+        )
+        return result
+
+    def get_documents(  # noqa: WPS211
+        self,
+        index_name: str,
+        ids,
+        batch_size: int = 1000,
+        thread_count: int = 4,
+        source_includes: list = None,
+        source_excludes: list = None,
+        include_missing: bool = False,
+    ) -> Iterator[dict]:
+        """
+        Fetch documents by their ids.
+
+        The ids are consumed lazily and fetched by mget requests of
+        batch_size ids, thread_count requests run concurrently. The documents
+        are yielded in the order of the ids as soon as their batch arrives,
+        at most 2 * thread_count batches are kept in memory.
+
+        Parameters
+        ----------
+        index_name: str
+            Name of the index
+        ids: Iterable
+            Ids of the documents, of any length
+        batch_size: int
+            Number of ids in a request
+        thread_count: int
+            Number of concurrent requests
+        source_includes: list
+            Fields of the _source returned, all when None
+        source_excludes: list
+            Fields of the _source not returned
+        include_missing: bool
+            Yield the documents which were not found too, with "found" False
+        Yields
+        ------
+        dict
+            document with _index, _id, found and _source
+        Raises
+        ------
+        RuntimeError
+            if a mget request fails.
+        """
+        mget_params = {}
+        if source_includes is not None:
+            mget_params["_source_includes"] = source_includes
+        if source_excludes is not None:
+            mget_params["_source_excludes"] = source_excludes
+
+        def fetch(batch: list) -> list:  # noqa: WPS430
+            response = self.client.mget(
+                body={"ids": batch},
+                index=index_name,
+                params=_SEARCH,
+                **mget_params,
+            )
+            return response["docs"]
+
+        def documents(docs: list) -> list:  # noqa: WPS430
+            if include_missing:
+                return docs
+            return [doc for doc in docs if doc.get("found")]
+
+        with ThreadPoolExecutor(max_workers=thread_count) as executor:
+            pending = collections.deque()
+            try:
+                for batch in _batched(ids, batch_size):
+                    pending.append(executor.submit(fetch, batch))
+                    if len(pending) >= 2 * thread_count:
+                        yield from documents(pending.popleft().result())
+                while pending:
+                    yield from documents(pending.popleft().result())
+            except exceptions.OpenSearchException as exc:
+                logging.debug("Failed: '%s'", exc)
+                raise RuntimeError("Fetching documents failed") from exc
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def delete_by_query(  # noqa: WPS211
         self,
-        name: str,
-        mapping: dict = None,
-        settings: dict = None,
+        index_name: str,
+        query: dict,
+        slices: Union[int, str] = "auto",
+        requests_per_second: float = None,
+        conflicts: str = "proceed",
+        max_docs: int = None,
+        refresh: bool = False,
+        poll_interval: float = 5,
+        timeout: float = None,
     ) -> dict:
         """
-        Reindex with a new index mapping.
-
-        When reindexing, a suffix [1, 2] is added to the index name.
-        An index should always be referenced by its name without the suffix
-        (alias).
+        Delete the documents matching the query by a background task.
 
         Parameters
         ----------
-        name: str
-            the name of the index
-        mapping: dict
-            index mapping
-        settings: dict
-            index settings
-
+        index_name: str
+            Name of the index
+        query: dict
+            Query selecting the documents, {"match": {...}}
+        slices: Union[int, str]
+            Number of parallel slices of the task or "auto" (a slice per
+            shard)
+        requests_per_second: float
+            Throttling of the task in documents per second, None for no
+            throttling
+        conflicts: str
+            "proceed" counts the version conflicts, "abort" stops the task
+            on the first conflict
+        max_docs: int
+            Maximal number of deleted documents
+        refresh: bool
+            Refresh the index after the task
+        poll_interval: float
+            Seconds between the task progress checks
+        timeout: float
+            Seconds to wait for the task, None to wait until it completes.
+            The task keeps running after the timeout.
         Returns
         -------
         dict
-            Dictionary with response
+            Dictionary with the task id and its statistics, see
+            _by_query_stats
+        Raises
+        ------
+        RuntimeError
+            if the task can't be started, polled or fails.
         """
-        if not mapping and not settings:
-            logging.warning("Mapping and settings cannot both be empty")
-            return {"acknowledged": False}
-
-        # only reindex when the index already exists
-        if self.index_exists(name) is False:
-            logging.warning("The index does not exist")
-            return {"acknowledged": False}
-
-        # reindexing requires suffix alternation
-        suffix_to_create, suffix_to_delete = 1, 2
-
-        os_mapping = self.client.indices.get_mapping(name).get(name)
-        diffs = _compare_scripts(json.dumps(mapping), json.dumps(os_mapping))
-
-        if diffs is None:
-            logging.warning(
-                "No difference betweeen OS and local source. Terminating reindexing.."
-            )
-            return {"acknowledged": False}
-
-        # check which version is currently in OS (1 or 2)
-        if self.index_exists(name=f"{name}-{suffix_to_create}"):
-            suffix_to_delete, suffix_to_create = (
-                suffix_to_create,
-                suffix_to_delete,
-            )
-
-        index_to_create = f"{name}-{suffix_to_create}"
-        index_to_delete = f"{name}-{suffix_to_delete}"
-
-        # create the new index
-        self.create_index(
-            name=index_to_create, mapping=mapping, settings=settings
-        )
-
-        # move all the documents from the old index to the new index
-        # if it fails, ensure to delete the newly created index and
-        # stick to the old one
-        try:
-            self.client.reindex(
-                {"source": {"index": name}, "dest": {"index": index_to_create}},
-                wait_for_completion=True,
-            )
-
-        except exceptions.RequestError:
-            self.delete_index(name=index_to_create)
-            return {
-                "acknowledged": False,
-                "name": index_to_create,
-                "alias": name,
-            }
-
-        # delete the old index
-        self.delete_index(name=index_to_delete)
-
-        # delete if index without suffix exists
-        if self.index_exists(name=f"{name}"):
-            self.delete_index(name=f"{name}")
-
-        # create alias so we can call the index without the suffix
-        self.client.indices.put_alias(index_to_create, name)
-
-        # extract new settings
-        os_settings = (
-            self.client.indices.get_settings(name)
-            .get(index_to_create, {})
-            .get("settings")
+        return self._run_by_query(
+            self.client.delete_by_query,
+            index_name,
+            {"query": query},
+            slices=slices,
+            requests_per_second=requests_per_second,
+            conflicts=conflicts,
+            max_docs=max_docs,
+            refresh=refresh,
+            poll_interval=poll_interval,
+            timeout=timeout,
         )
 
-        return {
-            "acknowledged": True,
-            "name": index_to_create,
-            "alias": name,
-            "mapping_differences": diffs,
-            "settings": os_settings,
-        }
-
-    def search_index(self, name: str, search_query: dict) -> dict:
+    def update_by_query(  # noqa: WPS211
+        self,
+        index_name: str,
+        query: dict = None,
+        script: dict = None,
+        slices: Union[int, str] = "auto",
+        requests_per_second: float = None,
+        conflicts: str = "proceed",
+        max_docs: int = None,
+        refresh: bool = False,
+        poll_interval: float = 5,
+        timeout: float = None,
+    ) -> dict:
         """
-        Search the index with provided search query.
+        Update the documents matching the query by a background task.
+
+        Without a script the documents are reindexed in place, e.g. to pick
+        up a new field of the mapping.
 
         Parameters
         ----------
-        name: str
-            The name of the index
-        search_query: dict
-            Search query as dictionary {'query': {....}}
+        index_name: str
+            Name of the index
+        query: dict
+            Query selecting the documents, all documents when None
+        script: dict
+            Painless script updating the document,
+            {"source": "ctx._source.age++", "params": {...}}
+        slices: Union[int, str]
+            Number of parallel slices of the task or "auto"
+        requests_per_second: float
+            Throttling of the task in documents per second, None for no
+            throttling
+        conflicts: str
+            "proceed" or "abort", see delete_by_query
+        max_docs: int
+            Maximal number of updated documents
+        refresh: bool
+            Refresh the index after the task
+        poll_interval: float
+            Seconds between the task progress checks
+        timeout: float
+            Seconds to wait for the task, None to wait until it completes.
+            The task keeps running after the timeout.
         Returns
         -------
         dict
-            Dictionary with response
+            Dictionary with the task id and its statistics, see
+            _by_query_stats
+        Raises
+        ------
+        RuntimeError
+            if the task can't be started, polled or fails.
         """
-        return self.client.search(body=search_query, index=name)
+        body = {}
+        if query is not None:
+            body["query"] = query
+        if script is not None:
+            body["script"] = script
+        return self._run_by_query(
+            self.client.update_by_query,
+            index_name,
+            body,
+            slices=slices,
+            requests_per_second=requests_per_second,
+            conflicts=conflicts,
+            max_docs=max_docs,
+            refresh=refresh,
+            poll_interval=poll_interval,
+            timeout=timeout,
+        )
 
-    def add_data_to_index(
+    def _run_by_query(  # noqa: WPS211
         self,
+        api,
         index_name: str,
-        documents: list,
-        id_key: str = None,
-        refresh: bool = False,
+        body: dict,
+        slices: Union[int, str],
+        requests_per_second: float,
+        conflicts: str,
+        max_docs: int,
+        refresh: bool,
+        poll_interval: float,
+        timeout: float,
     ) -> dict:
         """
-        Bulk insert data to index.
+        Start a by query task and poll it until it completes.
+
+        For the parameters see delete_by_query.
 
         Parameters
         ----------
+        api: Callable
+            client.delete_by_query or client.update_by_query
         index_name: str
             Name of the index
-        documents: list
-            Documents in the following format: [{document}, {document}, ...]
-        id_key: str
-            Key from the document used as id for indexing. If None uuid4
-            is created as id.
+        body: dict
+            Request body
+        slices: Union[int, str]
+            Number of slices
+        requests_per_second: float
+            Throttling
+        conflicts: str
+            Conflict handling
+        max_docs: int
+            Maximal number of documents
         refresh: bool
-            Should the shards in OS refresh automatically?
-            True hurts the cluster performance
+            Refresh the index
+        poll_interval: float
+            Seconds between the checks
+        timeout: float
+            Seconds to wait for the task
         Returns
         -------
         dict
-            Dictionary with response
+            Dictionary with the task id and its statistics
         Raises
         ------
         RuntimeError
-            if the helpers.bul call fails.
+            if the task can't be started, polled or fails.
         """
-        logging.info("Creating data in index '%s'...", index_name)
+        api_params = {
+            "slices": slices,
+            "conflicts": conflicts,
+            "refresh": refresh,
+            "wait_for_completion": False,
+        }
+        if requests_per_second is not None:
+            api_params["requests_per_second"] = requests_per_second
+        if max_docs is not None:
+            api_params["max_docs"] = max_docs
+
         try:
-            docs_inserted, _ = helpers.bulk(
-                self.client,
-                _bulk_json_data(
-                    index_name=index_name, documents=documents, id_key=id_key
-                ),
-                refresh=refresh,
-                stats_only=True,
+            task_id = api(
+                index=index_name, body=body, params=_ADMIN, **api_params
+            )["task"]
+        except exceptions.OpenSearchException as e:
+            logging.error("Failed to start the task: %s", e)
+            raise RuntimeError(f"Failed to start the task: {e}") from e
+        logging.info("Started task '%s' in index '%s'", task_id, index_name)
+
+        start = time.monotonic()
+        while True:
+            try:
+                task = self.client.tasks.get(task_id=task_id, params=_ADMIN)
+            except exceptions.OpenSearchException as e:
+                logging.error("Failed to get the task '%s': %s", task_id, e)
+                raise RuntimeError(
+                    f"Failed to get the task '{task_id}': {e}"
+                ) from e
+            stats = _by_query_stats(task)
+            if task.get("completed"):
+                break
+            logging.info(
+                "Task '%s': %d/%d documents, %d version conflicts",
+                task_id,
+                stats["created"] + stats["updated"] + stats["deleted"],
+                stats["total"],
+                stats["version_conflicts"],
+            )
+            if timeout is not None and time.monotonic() - start > timeout:
+                logging.warning("Task '%s' still running", task_id)
+                return {"acknowledged": False, "task": task_id, **stats}
+            time.sleep(poll_interval)
+
+        if "error" in task:
+            logging.error("Task '%s' failed: %s", task_id, task["error"])
+            raise RuntimeError(f"Task '{task_id}' failed: {task['error']}")
+        if stats["failures_count"]:
+            logging.warning(
+                "Task '%s': %d failures", task_id, stats["failures_count"]
             )
-        except Exception as exc:
-            logging.debug("Failed: '%s'", exc)
-            raise RuntimeError("Bulk insert failed") from exc
-
         return {
-            "acknowledged": True,
-            "documents_inserted": docs_inserted,
-            "index": index_name,
+            "acknowledged": not stats["failures_count"],
+            "task": task_id,
+            **stats,
         }
 
     def upload_search_template(
@@ -409,14 +2886,18 @@ class Osman(object):
         query = json.dumps({"source": source, "params": params})
 
         # run search template against the test data
-        result = self.client.search_template(body=query, index=index)
+        result = self.client.search_template(
+            body=query, index=index, params=_SEARCH
+        )
 
         hits_cnt = len(result["hits"]["hits"])
 
         assert hits_cnt >= 1
 
         # check if script already exists in os
-        script_os_res = self.client.get_script(id=name, ignore=[400, 404])
+        script_os_res = self.client.get_script(
+            id=name, ignore=[400, 404], params=_ADMIN
+        )
 
         # if script exists in os, compare it with the local script
         if script_os_res["found"]:
@@ -438,13 +2919,75 @@ class Osman(object):
                     "source": source,
                 }
             },
+            params=_ADMIN,
         )
+        self.render_cache.invalidate(name)
 
         if diffs:
             res["differences"] = diffs
         logging.info("Template updated!")
         return res
 
+    def render_template(
+        self,
+        params: dict,
+        name: str = None,
+        source: Union[dict, str] = None,
+        local: bool = False,
+    ) -> dict:
+        """
+        Render a search template without running the search.
+
+        The rendered bodies are cached by the template and the params, a
+        stored template is rendered again after it is uploaded or deleted.
+        With local the template is rendered by the local mustache renderer,
+        a stored template is fetched once, so rendering many params sets
+        needs no requests.
+
+        Parameters
+        ----------
+        params: dict
+            search template parameters
+        name: str
+            id of a stored search template
+        source: Union[dict, str]
+            source of a search template, instead of name
+        local: bool
+            render by the local mustache renderer
+        Returns
+        -------
+        dict
+            the rendered search body
+        Raises
+        ------
+        ValueError
+            if the template can't be rendered locally.
+        """
+        assert (name is None) != (source is None), "Use either name or source"
+        key = RenderCache.key(name, source, params, local)
+        rendered = self.render_cache.get(key)
+        if rendered is not None:
+            return rendered
+
+        if local:
+            if source is None:
+                source = self.render_cache.sources.get(name)
+            if source is None:
+                script = self.client.get_script(id=name, params=_ADMIN)
+                source = script["script"]["source"]
+                self.render_cache.sources[name] = source
+            rendered = render_mustache(source, params)
+        else:
+            body = {"params": params}
+            if source is not None:
+                body["source"] = source
+            rendered = self.client.render_search_template(
+                id=name, body=body, params=_SEARCH
+            )["template_output"]
+
+        self.render_cache.put(key, rendered)
+        return rendered
+
     def debug_search_template(
         self,
         source: dict,
@@ -477,7 +3020,9 @@ class Osman(object):
         query = json.dumps({"source": source, "params": params})
 
         # run search template against the test data
-        results = self.client.search_template(body=query, index=index)
+        results = self.client.search_template(
+            body=query, index=index, params=_SEARCH
+        )
 
         hits = results["hits"]["hits"]
 
@@ -492,6 +3037,136 @@ class Osman(object):
 
         return hits
 
+    def profile_search_template(  # noqa: WPS211
+        self,
+        index: str,
+        names: Union[str, list],
+        params_grid: Union[dict, list],
+        samples: int = 10,
+        warm_up_samples: int = 1,
+    ) -> dict:
+        """
+        Profile the speed of stored search templates.
+
+        Every template runs with every parameter set of the grid, first the
+        warm-up samples, then once with "profile": true for the per shard
+        breakdown and then the measured samples. The samples run without
+        profiling, which slows the search down, and one at a time.
+
+        Parameters
+        ----------
+        index: str
+            name of the index
+        names: Union[str, list]
+            ids of the stored templates
+        params_grid: Union[dict, list]
+            lists of values by parameter name, all their combinations are
+            profiled, or a list of parameter dictionaries
+        samples: int
+            number of measured samples of a template and parameter set
+        warm_up_samples: int
+            number of samples run before, not measured
+
+        Returns
+        -------
+        dict
+            Dictionary with response, the reports of the templates and
+            parameter sets under "templates", ranked by the p95 of took.
+            took is in milliseconds as reported by OpenSearch, the client
+            side latency in seconds.
+        """
+        assert samples > 0, "samples must be positive"
+        if isinstance(names, str):
+            names = [names]
+
+        reports = [
+            self._profile_template(
+                index, name, params, samples, warm_up_samples
+            )
+            for name in names
+            for params in _params_grid(params_grid)
+        ]
+        reports.sort(
+            key=lambda report: report["took"]["p95"] or 0, reverse=True
+        )
+        return {
+            "acknowledged": not any(report["errors"] for report in reports),
+            "templates": reports,
+        }
+
+    def _profile_template(  # noqa: WPS211
+        self,
+        index: str,
+        name: str,
+        params: dict,
+        samples: int,
+        warm_up_samples: int,
+    ) -> dict:
+        """
+        Profile a stored search template with a parameter set.
+
+        Parameters
+        ----------
+        index: str
+            name of the index
+        name: str
+            id of the stored template
+        params: dict
+            template parameters
+        samples: int
+            number of measured samples
+        warm_up_samples: int
+            number of samples run before, not measured
+
+        Returns
+        -------
+        dict
+            the took and latency percentiles, the profile and the errors
+        """
+        took = LatencyWindow(samples)
+        latency = LatencyWindow(samples)
+        profile = {}
+        errors = []
+        for sample in range(warm_up_samples + 1 + samples):
+            profiled = sample == warm_up_samples
+            body = {"id": name, "params": params}
+            if profiled:
+                body["profile"] = True
+            started = time.perf_counter()
+            try:
+                res = self.client.search_template(
+                    body=body, index=index, params=_SEARCH
+                )
+            except exceptions.TransportError as exc:
+                errors.append(_error_reason(exc))
+                continue
+            seconds = time.perf_counter() - started
+            if profiled:
+                profile = {
+                    "took": res["took"],
+                    "shards": _profile_breakdown(res.get("profile", {})),
+                }
+            elif sample > warm_up_samples:
+                took.add(res["took"])
+                latency.add(seconds)
+
+        if errors:
+            logging.warning(
+                "%d samples of template '%s' failed: %s",
+                len(errors),
+                name,
+                errors[-1],
+            )
+        return {
+            "template": name,
+            "params": params,
+            "samples": len(took),
+            "took": took.summary(),
+            "latency": latency.summary(),
+            "profile": profile,
+            "errors": errors,
+        }
+
     def delete_script(self, name: str) -> dict:
         """
         Delete script.
@@ -506,8 +3181,9 @@ class Osman(object):
         dict
             Dictionary with response
         """
+        self.render_cache.invalidate(name)
         try:
-            res = self.client.delete_script(id=name)
+            res = self.client.delete_script(id=name, params=_ADMIN)
         except exceptions.NotFoundError:
             res = {"acknowledged": False}
 
@@ -529,7 +3205,9 @@ class Osman(object):
             dictionary with response
         """
         # check if script already exists in os
-        script_os_res = self.client.get_script(id=name, ignore=[400, 404])
+        script_os_res = self.client.get_script(
+            id=name, ignore=[400, 404], params=_ADMIN
+        )
 
         # create body to insert into OS
         body = {
@@ -549,7 +3227,9 @@ class Osman(object):
             return {"acknowledged": False}
 
         # upload script
-        res = self.client.put_script(id=name, body={"script": body})
+        res = self.client.put_script(
+            id=name, body={"script": body}, params=_ADMIN
+        )
 
         if diffs:
             res["differences"] = diffs
@@ -577,7 +3257,9 @@ class Osman(object):
             If the update fails or OpenSearch returns an error.
         """
         try:  # noqa: WPS229
-            response = self.client.cluster.put_settings(body=settings)
+            response = self.client.cluster.put_settings(
+                body=settings, params=_ADMIN
+            )
             logging.info("Cluster settings updated successfully.")
             return response
         except exceptions.OpenSearchException as e:
@@ -648,7 +3330,7 @@ class Osman(object):
 
         # send API request to test validity of painless script
         try:
-            res = self.client.scripts_painless_execute(body=body)
+            res = self.client.scripts_painless_execute(body=body, params=_ADMIN)
         except exceptions.RequestError:
             logging.error("Painless script execution failed")
             return {"acknowledged": False}
@@ -660,6 +3342,163 @@ class Osman(object):
 
         return res
 
+    def debug_painless_script_batch(  # noqa: WPS211
+        self,
+        source: str,
+        index: str,
+        context_type: str,
+        cases: list,
+        thread_count: int = 8,
+        tolerance: float = 1e-9,
+    ) -> dict:
+        """
+        Test a painless script on a batch of cases.
+
+        The cases are executed concurrently, thread_count at a time, a
+        failing case doesn't stop the others.
+
+        Parameters
+        ----------
+        source: str
+            painless script to test
+        index: str
+            index name
+        context_type: str
+            context type of the painless script, should be in {'filter', 'score'}
+        cases: list
+            dictionaries with "document", "params" and "expected_result" as
+            in debug_painless_script and an optional "name" of the case
+        thread_count: int
+            number of concurrent requests, keep it below the connection pool
+            size (10)
+        tolerance: float
+            relative and absolute tolerance of score results
+
+        Returns
+        -------
+        dict
+            report with the passed, failed cases and the latency
+            percentiles, per case the result, the error and the seconds took
+        """
+        if context_type not in _PAINLESS_RESULT_TYPES:
+            logging.warning("context_type must be 'filter' or 'score'")
+            return {"acknowledged": False}
+        result_types = _PAINLESS_RESULT_TYPES[context_type]
+
+        def run(number: int, case: dict) -> dict:  # noqa: WPS430
+            expected = case["expected_result"]
+            report = {
+                "case": case.get("name", number),
+                "expected_result": expected,
+            }
+            if not isinstance(expected, result_types):
+                report.update(passed=False, error="Wrong expected_result type")
+                return report
+
+            params = case.get("params") or {}
+            body = {
+                "script": {
+                    "source": source,
+                    "params": params.get("params", {}),
+                },
+                "context": context_type,
+                "context_setup": {"index": index, "document": case["document"]},
+            }
+            started = time.perf_counter()
+            try:
+                res = self.client.scripts_painless_execute(
+                    body=body, params=_ADMIN
+                )
+            except exceptions.TransportError as exc:
+                report.update(passed=False, error=_error_reason(exc))
+            else:
+                result = res.get("result")
+                report["result"] = result
+                report["passed"] = _results_match(result, expected, tolerance)
+            report["took"] = time.perf_counter() - started
+            return report
+
+        with ThreadPoolExecutor(max_workers=thread_count) as executor:
+            reports = list(executor.map(run, itertools.count(), cases))
+
+        failed = [report for report in reports if not report["passed"]]
+        latencies = LatencyWindow(max(len(reports), 1))
+        for report in reports:
+            if "took" in report:
+                latencies.add(report["took"])
+        if failed:
+            logging.warning(
+                "%d of %d painless cases failed", len(failed), len(reports)
+            )
+        return {
+            "acknowledged": not failed,
+            "passed": len(reports) - len(failed),
+            "failed": len(failed),
+            "latency": latencies.summary(),
+            "cases": reports,
+        }
+
+    def performance_snapshot(self, index_name: str = None) -> ClusterSnapshot:
+        """
+        Collect a health and performance snapshot of indices and nodes.
+
+        _stats, _cat/shards, _nodes/stats and _cat/segments are requested
+        concurrently. The counters are totals, the rates between two
+        snapshots are given by snapshot.diff(previous_snapshot).
+
+        Parameters
+        ----------
+        index_name: str
+            name or pattern of the indices, all indices when None
+
+        Returns
+        -------
+        ClusterSnapshot
+            statistics of the indices and of all nodes
+
+        Raises
+        ------
+        RuntimeError
+            if a statistics request fails
+        """
+        requests = {
+            "index_stats": functools.partial(
+                self.client.indices.stats,
+                index=index_name,
+                metric=_SNAPSHOT_INDEX_METRICS,
+            ),
+            "shards": functools.partial(
+                self.client.cat.shards,
+                index=index_name,
+                format="json",
+                bytes="b",
+                h="index,shard,prirep,state,store",
+            ),
+            "node_stats": functools.partial(
+                self.client.nodes.stats, metric=_SNAPSHOT_NODE_METRICS
+            ),
+            "segments": functools.partial(
+                self.client.cat.segments,
+                index=index_name,
+                format="json",
+                h="index,shard,prirep,ip,segment",
+            ),
+        }
+        timestamp = time.time()
+        try:
+            with ThreadPoolExecutor(max_workers=len(requests)) as executor:
+                futures = {
+                    name: executor.submit(request, params=_ADMIN)
+                    for name, request in requests.items()
+                }
+                responses = {
+                    name: future.result() for name, future in futures.items()
+                }
+        except exceptions.OpenSearchException as exc:
+            logging.debug("Failed: '%s'", exc)
+            raise RuntimeError("Collecting the statistics failed") from exc
+        return ClusterSnapshot.from_responses(timestamp, **responses)
+
     def send_post_request(self, endpoint: str, payload: dict) -> dict:
         """
         Send a POST request to a specified endpoint in OpenSearch.
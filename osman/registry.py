@@ -0,0 +1,92 @@
+"""Process-wide registry of shared Osman instances."""
+import json
+import logging
+import os
+import threading
+
+from osman.config import OsmanConfig
+from osman.osman import DEFAULT_HOST_URL, Osman
+
+# Shared instances keyed by the serialized configuration
+_INSTANCES = {}
+_LOCK = threading.Lock()
+
+
+def _config_key(config: OsmanConfig) -> str:
+    """
+    Return a hashable key identifying the configuration.
+
+    OsmanConfig is a mutable dataclass without declared fields, i.e. it is
+    neither hashable nor comparable by value, so the instance attributes
+    are serialized instead.
+
+    Parameters
+    ----------
+    config: OsmanConfig
+        configuration to build the key from
+    Returns
+    -------
+    str
+        json string with sorted instance attributes
+    """
+    return json.dumps(config.__dict__, sort_keys=True, default=repr)
+
+
+def get_osman(config: OsmanConfig = None) -> Osman:
+    """
+    Return a shared Osman instance for the given configuration.
+
+    The first call for a configuration creates the instance (including the
+    OpenSearch client, its connection pool and the startup probe), the
+    following calls with an equal configuration return the same instance.
+    The instance is safe to be shared among threads.
+
+    Parameters
+    ----------
+    config: OsmanConfig
+        Configuration params of the OpenSearch instance, the same default
+        as in Osman is used when None
+    Returns
+    -------
+    Osman
+        shared Osman instance
+    """
+    if not config:
+        config = OsmanConfig(host_url=DEFAULT_HOST_URL)
+
+    key = _config_key(config)
+    with _LOCK:
+        os_man = _INSTANCES.get(key)
+        if os_man is None or os_man.closed:
+            logging.info("Creating shared Osman instance")
+            os_man = Osman(config)
+            _INSTANCES[key] = os_man
+
+    return os_man
+
+
+def close_all():
+    """Close all shared Osman instances and clear the registry."""
+    with _LOCK:
+        instances = list(_INSTANCES.values())
+        _INSTANCES.clear()
+
+    for os_man in instances:
+        os_man.close()
+
+
+def _reset_after_fork():
+    """
+    Forget the instances inherited from the parent process.
+
+    The pooled sockets are shared with the parent, the child must open its
+    own ones. The inherited instances are dropped without closing them so
+    the parent's connections stay intact.
+    """
+    global _LOCK  # noqa: WPS420
+    _LOCK = threading.Lock()
+    _INSTANCES.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,345 @@
+"""
+Replay of logged search traffic for load tests.
+
+The log is a JSON lines file, a line per request:
+{"index": ..., "query": {...}, "timestamp": ...} for a search,
+{"index": ..., "template": id, "params": {...}, "timestamp": ...} for a
+stored search template or {"index": ..., "source": ..., "params": ...} for an
+inline one. The timestamp is in seconds since the epoch or in ISO 8601.
+
+Run: python -m osman.replay LOG [--host URL] [--qps QPS] [--speed SPEED]
+"""
+import argparse
+import collections
+import copy
+import datetime
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from opensearchpy import exceptions
+
+from osman.config import OsmanConfig
+from osman.osman import DEFAULT_HOST_URL, Osman
+from osman.resilience import CircuitBreakerOpenError, LatencyWindow
+from osman.transport import REPLAY_PROFILE
+
+DEFAULT_REPLAY_THREADS = 32
+
+# Error of the requests rejected by an open circuit breaker, never sent
+CIRCUIT_OPEN = "circuit_open"
+
+# Upper bounds of the latency histogram buckets in seconds
+_HISTOGRAM_BOUNDS = (
+    0.001,
+    0.002,
+    0.005,
+    0.01,
+    0.02,
+    0.05,
+    0.1,
+    0.2,
+    0.5,
+    1,
+    2,
+    5,
+    10,
+)
+_REQUEST_KEYS = ("query", "template", "source")
+
+
+def _timestamp(value) -> float:
+    """
+    Convert a logged timestamp to seconds since the epoch.
+
+    Parameters
+    ----------
+    value: Union[int, float, str]
+        seconds since the epoch or ISO 8601 date and time
+    Returns
+    -------
+    float
+        seconds since the epoch
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    if value.endswith("Z"):
+        value = f"{value[:-1]}+00:00"
+    return datetime.datetime.fromisoformat(value).timestamp()
+
+
+def read_log(path: str) -> list:
+    """
+    Read a log of search requests.
+
+    Parameters
+    ----------
+    path: str
+        path of the JSON lines log
+    Returns
+    -------
+    list
+        the logged requests, timestamps converted to seconds
+    Raises
+    ------
+    AssertionError
+        for a line without index or without a query, template or source
+    """
+    entries = []
+    with open(path, mode="r", encoding="utf-8") as log_file:
+        for line_number, line in enumerate(log_file, 1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            assert "index" in entry and any(
+                key in entry for key in _REQUEST_KEYS
+            ), f"Line {line_number}: index and query, template or source needed"
+            if entry.get("timestamp") is not None:
+                entry["timestamp"] = _timestamp(entry["timestamp"])
+            entries.append(entry)
+    return entries
+
+
+def schedule(entries: list, qps: float = None, speed: float = 1.0) -> list:
+    """
+    Compute when the requests are sent.
+
+    Parameters
+    ----------
+    entries: list
+        the logged requests
+    qps: float
+        requests per second, the logged timing is kept when None
+    speed: float
+        speed-up of the logged timing
+    Returns
+    -------
+    list
+        seconds from the start of the replay per request
+    """
+    if qps is not None:
+        assert qps > 0, "qps must be positive"
+        return [number / qps for number in range(len(entries))]
+
+    assert speed > 0, "speed must be positive"
+    assert all(
+        entry.get("timestamp") is not None for entry in entries
+    ), "Timestamps are needed to replay the logged timing, set qps"
+    if not entries:
+        return []
+    first = min(entry["timestamp"] for entry in entries)
+    return [(entry["timestamp"] - first) / speed for entry in entries]
+
+
+def histogram(latencies: list) -> dict:
+    """
+    Count latencies in buckets.
+
+    Parameters
+    ----------
+    latencies: list
+        latencies in seconds
+    Returns
+    -------
+    dict
+        counts by the upper bound of the bucket, "+Inf" for the rest
+    """
+    counts = collections.Counter()
+    for latency in latencies:
+        bound = next(
+            (bound for bound in _HISTOGRAM_BOUNDS if latency <= bound), "+Inf"
+        )
+        counts[str(bound)] += 1
+    return {
+        str(bound): counts[str(bound)] for bound in (*_HISTOGRAM_BOUNDS, "+Inf")
+    }
+
+
+def _label(entry: dict) -> str:
+    """Return the label of a logged request in the report."""
+    if "template" in entry:
+        return f"template:{entry['template']}"
+    if "source" in entry:
+        return "inline_template"
+    return "query"
+
+
+def _send(osman: Osman, entry: dict, scheduled: float) -> tuple:
+    """
+    Send a logged request.
+
+    Parameters
+    ----------
+    osman: Osman
+        the client
+    entry: dict
+        the logged request
+    scheduled: float
+        perf_counter() time the request was scheduled at
+    Returns
+    -------
+    tuple
+        the label, the latency, the response time since scheduled and the
+        error or None, CIRCUIT_OPEN if the request wasn't sent
+    """
+    error = None
+    started = time.perf_counter()
+    try:
+        if "query" in entry:
+            osman.client.search(
+                body=entry["query"],
+                index=entry["index"],
+                params=REPLAY_PROFILE,
+            )
+        else:
+            body = {"params": entry.get("params", {})}
+            if "template" in entry:
+                body["id"] = entry["template"]
+            else:
+                body["source"] = entry["source"]
+            osman.client.search_template(
+                body=body, index=entry["index"], params=REPLAY_PROFILE
+            )
+    except CircuitBreakerOpenError:
+        error = CIRCUIT_OPEN
+    except exceptions.TransportError as exc:
+        status = exc.status_code
+        error = str(status) if isinstance(status, int) else type(exc).__name__
+    finished = time.perf_counter()
+    return _label(entry), finished - started, finished - scheduled, error
+
+
+def _summary(results: list) -> dict:
+    """
+    Summarize the results of requests.
+
+    Parameters
+    ----------
+    results: list
+        results of _send
+    Returns
+    -------
+    dict
+        counts of the requests and errors, latency percentiles of the sent
+        requests. The requests rejected by an open circuit breaker are
+        counted apart, as circuit_open.
+    """
+    latencies = LatencyWindow(max(len(results), 1))
+    errors = collections.Counter()
+    circuit_open = 0
+    for _, latency, _, error in results:
+        if error == CIRCUIT_OPEN:
+            circuit_open += 1
+            continue
+        latencies.add(latency)
+        if error is not None:
+            errors[error] += 1
+    sent = len(results) - circuit_open
+    return {
+        "requests": len(results),
+        "circuit_open": circuit_open,
+        "errors": sum(errors.values()),
+        "error_rate": sum(errors.values()) / max(sent, 1),
+        "errors_by_type": dict(errors),
+        "latency": latencies.summary(),
+    }
+
+
+def replay(
+    config: OsmanConfig,
+    log,
+    qps: float = None,
+    speed: float = 1.0,
+    thread_count: int = DEFAULT_REPLAY_THREADS,
+) -> dict:
+    """
+    Replay logged search requests.
+
+    The requests are sent at their scheduled times whether the previous ones
+    have finished or not, by thread_count threads over as many connections.
+    They are sent once, with the fixed timeout of the config, see the
+    "replay" profile of DEFAULT_PROFILES.
+    Besides the latency of the requests the response time is measured from
+    the scheduled time, it includes the waiting for a free thread when the
+    cluster can't keep up.
+
+    Parameters
+    ----------
+    config: OsmanConfig
+        configuration of the cluster
+    log: Union[str, list]
+        path of the JSON lines log or the logged requests
+    qps: float
+        requests per second, the logged timing is kept when None
+    speed: float
+        speed-up of the logged timing
+    thread_count: int
+        number of concurrent requests
+
+    Returns
+    -------
+    dict
+        the throughput, error rates, latency and response time percentiles
+        and the latency histogram, the summaries by search template under
+        "labels"
+    """
+    entries = read_log(log) if isinstance(log, str) else list(log)
+    offsets = schedule(entries, qps, speed)
+
+    config = copy.copy(config)
+    config.pool_maxsize = max(config.pool_maxsize, thread_count)
+    with Osman(config) as osman:
+        with ThreadPoolExecutor(max_workers=thread_count) as executor:
+            started = time.perf_counter()
+            futures = []
+            for entry, offset in zip(entries, offsets):
+                scheduled = started + offset
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                futures.append(executor.submit(_send, osman, entry, scheduled))
+            results = [future.result() for future in futures]
+        seconds = time.perf_counter() - started
+
+    response_times = LatencyWindow(max(len(results), 1))
+    by_label = collections.defaultdict(list)
+    for result in results:
+        if result[3] != CIRCUIT_OPEN:
+            response_times.add(result[2])
+        by_label[result[0]].append(result)
+    report = _summary(results)
+    report.update(
+        seconds=round(seconds, 3),
+        throughput=len(results) / max(seconds, 1e-3),
+        target_qps=qps,
+        response_time=response_times.summary(),
+        histogram=histogram(
+            [result[1] for result in results if result[3] != CIRCUIT_OPEN]
+        ),
+        labels={label: _summary(items) for label, items in by_label.items()},
+    )
+    return report
+
+
+def main():
+    """Replay a log and print the report."""
+    parser = argparse.ArgumentParser(description="Replay search requests")
+    parser.add_argument("log", help="JSON lines log of the requests")
+    parser.add_argument("--host", default=DEFAULT_HOST_URL)
+    parser.add_argument("--qps", type=float, default=None)
+    parser.add_argument("--speed", type=float, default=1.0)
+    parser.add_argument("--threads", type=int, default=DEFAULT_REPLAY_THREADS)
+    args = parser.parse_args()
+
+    report = replay(
+        OsmanConfig(host_url=args.host),
+        args.log,
+        qps=args.qps,
+        speed=args.speed,
+        thread_count=args.threads,
+    )
+    print(json.dumps(report, indent=2))  # noqa: WPS421
+
+
+if __name__ == "__main__":
+    main()
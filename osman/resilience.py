@@ -0,0 +1,284 @@
+"""Circuit breaker, latency window and retry budget for the transport."""
+import collections
+import random
+import threading
+import time
+
+from opensearchpy import ConnectionError as OpenSearchConnectionError
+
+DEFAULT_CIRCUIT_BREAKER = {
+    # Error rate opening the breaker
+    "error_rate": 0.5,
+    # Minimal number of requests in the window to evaluate the error rate
+    "min_requests": 20,
+    # Sliding window in seconds
+    "window": 30,
+    # Seconds before a probe request is let through an open breaker
+    "reset_timeout": 10,
+}
+
+DEFAULT_ADAPTIVE_TIMEOUT = {
+    # Latency percentile of the recent successful requests
+    "percentile": 99,
+    # The timeout is the percentile multiplied by the multiplier
+    "multiplier": 3,
+    # Lower bound of the timeout in seconds, the configured timeout is the
+    # upper bound
+    "min": 1,
+    # Number of recent requests the percentile is computed from
+    "samples": 100,
+}
+
+_CLOSED = "closed"
+_OPEN = "open"
+_HALF_OPEN = "half_open"
+
+
+class CircuitBreakerOpenError(OpenSearchConnectionError):
+    """Request rejected by an open circuit breaker, nothing was sent."""
+
+
+class CircuitBreaker(object):
+    """
+    Circuit breaker over a sliding window of request outcomes.
+
+    The breaker opens when the error rate in the window crosses the
+    threshold, the requests are rejected while it is open. After
+    reset_timeout a single probe request is let through (half open), its
+    success closes the breaker, its failure opens it again.
+    """
+
+    def __init__(
+        self,
+        error_rate: float = 0.5,
+        min_requests: int = 20,
+        window: float = 30,
+        reset_timeout: float = 10,
+    ):
+        """
+        Init CircuitBreaker.
+
+        Parameters
+        ----------
+        error_rate: float
+            error rate opening the breaker, (0, 1]
+        min_requests: int
+            minimal number of requests in the window to open the breaker
+        window: float
+            length of the sliding window in seconds
+        reset_timeout: float
+            seconds before an open breaker lets a probe request through
+        """
+        self.error_rate = error_rate
+        self.min_requests = min_requests
+        self.window = window
+        self.reset_timeout = reset_timeout
+
+        self.state = _CLOSED
+        self._outcomes = collections.deque()
+        self._failures = 0
+        self._opened_at = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """
+        Check whether a request may be sent.
+
+        Returns
+        -------
+        bool
+            True if the request may be sent
+        """
+        with self._lock:
+            if self.state == _CLOSED:
+                return True
+            if self.state == _OPEN:
+                if time.monotonic() < self._opened_at + self.reset_timeout:
+                    return False
+                self.state = _HALF_OPEN
+                return True
+            # Half open, the probe request is in flight
+            return False
+
+    def record(self, success: bool):
+        """
+        Record the outcome of a request.
+
+        Parameters
+        ----------
+        success: bool
+            False if the request failed
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self.state == _HALF_OPEN:
+                if success:
+                    self._close()
+                else:
+                    self._open(now)
+                return
+
+            self._outcomes.append((now, success))
+            self._failures += int(not success)
+            while self._outcomes and self._outcomes[0][0] < now - self.window:
+                _, old_success = self._outcomes.popleft()
+                self._failures -= int(not old_success)
+
+            requests = len(self._outcomes)
+            if (
+                self.state == _CLOSED
+                and requests >= self.min_requests
+                and self._failures >= self.error_rate * requests
+            ):
+                self._open(now)
+
+    def _open(self, now: float):
+        """Open the breaker."""
+        self.state = _OPEN
+        self._opened_at = now
+
+    def _close(self):
+        """Close the breaker and forget the outcomes."""
+        self.state = _CLOSED
+        self._outcomes.clear()
+        self._failures = 0
+
+
+class LatencyWindow(object):
+    """Latencies of the recent requests."""
+
+    def __init__(self, size: int = 100):
+        """
+        Init LatencyWindow.
+
+        Parameters
+        ----------
+        size: int
+            number of the recent latencies kept
+        """
+        self._latencies = collections.deque(maxlen=size)
+
+    def __len__(self) -> int:
+        """
+        Return the number of kept latencies.
+
+        Returns
+        -------
+        int
+            number of latencies
+        """
+        return len(self._latencies)
+
+    def add(self, latency: float):
+        """
+        Add a latency.
+
+        Parameters
+        ----------
+        latency: float
+            request duration in seconds
+        """
+        self._latencies.append(latency)
+
+    def percentile(self, percentile: float) -> float:
+        """
+        Return the percentile of the kept latencies.
+
+        Parameters
+        ----------
+        percentile: float
+            percentile, [0, 100]
+        Returns
+        -------
+        float
+            the latency percentile or None when there is no latency
+        """
+        latencies = sorted(self._latencies)
+        if not latencies:
+            return None
+        index = round(percentile / 100 * (len(latencies) - 1))
+        return latencies[index]
+
+    def summary(self) -> dict:
+        """
+        Summarize the kept latencies by percentiles.
+
+        Returns
+        -------
+        dict
+            p50, p95, p99 and max latency in seconds, None when there is no
+            latency
+        """
+        return {
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.percentile(100),
+        }
+
+
+class RetryBudget(object):
+    """
+    Limit the retries to a ratio of the requests.
+
+    Every request deposits ratio of a token, every retry withdraws a whole
+    token. The balance is capped by reserve, which also allows a burst of
+    retries after a quiet period. During an outage the retries can't
+    multiply the load of the cluster.
+    """
+
+    def __init__(self, ratio: float = 0.2, reserve: float = 10):
+        """
+        Init RetryBudget.
+
+        Parameters
+        ----------
+        ratio: float
+            retries allowed per request
+        reserve: float
+            maximal balance of the budget
+        """
+        self.ratio = ratio
+        self.reserve = reserve
+        self._balance = reserve
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        """Deposit a request."""
+        with self._lock:
+            self._balance = min(self.reserve, self._balance + self.ratio)
+
+    def withdraw(self) -> bool:
+        """
+        Withdraw a retry.
+
+        Returns
+        -------
+        bool
+            True if the retry is within the budget
+        """
+        with self._lock:
+            if self._balance < 1:
+                return False
+            self._balance -= 1
+            return True
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """
+    Return the delay before a retry, exponential backoff with full jitter.
+
+    Parameters
+    ----------
+    attempt: int
+        number of the failed attempt, starting from 0
+    base: float
+        delay of the first retry in seconds
+    cap: float
+        maximal delay in seconds
+    Returns
+    -------
+    float
+        delay in seconds, uniformly random in [0, min(cap, base * 2^attempt)]
+    """
+    return random.uniform(0, min(cap, base * 2**attempt))  # noqa: S311
@@ -0,0 +1,122 @@
+"""Selection of a cluster node for a request."""
+import random
+
+from opensearchpy.connection_pool import (
+    ConnectionSelector,
+    RandomSelector,
+    RoundRobinSelector,
+)
+from opensearchpy.transport import get_host_info
+
+
+class LeastLatencySelector(ConnectionSelector):
+    """
+    Select a fast live node by its latency moving average.
+
+    Nodes without any finished request are selected first so every node gets
+    measured. Otherwise the faster of two randomly picked nodes is selected
+    (power of two choices). The fastest nodes get most of the requests while
+    the others still get some, so their latency stays up to date and all
+    clients don't pile up on a single node.
+    """
+
+    def select(self, connections: list):
+        """
+        Select a connection.
+
+        Parameters
+        ----------
+        connections: list
+            live OsmanConnection instances
+        Returns
+        -------
+        OsmanConnection
+            the selected connection
+        """
+        unmeasured = [conn for conn in connections if conn.latency is None]
+        if unmeasured:
+            return random.choice(unmeasured)  # noqa: S311
+        if len(connections) == 1:
+            return connections[0]
+
+        first, second = random.sample(connections, 2)
+        return first if first.latency <= second.latency else second
+
+
+class ZoneAwareSelector(ConnectionSelector):
+    """
+    Prefer the live nodes in the caller's availability zone.
+
+    The selection among the preferred nodes is delegated to another
+    selector. Nodes in other zones are used only when no node in the local
+    zone is alive.
+    """
+
+    def __init__(
+        self, opts: dict, selector_class: type = None, local_zone: str = None
+    ):
+        """
+        Init ZoneAwareSelector.
+
+        Parameters
+        ----------
+        opts: dict
+            connection options by connection, see ConnectionSelector
+        selector_class: type
+            selector used to choose among the preferred nodes
+        local_zone: str
+            availability zone of the caller
+        """
+        super().__init__(opts)
+        self.selector = (selector_class or RoundRobinSelector)(opts)
+        self.local_zone = local_zone
+
+    def select(self, connections: list):
+        """
+        Select a connection.
+
+        Parameters
+        ----------
+        connections: list
+            live OsmanConnection instances
+        Returns
+        -------
+        OsmanConnection
+            the selected connection
+        """
+        local = [conn for conn in connections if conn.zone == self.local_zone]
+        return self.selector.select(local or connections)
+
+
+def zone_host_info(node_info: dict, host: dict, zone_attribute: str = "zone"):
+    """
+    Add the availability zone to the connection options of a sniffed node.
+
+    Parameters
+    ----------
+    node_info: dict
+        node information from the nodes info API
+    host: dict
+        connection options (host, port) of the node
+    zone_attribute: str
+        node attribute holding the availability zone
+    Returns
+    -------
+    dict
+        connection options or None when the node should not be used
+    """
+    host = get_host_info(node_info, host)
+    if host is None:
+        return None
+
+    zone = node_info.get("attributes", {}).get(zone_attribute)
+    if zone:
+        host["zone"] = zone
+    return host
+
+
+SELECTORS = {
+    "round_robin": RoundRobinSelector,
+    "random": RandomSelector,
+    "least_latency": LeastLatencySelector,
+}
@@ -0,0 +1,132 @@
+"""Recommendation of the number of shards and replicas of an index."""
+import math
+
+# Shards of 10 to 50 GiB balance the recovery time and the per shard overhead
+DEFAULT_TARGET_SHARD_BYTES = 30 * 2**30
+MIN_SHARD_BYTES = 10 * 2**30
+DEFAULT_MAX_SHARD_DOCS = 200_000_000
+
+# Refresh intervals by the indexed documents per second
+_REFRESH_INTERVALS = ((1000, "1s"), (10000, "10s"))
+_BULK_REFRESH_INTERVAL = "30s"
+
+
+def _refresh_interval(indexing_rate: float) -> str:
+    """
+    Return the refresh interval for an indexing rate.
+
+    Parameters
+    ----------
+    indexing_rate: float
+        expected indexed documents per second, None when unknown
+    Returns
+    -------
+    str
+        the refresh interval
+    """
+    if indexing_rate is None:
+        return _REFRESH_INTERVALS[0][1]
+    for max_rate, interval in _REFRESH_INTERVALS:
+        if indexing_rate < max_rate:
+            return interval
+    return _BULK_REFRESH_INTERVAL
+
+
+def recommend_shards(  # noqa: WPS211
+    document_count: int,
+    document_bytes: float,
+    data_nodes: int = 1,
+    growth: float = 1.0,
+    indexing_rate: float = None,
+    target_shard_bytes: int = DEFAULT_TARGET_SHARD_BYTES,
+    max_shard_docs: int = DEFAULT_MAX_SHARD_DOCS,
+) -> dict:
+    """
+    Recommend the shards, replicas and refresh interval of an index.
+
+    The index gets as few shards as keep them under target_shard_bytes and
+    max_shard_docs, a small index has a single shard whatever the number of
+    nodes. More shards than data nodes are rounded up to a multiple of the
+    data nodes, so every node holds the same number of shards, unless the
+    shards would get smaller than MIN_SHARD_BYTES. A replica is recommended
+    when there is a node for it.
+
+    Parameters
+    ----------
+    document_count: int
+        expected number of documents
+    document_bytes: float
+        stored bytes per document
+    data_nodes: int
+        number of data nodes of the cluster
+    growth: float
+        expected growth of the index over its lifetime, 2 for doubling
+    indexing_rate: float
+        expected indexed documents per second, None when unknown
+    target_shard_bytes: int
+        maximal bytes per shard
+    max_shard_docs: int
+        maximal documents per shard
+    Returns
+    -------
+    dict
+        {"settings": {...}} for create_index and the estimates the
+        recommendation is based on
+    """
+    assert document_count >= 0 and document_bytes >= 0
+    assert data_nodes > 0 and growth > 0
+    expected_docs = math.ceil(document_count * growth)
+    expected_bytes = math.ceil(expected_docs * document_bytes)
+
+    shards = max(
+        1,
+        math.ceil(expected_bytes / target_shard_bytes),
+        math.ceil(expected_docs / max_shard_docs),
+    )
+    balanced = math.ceil(shards / data_nodes) * data_nodes
+    if shards > data_nodes and expected_bytes / balanced >= MIN_SHARD_BYTES:
+        shards = balanced
+
+    return {
+        "settings": {
+            "number_of_shards": shards,
+            "number_of_replicas": min(1, data_nodes - 1),
+            "refresh_interval": _refresh_interval(indexing_rate),
+        },
+        "data_nodes": data_nodes,
+        "document_bytes": document_bytes,
+        "expected_docs": expected_docs,
+        "expected_bytes": expected_bytes,
+        "shard_bytes": math.ceil(expected_bytes / shards),
+    }
+
+
+def _has_setting(settings: dict, name: str) -> bool:
+    """Return whether an index setting is set, flat, dotted or nested."""
+    return (
+        name in settings
+        or f"index.{name}" in settings
+        or name in settings.get("index", {})
+    )
+
+
+def apply_recommendation(settings: dict, recommendation: dict) -> dict:
+    """
+    Add the recommended settings which are not set explicitly.
+
+    Parameters
+    ----------
+    settings: dict
+        {"settings": {...}} of create_index or None
+    recommendation: dict
+        result of recommend_shards
+    Returns
+    -------
+    dict
+        {"settings": {...}} with the recommended settings added
+    """
+    index_settings = dict((settings or {}).get("settings", {}))
+    for name, value in recommendation["settings"].items():
+        if not _has_setting(index_settings, name):
+            index_settings[name] = value
+    return {**(settings or {}), "settings": index_settings}
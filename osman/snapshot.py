@@ -0,0 +1,459 @@
+"""Health and performance snapshots of indices and nodes."""
+import collections
+from dataclasses import dataclass, field
+
+
+def _rate(current: int, previous: int, seconds: float) -> float:
+    """Return the change per second, 0 for a counter reset."""
+    return max(current - previous, 0) / seconds if seconds > 0 else 0.0
+
+
+def _latency(millis: int, previous_millis: int, count: int, previous: int):
+    """Return the mean milliseconds of the operations between snapshots."""
+    operations = count - previous
+    if operations <= 0:
+        return None
+    return max(millis - previous_millis, 0) / operations
+
+
+@dataclass(frozen=True)
+class IndexSnapshot(object):
+    """
+    Statistics of an index, of all its shard copies.
+
+    Attributes
+    ----------
+    name: str
+        name of the index
+    docs: int
+        number of documents of the primaries
+    deleted_docs: int
+        number of deleted documents not yet merged away, of the primaries
+    store_bytes: int
+        size of all shard copies
+    indexing_total: int
+        number of indexed documents since the shards started
+    indexing_millis: int
+        time spent indexing
+    search_total: int
+        number of queries since the shards started
+    search_millis: int
+        time spent in the query phase
+    fetch_total: int
+        number of fetches
+    fetch_millis: int
+        time spent in the fetch phase
+    merges_current: int
+        number of running merges
+    merges_total: int
+        number of finished merges
+    merges_millis: int
+        time spent merging
+    refresh_total: int
+        number of refreshes
+    segments: int
+        number of segments
+    max_shard_segments: int
+        number of segments of the shard copy with the most segments
+    fielddata_bytes: int
+        heap used by fielddata
+    shards: dict
+        number of shard copies by state, e.g. {"STARTED": 2}
+    max_shard_bytes: int
+        size of the largest shard copy
+    """
+
+    name: str
+    docs: int = 0
+    deleted_docs: int = 0
+    store_bytes: int = 0
+    indexing_total: int = 0
+    indexing_millis: int = 0
+    search_total: int = 0
+    search_millis: int = 0
+    fetch_total: int = 0
+    fetch_millis: int = 0
+    merges_current: int = 0
+    merges_total: int = 0
+    merges_millis: int = 0
+    refresh_total: int = 0
+    segments: int = 0
+    max_shard_segments: int = 0
+    fielddata_bytes: int = 0
+    shards: dict = field(default_factory=dict)
+    max_shard_bytes: int = 0
+
+
+@dataclass(frozen=True)
+class NodeSnapshot(object):
+    """
+    Statistics of a node.
+
+    Attributes
+    ----------
+    name: str
+        name of the node
+    heap_used_percent: int
+        used share of the JVM heap
+    heap_used_bytes: int
+        used JVM heap
+    cpu_percent: int
+        recent CPU usage of the node
+    fielddata_bytes: int
+        heap used by fielddata
+    indexing_total: int
+        number of indexed documents
+    indexing_millis: int
+        time spent indexing
+    search_total: int
+        number of queries
+    search_millis: int
+        time spent in the query phase
+    segments: int
+        number of segments on the node
+    thread_pool_queue: dict
+        number of queued tasks by thread pool
+    thread_pool_rejected: dict
+        number of rejected tasks by thread pool since the node started
+    """
+
+    name: str
+    heap_used_percent: int = 0
+    heap_used_bytes: int = 0
+    cpu_percent: int = 0
+    fielddata_bytes: int = 0
+    indexing_total: int = 0
+    indexing_millis: int = 0
+    search_total: int = 0
+    search_millis: int = 0
+    segments: int = 0
+    thread_pool_queue: dict = field(default_factory=dict)
+    thread_pool_rejected: dict = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class IndexRates(object):
+    """
+    Rates of an index between two snapshots.
+
+    Attributes
+    ----------
+    indexing_rate: float
+        indexed documents per second
+    search_rate: float
+        queries per second
+    indexing_latency_ms: float
+        mean time of indexing a document, None without indexing
+    search_latency_ms: float
+        mean time of the query phase, None without queries
+    merge_rate: float
+        finished merges per second
+    refresh_rate: float
+        refreshes per second
+    docs_delta: int
+        change of the number of documents
+    """
+
+    indexing_rate: float
+    search_rate: float
+    indexing_latency_ms: float
+    search_latency_ms: float
+    merge_rate: float
+    refresh_rate: float
+    docs_delta: int
+
+
+@dataclass(frozen=True)
+class NodeRates(object):
+    """
+    Rates of a node between two snapshots.
+
+    Attributes
+    ----------
+    indexing_rate: float
+        indexed documents per second
+    search_rate: float
+        queries per second
+    indexing_latency_ms: float
+        mean time of indexing a document, None without indexing
+    search_latency_ms: float
+        mean time of the query phase, None without queries
+    rejected: dict
+        tasks rejected by thread pool between the snapshots, only the pools
+        with rejections
+    heap_used_percent: int
+        used share of the JVM heap at the later snapshot
+    """
+
+    indexing_rate: float
+    search_rate: float
+    indexing_latency_ms: float
+    search_latency_ms: float
+    rejected: dict
+    heap_used_percent: int
+
+
+@dataclass(frozen=True)
+class SnapshotDiff(object):
+    """
+    Rates between two snapshots.
+
+    Attributes
+    ----------
+    seconds: float
+        time between the snapshots
+    indices: dict
+        IndexRates by index name, of the indices in both snapshots
+    nodes: dict
+        NodeRates by node name, of the nodes in both snapshots
+    """
+
+    seconds: float
+    indices: dict
+    nodes: dict
+
+
+def _index_snapshots(stats: dict, shards: list, segments: list) -> dict:
+    """
+    Build the index snapshots.
+
+    Parameters
+    ----------
+    stats: dict
+        response of _stats
+    shards: list
+        rows of _cat/shards in bytes
+    segments: list
+        rows of _cat/segments
+    Returns
+    -------
+    dict
+        IndexSnapshot by index name
+    """
+    states = collections.defaultdict(collections.Counter)
+    max_shard_bytes = collections.Counter()
+    for shard in shards:
+        states[shard["index"]][shard["state"]] += 1
+        size = int(shard.get("store") or 0)
+        max_shard_bytes[shard["index"]] = max(
+            max_shard_bytes[shard["index"]], size
+        )
+
+    shard_segments = collections.Counter(
+        (
+            segment["index"],
+            segment["shard"],
+            segment["prirep"],
+            segment.get("ip"),
+        )
+        for segment in segments
+    )
+    max_shard_segments = collections.Counter()
+    for (index_name, *_), count in shard_segments.items():
+        max_shard_segments[index_name] = max(
+            max_shard_segments[index_name], count
+        )
+
+    indices = {}
+    for name, index in stats.get("indices", {}).items():
+        primaries, total = index["primaries"], index["total"]
+        indices[name] = IndexSnapshot(
+            name=name,
+            docs=primaries["docs"]["count"],
+            deleted_docs=primaries["docs"]["deleted"],
+            store_bytes=total["store"]["size_in_bytes"],
+            indexing_total=total["indexing"]["index_total"],
+            indexing_millis=total["indexing"]["index_time_in_millis"],
+            search_total=total["search"]["query_total"],
+            search_millis=total["search"]["query_time_in_millis"],
+            fetch_total=total["search"]["fetch_total"],
+            fetch_millis=total["search"]["fetch_time_in_millis"],
+            merges_current=total["merges"]["current"],
+            merges_total=total["merges"]["total"],
+            merges_millis=total["merges"]["total_time_in_millis"],
+            refresh_total=total["refresh"]["total"],
+            segments=total["segments"]["count"],
+            max_shard_segments=max_shard_segments[name],
+            fielddata_bytes=total["fielddata"]["memory_size_in_bytes"],
+            shards=dict(states[name]),
+            max_shard_bytes=max_shard_bytes[name],
+        )
+    return indices
+
+
+def _node_snapshots(stats: dict) -> dict:
+    """
+    Build the node snapshots.
+
+    Parameters
+    ----------
+    stats: dict
+        response of _nodes/stats
+    Returns
+    -------
+    dict
+        NodeSnapshot by node name
+    """
+    nodes = {}
+    for node in stats.get("nodes", {}).values():
+        indices = node.get("indices", {})
+        thread_pools = node.get("thread_pool", {})
+        nodes[node["name"]] = NodeSnapshot(
+            name=node["name"],
+            heap_used_percent=node["jvm"]["mem"]["heap_used_percent"],
+            heap_used_bytes=node["jvm"]["mem"]["heap_used_in_bytes"],
+            cpu_percent=node.get("os", {}).get("cpu", {}).get("percent", 0),
+            fielddata_bytes=indices["fielddata"]["memory_size_in_bytes"],
+            indexing_total=indices["indexing"]["index_total"],
+            indexing_millis=indices["indexing"]["index_time_in_millis"],
+            search_total=indices["search"]["query_total"],
+            search_millis=indices["search"]["query_time_in_millis"],
+            segments=indices["segments"]["count"],
+            thread_pool_queue={
+                name: pool["queue"] for name, pool in thread_pools.items()
+            },
+            thread_pool_rejected={
+                name: pool["rejected"] for name, pool in thread_pools.items()
+            },
+        )
+    return nodes
+
+
+@dataclass(frozen=True)
+class ClusterSnapshot(object):
+    """
+    Health and performance statistics of indices and nodes at a time.
+
+    The counters are totals since the shards or nodes started, diff() of two
+    snapshots gives the rates.
+
+    Attributes
+    ----------
+    timestamp: float
+        seconds since the epoch the statistics were collected at
+    indices: dict
+        IndexSnapshot by index name
+    nodes: dict
+        NodeSnapshot by node name
+    """
+
+    timestamp: float
+    indices: dict
+    nodes: dict
+
+    @classmethod
+    def from_responses(  # noqa: WPS211
+        cls,
+        timestamp: float,
+        index_stats: dict,
+        shards: list,
+        node_stats: dict,
+        segments: list,
+    ) -> "ClusterSnapshot":
+        """
+        Build a snapshot from the statistics APIs.
+
+        Parameters
+        ----------
+        timestamp: float
+            seconds since the epoch the statistics were collected at
+        index_stats: dict
+            response of _stats
+        shards: list
+            rows of _cat/shards, sizes in bytes
+        node_stats: dict
+            response of _nodes/stats
+        segments: list
+            rows of _cat/segments
+        Returns
+        -------
+        ClusterSnapshot
+            the snapshot
+        """
+        return cls(
+            timestamp=timestamp,
+            indices=_index_snapshots(index_stats, shards, segments),
+            nodes=_node_snapshots(node_stats),
+        )
+
+    def diff(self, previous: "ClusterSnapshot") -> SnapshotDiff:
+        """
+        Compute the rates since a previous snapshot.
+
+        Parameters
+        ----------
+        previous: ClusterSnapshot
+            the earlier snapshot
+        Returns
+        -------
+        SnapshotDiff
+            rates of the indices and nodes in both snapshots
+        """
+        seconds = self.timestamp - previous.timestamp
+        indices = {}
+        for name, index in self.indices.items():
+            before = previous.indices.get(name)
+            if before is None:
+                continue
+            indices[name] = IndexRates(
+                indexing_rate=_rate(
+                    index.indexing_total, before.indexing_total, seconds
+                ),
+                search_rate=_rate(
+                    index.search_total, before.search_total, seconds
+                ),
+                indexing_latency_ms=_latency(
+                    index.indexing_millis,
+                    before.indexing_millis,
+                    index.indexing_total,
+                    before.indexing_total,
+                ),
+                search_latency_ms=_latency(
+                    index.search_millis,
+                    before.search_millis,
+                    index.search_total,
+                    before.search_total,
+                ),
+                merge_rate=_rate(
+                    index.merges_total, before.merges_total, seconds
+                ),
+                refresh_rate=_rate(
+                    index.refresh_total, before.refresh_total, seconds
+                ),
+                docs_delta=index.docs - before.docs,
+            )
+
+        nodes = {}
+        for name, node in self.nodes.items():
+            before = previous.nodes.get(name)
+            if before is None:
+                continue
+            rejected = {
+                pool: count - before.thread_pool_rejected.get(pool, 0)
+                for pool, count in node.thread_pool_rejected.items()
+            }
+            nodes[name] = NodeRates(
+                indexing_rate=_rate(
+                    node.indexing_total, before.indexing_total, seconds
+                ),
+                search_rate=_rate(
+                    node.search_total, before.search_total, seconds
+                ),
+                indexing_latency_ms=_latency(
+                    node.indexing_millis,
+                    before.indexing_millis,
+                    node.indexing_total,
+                    before.indexing_total,
+                ),
+                search_latency_ms=_latency(
+                    node.search_millis,
+                    before.search_millis,
+                    node.search_total,
+                    before.search_total,
+                ),
+                rejected={
+                    pool: count for pool, count in rejected.items() if count > 0
+                },
+                heap_used_percent=node.heap_used_percent,
+            )
+        return SnapshotDiff(seconds=seconds, indices=indices, nodes=nodes)
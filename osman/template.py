@@ -0,0 +1,327 @@
+"""Local rendering and caching of mustache search templates."""
+import collections
+import copy
+import json
+import re
+import threading
+import urllib.parse
+from typing import Union
+
+DEFAULT_RENDER_CACHE_SIZE = 1024
+
+# {{{raw}}} or {{name}} with an optional kind of the tag
+_TAG = re.compile(
+    r"\{\{\{\s*(?P<raw>.+?)\s*\}\}\}"
+    + r"|\{\{\s*(?P<kind>[#^/!&=>]?)\s*(?P<name>.*?)\s*\}\}",
+    re.DOTALL,
+)
+_JOIN_DELIMITER = re.compile(r"^join\s+delimiter\s*=\s*'(?P<delimiter>[^']*)'$")
+
+
+def _parse(template: str) -> list:
+    """
+    Parse a mustache template to a tree of nodes.
+
+    Parameters
+    ----------
+    template: str
+        the template
+    Returns
+    -------
+    list
+        text strings, ("var", name, escape) and
+        ("section", name, inverted, children) tuples
+    Raises
+    ------
+    ValueError
+        for unclosed sections and unsupported tags
+    """
+    root = []
+    stack = [("", root)]
+    position = 0
+    for match in _TAG.finditer(template):
+        stack[-1][1].append(template[position : match.start()])
+        position = match.end()
+        if match.group("raw") is not None:
+            stack[-1][1].append(("var", match.group("raw"), False))
+            continue
+        kind, name = match.group("kind"), match.group("name")
+        if kind == "!":
+            continue
+        if kind in {"=", ">"}:
+            raise ValueError(f"Unsupported mustache tag '{{{{{kind}{name}}}}}'")
+        if kind in {"#", "^"}:
+            children = []
+            stack[-1][1].append(("section", name, kind == "^", children))
+            stack.append((name, children))
+        elif kind == "/":
+            if stack[-1][0] != name or len(stack) == 1:
+                raise ValueError(f"Unexpected closing tag '{name}'")
+            stack.pop()
+        else:
+            stack[-1][1].append(("var", name, kind != "&"))
+    if len(stack) > 1:
+        raise ValueError(f"Unclosed section '{stack[-1][0]}'")
+    root.append(template[position:])
+    return root
+
+
+def _lookup(stack: list, name: str):
+    """
+    Look a dotted name up in the context stack.
+
+    Parameters
+    ----------
+    stack: list
+        contexts, the innermost last
+    name: str
+        the name, "." for the current context, list items by index
+    Returns
+    -------
+    Any
+        the value, None when missing
+    """
+    if name == ".":
+        return stack[-1]
+    first, *path = name.split(".")
+    for context in reversed(stack):
+        if isinstance(context, dict) and first in context:
+            value = context[first]
+            break
+    else:
+        return None
+    for key in path:
+        if isinstance(value, dict):
+            value = value.get(key)
+        elif (
+            isinstance(value, list) and key.isdigit() and int(key) < len(value)
+        ):
+            value = value[int(key)]
+        else:
+            return None
+    return value
+
+
+def _to_string(value) -> str:
+    """
+    Convert a value to text as the Java mustache does.
+
+    Parameters
+    ----------
+    value: Any
+        the value
+    Returns
+    -------
+    str
+        the text
+    """
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return str(value).lower()
+    if isinstance(value, list):
+        return "[" + ", ".join(_to_string(item) for item in value) + "]"
+    if isinstance(value, dict):
+        items = (f"{key}={_to_string(item)}" for key, item in value.items())
+        return "{" + ", ".join(items) + "}"
+    return str(value)
+
+
+def _escape(text: str) -> str:
+    """Escape text for a JSON string."""
+    return json.dumps(text, ensure_ascii=False)[1:-1]
+
+
+def _render_nodes(nodes: list, stack: list) -> str:  # noqa: WPS231
+    """
+    Render parsed nodes.
+
+    Parameters
+    ----------
+    nodes: list
+        nodes of _parse
+    stack: list
+        contexts, the innermost last
+    Returns
+    -------
+    str
+        the rendered text
+    """
+    parts = []
+    for node in nodes:
+        if isinstance(node, str):
+            parts.append(node)
+            continue
+        if node[0] == "var":
+            _, name, escape = node
+            text = _to_string(_lookup(stack, name))
+            parts.append(_escape(text) if escape else text)
+            continue
+
+        _, name, inverted, children = node
+        join = _JOIN_DELIMITER.match(name)
+        if not inverted and (name in {"toJson", "join", "url"} or join):
+            inner = _render_nodes(children, stack).strip()
+            if name == "toJson":
+                parts.append(json.dumps(_lookup(stack, inner)))
+            elif name == "url":
+                parts.append(urllib.parse.quote(inner, safe=""))
+            else:
+                delimiter = join.group("delimiter") if join else ","
+                values = _lookup(stack, inner) or []
+                parts.append(
+                    delimiter.join(_to_string(item) for item in values)
+                )
+            continue
+
+        value = _lookup(stack, name)
+        truthy = value not in (None, False) and value != []
+        if inverted:
+            if not truthy:
+                parts.append(_render_nodes(children, stack))
+        elif isinstance(value, list):
+            for item in value:
+                parts.append(_render_nodes(children, [*stack, item]))
+        elif truthy:
+            parts.append(_render_nodes(children, [*stack, value]))
+    return "".join(parts)
+
+
+def render_mustache(source: Union[dict, str], params: dict) -> dict:
+    """
+    Render a search template locally.
+
+    Supports variables, dotted names, sections, inverted sections, comments
+    and the toJson, join and url functions of OpenSearch. Values are JSON
+    escaped unless rendered by {{{name}}} or {{&name}}.
+
+    Parameters
+    ----------
+    source: Union[dict, str]
+        source of the search template
+    params: dict
+        template parameters
+    Returns
+    -------
+    dict
+        the rendered search body, as template_output of _render/template
+    Raises
+    ------
+    ValueError
+        for an unsupported template or when the result is not JSON.
+    """
+    if not isinstance(source, str):
+        source = json.dumps(source)
+    rendered = _render_nodes(_parse(source), [params])
+    try:
+        return json.loads(rendered)
+    except json.JSONDecodeError as exc:
+        raise ValueError(f"Rendered template is not JSON: {rendered}") from exc
+
+
+class RenderCache(object):
+    """
+    Least recently used cache of rendered search templates.
+
+    The entries are keyed by the template id or source, the canonical JSON
+    of the params and the renderer, so a local rendering is never returned
+    for an OpenSearch one or the other way around. The sources of stored
+    templates rendered locally are kept in sources. The entries of a stored
+    template are dropped by invalidate() when the template changes.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_RENDER_CACHE_SIZE):
+        """
+        Init RenderCache.
+
+        Parameters
+        ----------
+        maxsize: int
+            maximal number of rendered bodies kept
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.sources = {}
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(
+        name: str, source: Union[dict, str], params: dict, local: bool = False
+    ) -> tuple:
+        """
+        Return the cache key of a rendering.
+
+        Parameters
+        ----------
+        name: str
+            id of a stored template
+        source: Union[dict, str]
+            source of an inline template
+        params: dict
+            template parameters
+        local: bool
+            rendered by the local mustache renderer
+        Returns
+        -------
+        tuple
+            the key
+        """
+        if source is not None and not isinstance(source, str):
+            source = json.dumps(source, sort_keys=True)
+        canonical = json.dumps(params, sort_keys=True, default=str)
+        return name, source, canonical, local
+
+    def get(self, key: tuple) -> Union[dict, None]:
+        """
+        Return a copy of the cached rendered body.
+
+        Parameters
+        ----------
+        key: tuple
+            the cache key
+        Returns
+        -------
+        Union[dict, None]
+            the rendered body or None
+        """
+        with self._lock:
+            rendered = self._entries.get(key)
+            if rendered is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+        return copy.deepcopy(rendered)
+
+    def put(self, key: tuple, rendered: dict):
+        """
+        Cache a rendered body.
+
+        Parameters
+        ----------
+        key: tuple
+            the cache key
+        rendered: dict
+            the rendered body
+        """
+        with self._lock:
+            self._entries[key] = copy.deepcopy(rendered)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, name: str):
+        """
+        Drop the rendered bodies of a stored template.
+
+        Parameters
+        ----------
+        name: str
+            id of the template
+        """
+        with self._lock:
+            self.sources.pop(name, None)
+            for key in [key for key in self._entries if key[0] == name]:
+                del self._entries[key]
@@ -0,0 +1,282 @@
+"""OpenSearch transport used by Osman."""
+import logging
+import time
+
+from opensearchpy import Transport
+from opensearchpy.exceptions import ConnectionError as OpenSearchConnectionError
+from opensearchpy.exceptions import ConnectionTimeout, TransportError
+
+from osman.connection import OsmanConnection, operation_class
+from osman.resilience import CircuitBreakerOpenError, RetryBudget, backoff_delay
+
+DEFAULT_RETRY_BACKOFF = 0.1
+DEFAULT_RETRY_BACKOFF_MAX = 5
+DEFAULT_RETRY_BUDGET = 0.2
+
+# Query parameter selecting the profile of a request, the transport removes
+# it before the request is sent
+PROFILE_PARAM = "osman_profile"
+# Options of a request profile, the missing ones are taken from the transport:
+# timeout -- request timeout in seconds
+# max_retries -- number of retries
+# retry_on_status -- HTTP statuses which are retried
+# retry_on_timeout -- retry timed out requests
+# adaptive_timeout -- use the adaptive timeout bounded by the profile timeout
+PROFILE_OPTIONS = frozenset(
+    (
+        "timeout",
+        "max_retries",
+        "retry_on_status",
+        "retry_on_timeout",
+        "adaptive_timeout",
+    )
+)
+DEFAULT_PROFILES = {
+    # Searches are idempotent, they may be retried after a timeout
+    "search": {"retry_on_timeout": True, "adaptive_timeout": True},
+    # A whole bulk request rejected with 429 was not applied
+    "bulk": {
+        "timeout": 120,
+        "max_retries": 3,
+        "retry_on_status": (429, 502, 503, 504),
+        "retry_on_timeout": False,
+    },
+    # Quick cluster and index management, the transport defaults
+    "admin": {},
+    "long_running": {
+        "timeout": 3600,
+        "max_retries": 0,
+        "retry_on_timeout": False,
+    },
+    # A failed scroll request may have moved the cursor already, its retry
+    # would return the next page and skip the lost one
+    "scroll": {"max_retries": 0, "retry_on_timeout": False},
+    # Load tests measure the cluster, a retry or a timeout adapted to the
+    # latency would hide the failures and slow requests
+    "replay": {
+        "max_retries": 0,
+        "retry_on_timeout": False,
+        "adaptive_timeout": False,
+    },
+}
+# Options of DEFAULT_PROFILES kept when timeout, max_retries or
+# retry_on_timeout are set in OsmanConfig, the retries could apply a request
+# twice, skip scroll pages or hide failures of a load test
+PINNED_PROFILE_OPTIONS = {
+    "bulk": frozenset(("retry_on_timeout",)),
+    "long_running": frozenset(("max_retries", "retry_on_timeout")),
+    "scroll": frozenset(("max_retries", "retry_on_timeout")),
+    "replay": frozenset(("max_retries", "retry_on_timeout")),
+}
+
+# Query parameters selecting the profiles
+SEARCH_PROFILE = {PROFILE_PARAM: "search"}
+BULK_PROFILE = {PROFILE_PARAM: "bulk"}
+ADMIN_PROFILE = {PROFILE_PARAM: "admin"}
+LONG_RUNNING_PROFILE = {PROFILE_PARAM: "long_running"}
+SCROLL_PROFILE = {PROFILE_PARAM: "scroll"}
+REPLAY_PROFILE = {PROFILE_PARAM: "replay"}
+
+
+class OsmanTransport(Transport):
+    """
+    Transport retrying with exponential backoff, jitter and a retry budget.
+
+    The retries are decided as by Transport, the failed node is marked dead
+    and the request is sent to the next live node. Before a retry the
+    transport sleeps a random delay growing exponentially with the attempt,
+    so clients retrying at the same time don't hit the cluster together. The
+    retries are limited by a budget shared by all requests of the client.
+    Requests rejected by an open circuit breaker are retried on the next
+    node right away, they consume neither a delay nor the budget.
+
+    The timeout and the retries of a request are taken from its profile,
+    selected by the PROFILE_PARAM query parameter, see DEFAULT_PROFILES. The
+    adaptive timeout is used only by the profiles enabling it, the other
+    requests get the profile timeout or the connection timeout.
+    """
+
+    def __init__(
+        self,
+        hosts: list,
+        *args,
+        retry_backoff: float = DEFAULT_RETRY_BACKOFF,
+        retry_backoff_max: float = DEFAULT_RETRY_BACKOFF_MAX,
+        retry_budget: float = DEFAULT_RETRY_BUDGET,
+        profiles: dict = None,
+        **kwargs,
+    ):
+        """
+        Init OsmanTransport.
+
+        Parameters
+        ----------
+        hosts: list
+            hosts of the cluster, see Transport
+        args: list
+            positional arguments of Transport
+        retry_backoff: float
+            delay limit of the first retry in seconds, 0 disables the backoff
+        retry_backoff_max: float
+            maximal delay of a retry in seconds
+        retry_budget: float
+            retries allowed per request, None disables the budget
+        profiles: dict
+            request profiles by name, see PROFILE_OPTIONS
+        kwargs: dict
+            keyword arguments of Transport
+        """
+        self.retry_backoff = retry_backoff
+        self.retry_backoff_max = retry_backoff_max
+        self.profiles = profiles or {}
+        self.retry_budget = None
+        if retry_budget is not None:
+            self.retry_budget = RetryBudget(retry_budget)
+        super().__init__(hosts, *args, **kwargs)
+
+    def perform_request(  # noqa: WPS211, WPS231
+        self,
+        method: str,
+        url: str,
+        params: dict = None,
+        body: dict = None,
+        timeout: float = None,
+        ignore: tuple = (),
+        headers: dict = None,
+    ):
+        """
+        Perform the request on a live node, retry the failed request.
+
+        For the parameters see Transport.perform_request(). The request
+        profile is popped from params.
+
+        Parameters
+        ----------
+        method: str
+            HTTP method
+        url: str
+            request path
+        params: dict
+            query parameters
+        body: dict
+            request body, serialized by the transport
+        timeout: float
+            unused, the timeout is taken from params as by Transport
+        ignore: tuple
+            unused, the ignored statuses are taken from params
+        headers: dict
+            additional request headers
+        Returns
+        -------
+        dict
+            deserialized response, bool for HEAD requests
+        """
+        profile = {}
+        if params and PROFILE_PARAM in params:
+            profile = self.profiles.get(params.pop(PROFILE_PARAM), {})
+        method, params, body, ignore, timeout = self._resolve_request_args(
+            method, params, body
+        )
+        max_retries = profile.get("max_retries", self.max_retries)
+        adaptive_timeout = timeout is None and profile.get("adaptive_timeout")
+        timeout = timeout or profile.get("timeout")
+        if self.retry_budget is not None:
+            self.retry_budget.deposit()
+
+        for attempt in range(max_retries + 1):
+            connection = self.get_connection()
+            # Pass the timeout explicitly, the connection would fall back to
+            # its adaptive timeout
+            request_timeout = timeout or connection.timeout
+            if adaptive_timeout and isinstance(connection, OsmanConnection):
+                request_timeout = connection.request_timeout(
+                    operation_class(url), profile.get("timeout")
+                )
+
+            try:
+                status, headers_response, data = connection.perform_request(
+                    method,
+                    url,
+                    params,
+                    body,
+                    headers=headers,
+                    ignore=ignore,
+                    timeout=request_timeout,
+                )
+            except CircuitBreakerOpenError:
+                # Nothing was sent, try the next node
+                if attempt == max_retries:
+                    raise
+                continue
+            except TransportError as error:
+                if method == "HEAD" and error.status_code == 404:
+                    return False
+                if not self._should_retry(error, profile):
+                    raise
+
+                try:
+                    self.mark_dead(connection)
+                except TransportError:
+                    # Sniffing on the failure can fail too
+                    pass
+                if attempt == max_retries:
+                    raise
+                if (
+                    self.retry_budget is not None
+                    and not self.retry_budget.withdraw()
+                ):
+                    logging.warning("Retry budget exhausted, not retrying")
+                    raise
+                self._backoff(attempt)
+                continue
+
+            self.connection_pool.mark_live(connection)
+            if method == "HEAD":
+                return 200 <= status < 300
+
+            headers_response = {
+                header.lower(): value
+                for header, value in headers_response.items()
+            }
+            if data:
+                data = self.deserializer.loads(
+                    data, headers_response.get("content-type")
+                )
+            return data
+
+    def _should_retry(self, error: TransportError, profile: dict) -> bool:
+        """
+        Check whether the failed request should be retried.
+
+        Parameters
+        ----------
+        error: TransportError
+            error raised by the request
+        profile: dict
+            profile of the request
+        Returns
+        -------
+        bool
+            True if the request should be retried
+        """
+        if isinstance(error, ConnectionTimeout):
+            return profile.get("retry_on_timeout", self.retry_on_timeout)
+        if isinstance(error, OpenSearchConnectionError):
+            return True
+        retry_on_status = profile.get("retry_on_status", self.retry_on_status)
+        return error.status_code in retry_on_status
+
+    def _backoff(self, attempt: int):
+        """
+        Sleep before the retry.
+
+        Parameters
+        ----------
+        attempt: int
+            number of the failed attempt, starting from 0
+        """
+        if self.retry_backoff:
+            delay = backoff_delay(
+                attempt, self.retry_backoff, self.retry_backoff_max
+            )
+            time.sleep(delay)
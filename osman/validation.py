@@ -0,0 +1,346 @@
+"""Client side validation of documents against an index mapping."""
+import math
+
+# Ranges of the integer field types
+_INTEGER_RANGES = {
+    "byte": (-(2**7), 2**7 - 1),
+    "short": (-(2**15), 2**15 - 1),
+    "integer": (-(2**31), 2**31 - 1),
+    "long": (-(2**63), 2**63 - 1),
+    "unsigned_long": (0, 2**64 - 1),
+}
+_FLOAT_TYPES = frozenset(("float", "double", "half_float", "scaled_float"))
+_STRING_TYPES = frozenset(
+    ("keyword", "text", "wildcard", "constant_keyword", "match_only_text")
+)
+_OBJECT_TYPES = frozenset(("object", "nested"))
+_BOOLEAN_STRINGS = {"true": True, "false": False, "": False}
+
+
+class _Field(object):
+    """Compiled mapping of a field."""
+
+    __slots__ = ("check", "properties", "dynamic")
+
+    def __init__(self, check, properties: dict = None, dynamic: str = None):
+        """
+        Init _Field.
+
+        Parameters
+        ----------
+        check: Callable
+            function coercing a value, raises ValueError for a wrong value
+        properties: dict
+            compiled subfields of an object field
+        dynamic: str
+            dynamic mapping setting of an object field
+        """
+        self.check = check
+        self.properties = properties
+        self.dynamic = dynamic
+
+
+def _check_integer(field_type: str, coerce: bool):
+    """Return the check of an integer field."""
+    low, high = _INTEGER_RANGES[field_type]
+
+    def check(value):  # noqa: WPS430
+        if isinstance(value, bool):
+            raise ValueError(f"boolean is not {field_type}")
+        if coerce and isinstance(value, str):
+            value = float(value) if "." in value else int(value)
+        if isinstance(value, float):
+            if not coerce or not math.isfinite(value):
+                raise ValueError(f"{value} is not {field_type}")
+            value = int(value)
+        if not isinstance(value, int):
+            raise ValueError(f"{type(value).__name__} is not {field_type}")
+        if not low <= value <= high:
+            raise ValueError(f"{value} is out of {field_type} range")
+        return value
+
+    return check
+
+
+def _check_float(field_type: str, coerce: bool):
+    """Return the check of a floating point field."""
+
+    def check(value):  # noqa: WPS430
+        if isinstance(value, bool):
+            raise ValueError(f"boolean is not {field_type}")
+        if coerce and isinstance(value, str):
+            value = float(value)
+        if not isinstance(value, (int, float)) or not math.isfinite(value):
+            raise ValueError(f"{value!r} is not {field_type}")
+        return value
+
+    return check
+
+
+def _check_boolean(value):
+    """Check a boolean value."""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value in _BOOLEAN_STRINGS:
+        return _BOOLEAN_STRINGS[value]
+    raise ValueError(f"{value!r} is not boolean")
+
+
+def _check_string(value):
+    """Check a string value, numbers and booleans are indexed as strings."""
+    if isinstance(value, (dict, list)):
+        raise ValueError(f"{type(value).__name__} is not a string")
+    return value
+
+
+def _check_date(value):
+    """Check a date value, a formatted string or epoch milliseconds."""
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise ValueError(f"{value!r} is not a date")
+    return value
+
+
+def _check_object(value):
+    """Check an object value."""
+    if not isinstance(value, dict):
+        raise ValueError(f"{type(value).__name__} is not an object")
+    return value
+
+
+def _check_any(value):
+    """Accept a value of a field type which is not validated."""
+    return value
+
+
+def _compile_field(mapping: dict, coerce: bool, dynamic: str) -> _Field:
+    """
+    Compile the mapping of a field.
+
+    Parameters
+    ----------
+    mapping: dict
+        mapping of the field
+    coerce: bool
+        coerce the values as OpenSearch does, e.g. "5" to 5
+    dynamic: str
+        dynamic setting inherited from the parent object
+    Returns
+    -------
+    _Field
+        compiled field
+    """
+    field_type = mapping.get("type", "object")
+    coerce = mapping.get("coerce", coerce)
+    if field_type in _OBJECT_TYPES or "properties" in mapping:
+        dynamic = str(mapping.get("dynamic", dynamic)).lower()
+        properties = _compile_properties(
+            mapping.get("properties", {}), coerce, dynamic
+        )
+        return _Field(_check_object, properties, dynamic)
+    if field_type in _INTEGER_RANGES:
+        return _Field(_check_integer(field_type, coerce))
+    if field_type in _FLOAT_TYPES:
+        return _Field(_check_float(field_type, coerce))
+    if field_type == "boolean":
+        return _Field(_check_boolean)
+    if field_type in _STRING_TYPES:
+        return _Field(_check_string)
+    if field_type in {"date", "date_nanos"}:
+        return _Field(_check_date)
+    return _Field(_check_any)
+
+
+def _compile_properties(properties: dict, coerce: bool, dynamic: str) -> dict:
+    """
+    Compile the fields of an object.
+
+    Parameters
+    ----------
+    properties: dict
+        mapping properties
+    coerce: bool
+        coerce the values
+    dynamic: str
+        dynamic setting of the object
+    Returns
+    -------
+    dict
+        compiled fields by name
+    """
+    return {
+        name: _compile_field(mapping, coerce, dynamic)
+        for name, mapping in properties.items()
+    }
+
+
+class MappingValidator(object):
+    """
+    Validator of documents compiled from an index mapping.
+
+    The mapping is compiled once into a tree of checks, so validating a
+    document costs a dictionary lookup and a type check per field. Values
+    are coerced as OpenSearch does by default: numeric strings to numbers,
+    fractions of integer fields truncated, "true"/"false" to booleans. The
+    fields missing from the mapping are rejected only by "dynamic": "strict".
+    """
+
+    def __init__(self, mapping: dict, coerce: bool = True):
+        """
+        Init MappingValidator.
+
+        Parameters
+        ----------
+        mapping: dict
+            index mapping, {"mappings": {"properties": {...}}} or its
+            "mappings" part
+        coerce: bool
+            coerce the values, the mapping's coerce setting takes precedence
+        """
+        mapping = mapping.get("mappings", mapping)
+        self.root = _compile_field(
+            {"type": "object", **mapping}, coerce, dynamic="true"
+        )
+
+    @classmethod
+    def from_response(cls, response: dict, coerce: bool = True):
+        """
+        Create the validator from the indices.get_mapping response.
+
+        Parameters
+        ----------
+        response: dict
+            {index_name: {"mappings": {...}}} for a single index
+        coerce: bool
+            coerce the values
+        Returns
+        -------
+        MappingValidator
+            the validator
+        Raises
+        ------
+        ValueError
+            if the response has the mappings of several indices, e.g. of an
+            alias.
+        """
+        if len(response) != 1:
+            raise ValueError(
+                "The mapping of a single index expected, got the mappings of "
+                + ", ".join(sorted(response))
+                + ", validate against a single index, e.g. the write index"
+            )
+        return cls(next(iter(response.values())), coerce=coerce)
+
+    def validate(self, document: dict) -> tuple:
+        """
+        Validate and coerce a document.
+
+        Parameters
+        ----------
+        document: dict
+            document to validate, it is not modified
+        Returns
+        -------
+        tuple
+            the coerced document (a copy when a value was coerced) and the
+            list of errors, the document is valid when it is empty
+        """
+        errors = []
+        document = self._validate_object(self.root, document, "", errors)
+        return document, errors
+
+    def validate_batch(self, documents: list) -> tuple:
+        """
+        Validate a batch of documents.
+
+        Parameters
+        ----------
+        documents: list
+            documents to validate
+        Returns
+        -------
+        tuple
+            list of valid coerced documents and list of rejected
+            {"document": document, "errors": errors}
+        """
+        valid, rejected = [], []
+        for document in documents:
+            coerced, errors = self.validate(document)
+            if errors:
+                rejected.append({"document": document, "errors": errors})
+            else:
+                valid.append(coerced)
+        return valid, rejected
+
+    def _validate_object(  # noqa: WPS231
+        self, field: _Field, value: dict, path: str, errors: list
+    ) -> dict:
+        """
+        Validate the fields of an object.
+
+        Parameters
+        ----------
+        field: _Field
+            compiled object field
+        value: dict
+            the object
+        path: str
+            path of the object in the document
+        errors: list
+            list the errors are appended to
+        Returns
+        -------
+        dict
+            the object, a copy when a value was coerced
+        """
+        coerced = value
+        for name, item in value.items():
+            subfield = field.properties.get(name)
+            item_path = f"{path}{name}"
+            if subfield is None:
+                if field.dynamic == "strict":
+                    errors.append(f"{item_path}: field not in the mapping")
+                continue
+            new_item = self._validate_value(subfield, item, item_path, errors)
+            if new_item is not item:
+                if coerced is value:
+                    coerced = dict(value)
+                coerced[name] = new_item
+        return coerced
+
+    def _validate_value(self, field: _Field, value, path: str, errors: list):
+        """
+        Validate a value, an array of values or an object.
+
+        Parameters
+        ----------
+        field: _Field
+            compiled field
+        value: Any
+            value of the field
+        path: str
+            path of the field in the document
+        errors: list
+            list the errors are appended to
+        Returns
+        -------
+        Any
+            the coerced value
+        """
+        if value is None:
+            return value
+        if isinstance(value, list):
+            coerced = [
+                self._validate_value(field, item, path, errors)
+                for item in value
+            ]
+            if all(new is old for new, old in zip(coerced, value)):
+                return value
+            return coerced
+        try:
+            value = field.check(value)
+        except ValueError as exc:
+            errors.append(f"{path}: {exc}")
+            return value
+        if field.properties is not None:
+            return self._validate_object(field, value, f"{path}.", errors)
+        return value
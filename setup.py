@@ -48,6 +48,9 @@ setup(
         "requests-aws4auth>=1.1",
         "deepdiff>=6.2",
     ],
+    extras_require={
+        "dataframe": ["pandas>=1.5", "pyarrow>=10.0"],
+    },
     python_requires=">=3.10",
     include_package_data=True,
 )
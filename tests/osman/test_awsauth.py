@@ -0,0 +1,94 @@
+"""Tests for the AWS SigV4 request signer."""
+import requests
+from requests_aws4auth import AWS4Auth
+
+from osman.awsauth import (
+    AWSCredentials,
+    EnvCredentialsProvider,
+    FileCredentialsProvider,
+    RefreshingAWS4Auth,
+    StaticCredentialsProvider,
+)
+
+REGION = "eu-west-1"
+SERVICE = "es"
+CREDENTIALS = AWSCredentials("access_key", "secret_key")
+
+
+def prepare_request() -> requests.PreparedRequest:
+    """Return a request with a fixed date."""
+    return requests.Request(
+        "POST",
+        "https://example.com/index/_search?size=10",
+        headers={"x-amz-date": "20240102T030405Z"},
+        data=b'{"query": {"match_all": {}}}',
+    ).prepare()
+
+
+def test_signature_equals_aws4auth():
+    """Cached signing keys should produce the reference signature."""
+    auth = RefreshingAWS4Auth(
+        StaticCredentialsProvider(CREDENTIALS), REGION, SERVICE
+    )
+    reference = AWS4Auth("access_key", "secret_key", REGION, SERVICE)
+
+    signed = auth(prepare_request())
+    expected = reference(prepare_request())
+    assert signed.headers["Authorization"] == expected.headers["Authorization"]
+
+    # The second request is signed by the cached key
+    signed = auth(prepare_request())
+    assert signed.headers["Authorization"] == expected.headers["Authorization"]
+    assert len(auth._signing_keys) == 1  # noqa: WPS437
+
+
+def test_session_token_header():
+    """Session token of temporary credentials should be sent and signed."""
+    auth = RefreshingAWS4Auth(
+        StaticCredentialsProvider(
+            AWSCredentials("access_key", "secret_key", "token")
+        ),
+        REGION,
+        SERVICE,
+    )
+    signed = auth(prepare_request())
+    assert signed.headers["x-amz-security-token"] == "token"
+    assert "x-amz-security-token" in signed.headers["Authorization"]
+
+
+def test_refresh_from_environment(monkeypatch):
+    """Rotated credentials should be used after refresh."""
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "access_key")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "secret_key")
+    auth = RefreshingAWS4Auth(EnvCredentialsProvider(), REGION, SERVICE)
+    assert auth.credentials == CREDENTIALS
+
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "access_key2")
+    monkeypatch.setenv("AWS_SESSION_TOKEN", "token2")
+    assert auth.refresh()
+    assert auth.credentials.access_key_id == "access_key2"
+    signed = auth(prepare_request())
+    assert "Credential=access_key2/" in signed.headers["Authorization"]
+
+    # Failed refresh keeps the last credentials
+    monkeypatch.delenv("AWS_ACCESS_KEY_ID")
+    assert not auth.refresh()
+    assert auth.credentials.access_key_id == "access_key2"
+
+
+def test_file_provider(tmp_path):
+    """Credentials should be read from the given profile."""
+    credentials_file = tmp_path / "credentials"
+    credentials_file.write_text(
+        "[default]\n"
+        + "aws_access_key_id = access_key\n"
+        + "aws_secret_access_key = secret_key\n"
+        + "[temporary]\n"
+        + "aws_access_key_id = access_key2\n"
+        + "aws_secret_access_key = secret_key2\n"
+        + "aws_session_token = token2\n"
+    )
+    assert FileCredentialsProvider(str(credentials_file)).load() == CREDENTIALS
+    assert FileCredentialsProvider(
+        str(credentials_file), "temporary"
+    ).load() == AWSCredentials("access_key2", "secret_key2", "token2")
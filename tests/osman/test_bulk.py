@@ -0,0 +1,177 @@
+"""Tests for the bulk action helpers."""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from osman.osman import (
+    _bulk_actions,
+    _bulk_json_data,
+    _check_transform,
+    _copy_actions,
+    _merge_bulk_results,
+)
+from osman.validation import MappingValidator
+
+
+def test_bulk_actions_conversion():
+    """Osman actions should be converted to opensearchpy bulk actions."""
+    actions = [
+        {"doc": {"id": 1, "age": 10}},
+        {"op": "update", "_id": 2, "doc": {"age": 20}, "retry_on_conflict": 3},
+        {"op": "upsert", "doc": {"id": 3, "age": 30}},
+        {"op": "script", "_id": 4, "script": {"source": "x"}, "upsert": {}},
+        {"op": "delete", "_id": 5},
+    ]
+    assert list(_bulk_actions("index", actions, id_key="id")) == [
+        {"_index": "index", "_id": 1, "_source": {"id": 1, "age": 10}},
+        {
+            "_index": "index",
+            "_id": 2,
+            "_op_type": "update",
+            "doc": {"age": 20},
+            "retry_on_conflict": 3,
+        },
+        {
+            "_index": "index",
+            "_id": 3,
+            "_op_type": "update",
+            "doc": {"id": 3, "age": 30},
+            "doc_as_upsert": True,
+        },
+        {
+            "_index": "index",
+            "_id": 4,
+            "_op_type": "update",
+            "script": {"source": "x"},
+            "upsert": {},
+        },
+        {"_index": "index", "_id": 5, "_op_type": "delete"},
+    ]
+
+
+@pytest.mark.parametrize(
+    "action",
+    [{"op": "delete"}, {"op": "update", "doc": {"age": 1}}, {"op": "move"}],
+)
+def test_bulk_actions_wrong(action: dict):
+    """Actions without an id or with unknown operation should fail."""
+    with pytest.raises(ValueError):
+        list(_bulk_actions("index", [action]))
+
+
+def _double(source: dict):
+    """Double the age of a document, drop the documents without age."""
+    if "age" not in source:
+        return None
+    return {"age": source["age"] * 2}
+
+
+@pytest.mark.parametrize("use_pool", [False, True])
+def test_copy_actions(use_pool: bool):
+    """Hits should be transformed to index actions in the order of hits."""
+    hits = [{"_id": str(i), "_source": {"age": i}} for i in range(7)]
+    hits[3] = {"_id": "3", "_source": {}, "_routing": "r"}
+    hits[4]["_routing"] = "r"
+    with ThreadPoolExecutor(2) as pool:
+        actions = list(
+            _copy_actions(
+                hits, "new", _double, pool if use_pool else None, batch_size=2
+            )
+        )
+    assert [action["_id"] for action in actions] == [
+        "0",
+        "1",
+        "2",
+        "4",
+        "5",
+        "6",
+    ]
+    assert actions[3] == {
+        "_index": "new",
+        "_id": "4",
+        "_source": {"age": 8},
+        "_routing": "r",
+    }
+    assert list(_copy_actions(hits[:1], "new")) == [
+        {"_index": "new", "_id": "0", "_source": {"age": 0}}
+    ]
+
+
+def test_merge_bulk_results():
+    """Bulk responses of slices should be summed."""
+    results = [
+        {"succeeded": 2, "failed": 0, "results": {"created": 2}, "errors": []},
+        {
+            "succeeded": 1,
+            "failed": 2,
+            "results": {"created": 1},
+            "errors": [{"index": {}}, {"index": {}}],
+        },
+    ]
+    assert _merge_bulk_results(results, max_errors=1) == {
+        "acknowledged": False,
+        "succeeded": 3,
+        "failed": 2,
+        "results": {"created": 3},
+        "errors": [{"index": {}}],
+    }
+
+
+def test_check_transform():
+    """Transform which can't be sent to the processes should be rejected."""
+    _check_transform(str.upper)
+    with pytest.raises(RuntimeError):
+        _check_transform(lambda source: source)
+
+
+def _missing_key(source: dict):
+    """Fail on every document."""
+    return source["missing"]
+
+
+@pytest.mark.parametrize("use_pool", [False, True])
+def test_copy_actions_transform_error(use_pool: bool):
+    """Failed transform should raise a RuntimeError."""
+    hits = [{"_id": "1", "_source": {"age": 1}}]
+    with ThreadPoolExecutor(1) as pool:
+        actions = _copy_actions(
+            hits, "new", _missing_key, pool if use_pool else None
+        )
+        with pytest.raises(RuntimeError) as error:
+            list(actions)
+    assert isinstance(error.value.__cause__, KeyError)
+
+
+def test_bulk_json_data_rejected():
+    """Rejected documents should be reported as given, up to the limit."""
+    validator = MappingValidator(
+        {
+            "mappings": {
+                "properties": {
+                    "id": {"type": "integer"},
+                    "age": {"type": "integer"},
+                }
+            }
+        }
+    )
+    documents = [{"id": 1, "age": "1", "bad": [1]}] + [
+        {"id": str(number), "age": "x"} for number in range(2, 5)
+    ]
+    rejected = {"count": 0, "documents": []}
+    actions = list(
+        _bulk_json_data(
+            "index", documents, "id", validator, rejected, max_rejected=2
+        )
+    )
+    assert actions == [
+        {
+            "_index": "index",
+            "_id": 1,
+            "_source": {"id": 1, "age": 1, "bad": [1]},
+        }
+    ]
+    assert rejected["count"] == 3
+    assert [item["document"] for item in rejected["documents"]] == [
+        {"id": "2", "age": "x"},
+        {"id": "3", "age": "x"},
+    ]
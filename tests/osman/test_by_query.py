@@ -0,0 +1,26 @@
+"""Tests for the by query tasks."""
+from unittest import mock
+
+import pytest
+from opensearchpy import exceptions
+
+from osman.osman import Osman
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        exceptions.NotFoundError(404, "resource_not_found_exception", {}),
+        exceptions.ConnectionError("N/A", "connection refused", None),
+    ],
+)
+def test_delete_by_query_polling_error(error: Exception):
+    """Failed polling should raise a RuntimeError with the task id."""
+    osman = Osman.__new__(Osman)
+    osman.client = mock.Mock()
+    osman.client.delete_by_query.return_value = {"task": "node:1"}
+    osman.client.tasks.get.side_effect = error
+
+    with pytest.raises(RuntimeError, match="node:1") as raised:
+        osman.delete_by_query("index", {"match_all": {}})
+    assert raised.value.__cause__ is error
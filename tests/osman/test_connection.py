@@ -0,0 +1,68 @@
+"""Tests for the OpenSearch connection."""
+import gzip
+
+import pytest
+
+from osman.connection import OsmanConnection, operation_class
+
+
+def test_connection_latency_ewma():
+    """Latency should be an exponentially weighted moving average."""
+    connection = OsmanConnection(
+        host="node", host_zones={"node": "zone-a"}, latency_ewma_alpha=0.5
+    )
+    assert connection.zone == "zone-a"
+    assert connection.latency is None
+
+    connection._record_latency(1.0)  # noqa: WPS437
+    assert connection.latency == 1.0
+    connection._record_latency(3.0)  # noqa: WPS437
+    assert connection.latency == 2.0
+
+
+@pytest.mark.parametrize(
+    "url, expected",
+    [
+        ("/_bulk", "bulk"),
+        ("/index/_bulk?refresh=true", "bulk"),
+        ("/index/_search", "search"),
+        ("/index/_search/template", "search"),
+        ("/_msearch", "search"),
+        ("/index/_settings", "default"),
+        ("/_cluster/settings", "default"),
+    ],
+)
+def test_operation_class(url: str, expected: str):
+    """Requests should be classified by their endpoint."""
+    assert operation_class(url) == expected
+
+
+@pytest.mark.parametrize(
+    "policy, body, expected_encoding, expected_accept",
+    [
+        ("off", b"x" * 100, None, None),
+        ("always", b"x" * 100, "gzip", "gzip,deflate"),
+        ("auto", b"x" * 100, None, "gzip,deflate"),
+        ("auto", b"x" * 1000, "gzip", "gzip,deflate"),
+        ("always", None, None, "gzip,deflate"),
+    ],
+)
+def test_compression_policy(
+    policy: str, body: bytes, expected_encoding: str, expected_accept: str
+):
+    """Request body should be compressed according to the policy."""
+    connection = OsmanConnection(
+        host="node",
+        compression={"bulk": policy},
+        compression_threshold=500,
+        compression_level=5,
+    )
+    headers = {}
+    sent_body = connection._compress("bulk", body, headers)  # noqa: WPS437
+
+    assert headers.get("content-encoding") == expected_encoding
+    assert headers.get("accept-encoding") == expected_accept
+    if expected_encoding:
+        assert gzip.decompress(sent_body) == body
+    else:
+        assert sent_body is body
@@ -0,0 +1,109 @@
+"""Tests for the DataFrame and Arrow conversions."""
+import json
+
+import pytest
+
+from osman.dataframe import (
+    bulk_ndjson,
+    convert_columns,
+    hits_columns,
+    raw_action,
+    record_batches,
+)
+
+pa = pytest.importorskip("pyarrow")
+pd = pytest.importorskip("pandas")
+pq = pytest.importorskip("pyarrow.parquet")
+
+DATAFRAME = pd.DataFrame(
+    {
+        "id": [1, 2, 3],
+        "name": ["james", "lordos", None],
+        "age": [10.5, float("nan"), 30],
+        "born": pd.to_datetime(["2000-01-01", "2001-02-03", "2002-03-04"]),
+    }
+)
+
+
+def _actions(data, **kwargs):
+    """Return the bulk actions of the data decoded from JSON."""
+    return [
+        (json.loads(action), json.loads(document))
+        for action, document in bulk_ndjson(
+            record_batches(data, batch_size=2), "index", **kwargs
+        )
+    ]
+
+
+def test_bulk_ndjson():
+    """DataFrame rows should be serialized to index actions."""
+    actions = _actions(DATAFRAME, id_key="id")
+    assert [action for action, _ in actions] == [
+        {"index": {"_index": "index", "_id": str(doc_id)}}
+        for doc_id in (1, 2, 3)
+    ]
+    assert actions[0][1] == {
+        "id": 1,
+        "name": "james",
+        "age": 10.5,
+        "born": "2000-01-01T00:00:00.000",
+    }
+    assert actions[1][1]["age"] is None
+    assert actions[2][1]["name"] is None
+
+
+def test_bulk_ndjson_without_id():
+    """The ids should be left to OpenSearch without id_key."""
+    actions = _actions(pa.Table.from_pandas(DATAFRAME), id_key=None)
+    assert len(actions) == 3
+    assert all(
+        action == {"index": {"_index": "index"}} for action, _ in actions
+    )
+    assert raw_action(("a", "b")) == ("a", "b")
+
+
+def test_record_batches(tmp_path):
+    """Parquet files and record batches should be read in batches."""
+    path = str(tmp_path / "documents.parquet")
+    pq.write_table(pa.Table.from_pandas(DATAFRAME, preserve_index=False), path)
+    batches = list(record_batches(path, batch_size=2))
+    assert [batch.num_rows for batch in batches] == [2, 1]
+    assert _actions(path, id_key="id") == _actions(DATAFRAME, id_key="id")
+
+    batch = pa.RecordBatch.from_pandas(DATAFRAME, preserve_index=False)
+    assert [len(batch) for batch in record_batches(batch, 2)] == [2, 1]
+    with pytest.raises(TypeError):
+        list(record_batches([{"id": 1}]))
+
+
+HITS = [
+    {"_id": "1", "_score": 1.5, "_source": {"name": "james", "o": {"a": 1}}},
+    {"_id": "2", "_score": 0.5, "_source": {"age": 20, "o.a": 2}},
+]
+
+
+def test_hits_columns():
+    """Hits should be converted to columns with None for missing values."""
+    assert hits_columns(HITS, ["age", "o.a", "o.b"]) == {
+        "_id": ["1", "2"],
+        "_score": [1.5, 0.5],
+        "age": [None, 20],
+        "o.a": [1, 2],
+        "o.b": [None, None],
+    }
+    columns = hits_columns(HITS)
+    assert list(columns) == ["_id", "_score", "name", "o", "age", "o.a"]
+    assert hits_columns([], ["age"]) == {"_id": [], "_score": [], "age": []}
+
+
+def test_convert_columns():
+    """Columns should be converted to Arrow tables and DataFrames."""
+    columns = hits_columns(HITS, ["age"])
+    assert convert_columns(columns, "columns") is columns
+    table = convert_columns(columns, "arrow")
+    assert table.column_names == ["_id", "_score", "age"]
+    assert table.column("age").to_pylist() == [None, 20]
+    df = convert_columns(columns, "pandas")
+    assert df["_id"].tolist() == ["1", "2"]
+    with pytest.raises(AssertionError):
+        convert_columns(columns, "csv")
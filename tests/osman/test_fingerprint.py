@@ -0,0 +1,81 @@
+"""Tests for the document fingerprint store."""
+from unittest import mock
+
+from osman.fingerprint import FingerprintStore, fingerprint
+from osman.osman import Osman
+
+DOCUMENTS = [
+    {"id": 1, "name": "james"},
+    {"id": 2, "name": "lordos"},
+    {"id": 3, "name": "fred"},
+]
+
+
+def test_fingerprint():
+    """Fingerprint should not depend on the order of the keys."""
+    assert fingerprint({"a": 1, "b": [1, 2]}) == fingerprint(
+        {"b": [1, 2], "a": 1}
+    )
+    assert fingerprint({"a": 1}) != fingerprint({"a": "1"})
+
+
+def test_fingerprint_store(tmp_path):
+    """Only changed documents should be yielded after a commit."""
+    path = str(tmp_path / "fingerprints.sqlite")
+    with FingerprintStore(path) as store:
+        changed = store.changed_documents("index", DOCUMENTS, "id")
+        assert list(changed) == DOCUMENTS
+        assert store.missing_ids("index") == []
+        store.commit()
+
+    documents = [{"id": 1, "name": "carlos"}, DOCUMENTS[1]]
+    with FingerprintStore(path) as store:
+        changed = store.changed_documents("index", documents, "id")
+        assert list(changed) == [{"id": 1, "name": "carlos"}]
+        assert store.missing_ids("index") == ["3"]
+        store.remove("index", ["3"])
+        store.commit()
+
+        changed = store.changed_documents("index", documents, "id")
+        assert list(changed) == []
+        assert store.missing_ids("index") == []
+        # Other indices are independent
+        assert list(store.changed_documents("other", documents, "id"))
+
+
+def test_fingerprint_store_rollback(tmp_path):
+    """Rolled back documents should be yielded again."""
+    with FingerprintStore(str(tmp_path / "fingerprints.sqlite")) as store:
+        assert len(list(store.changed_documents("index", DOCUMENTS, "id")))
+        store.rollback()
+        assert len(list(store.changed_documents("index", DOCUMENTS, "id")))
+
+
+def test_sync_failed_indexing(tmp_path):
+    """Failed indexing should skip the deletes and report none."""
+    path = str(tmp_path / "fingerprints.sqlite")
+    osman = Osman.__new__(Osman)
+    calls = []
+
+    def bulk_actions(index_name, actions, **kwargs):
+        calls.append(list(actions))
+        return {"acknowledged": acknowledged, "errors": []}
+
+    acknowledged = True
+    with mock.patch.object(osman, "bulk_actions", side_effect=bulk_actions):
+        osman.sync_data_to_index("index", DOCUMENTS, "id", path)
+        documents = [{"id": 1, "name": "carlos"}]
+
+        acknowledged = False
+        result = osman.sync_data_to_index("index", documents, "id", path)
+        assert result["acknowledged"] is False
+        assert result["deleted"] == 0
+        assert len(calls) == 2
+
+        acknowledged = True
+        result = osman.sync_data_to_index("index", documents, "id", path)
+        assert result["deleted"] == 2
+        assert calls[-1] == [
+            {"op": "delete", "_id": "2"},
+            {"op": "delete", "_id": "3"},
+        ]
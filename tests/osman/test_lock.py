@@ -0,0 +1,43 @@
+"""Tests for the renewal and release of the reindex lock."""
+import threading
+from unittest import mock
+
+from opensearchpy import exceptions
+
+from osman.osman import Osman
+
+
+def _osman(owners: list) -> Osman:
+    """Return an Osman whose lock document has the owners in turn."""
+    osman = Osman.__new__(Osman)
+    osman._lock_writes = threading.Lock()  # noqa: WPS437
+    osman.client = mock.Mock()
+    osman.client.get.side_effect = [
+        {"_source": {"owner": owner}, "_seq_no": seq_no, "_primary_term": 1}
+        for seq_no, owner in enumerate(owners)
+    ]
+    return osman
+
+
+def test_renew_lock_conflict():
+    """Conflicting write of the same owner should be retried."""
+    osman = _osman(["me", "me"])
+    osman.client.index.side_effect = [
+        exceptions.ConflictError(409, "version_conflict", {}),
+        {"result": "updated"},
+    ]
+    assert osman._renew_lock("index", "me")  # noqa: WPS437
+    assert osman.client.index.call_args.kwargs["if_seq_no"] == 1
+
+
+def test_release_lock_taken_over():
+    """Lock should be taken over only when its owner changed."""
+    osman = _osman(["me", "other"])
+    osman.client.delete.side_effect = exceptions.ConflictError(
+        409, "version_conflict", {}
+    )
+    assert osman._release_lock("index", "me") is False  # noqa: WPS437
+    assert osman.client.delete.call_count == 1
+
+    osman = _osman(["me"])
+    assert osman._release_lock("index", "me")  # noqa: WPS437
@@ -0,0 +1,42 @@
+"""Tests for the migration helpers."""
+from osman.migration import _index_settings, _MigrationState
+
+
+def test_index_settings():
+    """Settings generated by the cluster should be removed."""
+    settings = {
+        "index": {
+            "number_of_shards": "2",
+            "number_of_replicas": "1",
+            "analysis": {"analyzer": {}},
+            "uuid": "x",
+            "creation_date": "1",
+            "provided_name": "index",
+            "version": {"created": "1"},
+        }
+    }
+    assert _index_settings(settings) == {
+        "number_of_shards": "2",
+        "number_of_replicas": "1",
+        "analysis": {"analyzer": {}},
+    }
+
+
+def test_migration_state(tmp_path):
+    """The copied slices should be kept in the state file."""
+    path = str(tmp_path / "state.json")
+    state = _MigrationState(path)
+    assert state.index("index") == {}
+    state.update("index", slices=4, copied=[], done=False)
+    state.add_slice("index", 2)
+    state.add_slice("index", 0)
+
+    state = _MigrationState(path)
+    assert state.index("index") == {
+        "slices": 4,
+        "copied": [2, 0],
+        "done": False,
+    }
+    state.update("index", done=True)
+    assert _MigrationState(path).index("index")["done"]
+    assert _MigrationState().index("index") == {}
@@ -1,14 +1,18 @@
 """Test Osman class initialization."""
+import copy
 import json
 import logging
 import os
+import time
 from dataclasses import dataclass
 from typing import Union
 
 import pytest
 from parameterized import parameterized
 
-from osman import Osman, OsmanConfig
+from osman import Osman, OsmanConfig, close_all, get_osman
+from osman.osman import LOCK_INDEX
+from osman.replay import replay
 
 
 @dataclass
@@ -110,6 +114,64 @@ def test_init_and_connectig_from_environment(monkeypatch):
     assert os_man.config.opensearch_host == os.environ["OPENSEARCH_HOST"]
 
 
+def test_shared_osman_instance():
+    """Equal configurations should return the same shared instance."""
+    os_man = get_osman(OsmanConfig(host_url=OpenSearchLocalConfig.url))
+    assert os_man is get_osman(OsmanConfig(host_url=OpenSearchLocalConfig.url))
+    assert os_man is not get_osman(
+        OsmanConfig(host_url=OpenSearchLocalConfig.url, timeout=20)
+    )
+
+    # A closed instance is replaced by a new one
+    os_man.close()
+    assert os_man.closed
+    new_os_man = get_osman(OsmanConfig(host_url=OpenSearchLocalConfig.url))
+    assert new_os_man is not os_man
+    assert new_os_man.client.cluster.get_settings() is not None
+
+    close_all()
+    assert new_os_man.closed
+
+
+def test_osman_context_manager():
+    """Osman used as a context manager should close the client on exit."""
+    with Osman(OsmanConfig(host_url=OpenSearchLocalConfig.url)) as os_man:
+        assert os_man.client.cluster.get_settings() is not None
+        assert not os_man.closed
+    assert os_man.closed
+
+
+@pytest.mark.parametrize("host_selector", ["round_robin", "least_latency"])
+def test_multiple_hosts(host_selector: str):
+    """Requests should be balanced among the configured hosts."""
+    os_man = Osman(
+        OsmanConfig(
+            auth_method=OpenSearchLocalConfig.auth_method,
+            opensearch_hosts=[
+                OpenSearchLocalConfig.host,
+                f"{OpenSearchLocalConfig.host}:{OpenSearchLocalConfig.port}",
+            ],
+            opensearch_port=OpenSearchLocalConfig.port,
+            opensearch_ssl_enabled=OpenSearchLocalConfig.ssl_enabled,
+            host_selector=host_selector,
+        )
+    )
+    connections = os_man.client.transport.connection_pool.connections
+    assert len(connections) == 2
+
+    for _ in range(4):
+        assert os_man.client.cluster.health()
+    assert all(conn.latency is not None for conn in connections)
+
+
+def test_sniff_on_start():
+    """Cluster nodes should be discovered on start."""
+    os_man = Osman(
+        OsmanConfig(host_url=OpenSearchLocalConfig.url, sniff_on_start=True)
+    )
+    assert os_man.client.cluster.health()
+
+
 def get_ids_from_response(response):
     """Extract id's from OpenSearch response dict (index search)."""
     if "hits" not in response:
@@ -149,6 +211,38 @@ def test_index_manipulation(random_index_name):
     assert res["acknowledged"]
 
 
+def test_create_index_sizing(random_index_name):
+    """Test creating an index with the recommended settings."""
+    os_man = OS_MAN
+    documents = [
+        {"id": idx, "age": idx % 90, "name": f"name {idx}"}
+        for idx in range(1000)
+    ]
+    recommendation = os_man.recommend_index_settings(
+        document_count=10**6,
+        sample_documents=documents,
+        mapping=INDEX_MAPPING,
+    )
+    assert recommendation["document_bytes"] > 0
+    assert recommendation["settings"]["number_of_shards"] == 1
+    assert not os_man.client.indices.exists(index="osman-sizing-*")
+
+    res = os_man.create_index(
+        name=random_index_name,
+        mapping=INDEX_MAPPING,
+        settings={"settings": {"refresh_interval": "5s"}},
+        sizing={"document_count": 10**6, "document_bytes": 100},
+    )
+    try:
+        assert res["acknowledged"]
+        settings = os_man.client.indices.get_settings(index=random_index_name)
+        index_settings = settings[random_index_name]["settings"]["index"]
+        assert index_settings["number_of_shards"] == "1"
+        assert index_settings["refresh_interval"] == "5s"
+    finally:
+        os_man.delete_index(name=random_index_name)
+
+
 @pytest.mark.parametrize(**INDEX_HANDLER_FIXTURE_PARAMS)
 def test_index_exists(index_handler):
     """
@@ -225,6 +319,419 @@ def test_data_insert(index_handler, documents: list, id_key: str):
         assert document == os_document
 
 
+@pytest.mark.parametrize(**INDEX_HANDLER_FIXTURE_PARAMS)
+def test_data_insert_validated(index_handler):
+    """
+    Test inserting data validated by the index mapping.
+
+    Parameters
+    ----------
+    index_handler
+        index_handler fixture, returning the name of the index for testing
+    """
+    documents = [
+        {"age": "12", "id": 1, "name": "james"},
+        {"age": "old", "id": 2, "name": "lordos"},
+        {"age": 45, "id": 3, "name": {"first": "fred"}},
+        {"age": 10, "id": 4, "name": "carlos", "city": "Prague"},
+    ]
+    res = OS_MAN.add_data_to_index(
+        index_name=index_handler,
+        documents=documents,
+        id_key="id",
+        refresh=True,
+        validate=True,
+    )
+    assert res["documents_inserted"] == 2
+    assert res["documents_rejected"] == 2
+    assert [doc["document"]["id"] for doc in res["rejected"]] == [2, 3]
+
+    search_results = OS_MAN.search_index(index_handler, {})
+    ages = {
+        doc["_source"]["id"]: doc["_source"]["age"]
+        for doc in search_results["hits"]["hits"]
+    }
+    assert ages == {1: 12, 4: 10}
+
+
+@pytest.mark.parametrize(**INDEX_HANDLER_FIXTURE_PARAMS)
+@pytest.mark.parametrize("thread_count", [1, 2])
+def test_bulk_actions(index_handler, thread_count: int):
+    """
+    Test mixed index, update, upsert, script and delete bulk actions.
+
+    Parameters
+    ----------
+    index_handler
+        index_handler fixture, returning the name of the index for testing
+    thread_count: int
+        number of parallel bulk requests
+    """
+    OS_MAN.add_data_to_index(
+        index_name=index_handler,
+        documents=[
+            {"age": 10, "id": 1, "name": "james"},
+            {"age": 20, "id": 2, "name": "lordos"},
+            {"age": 30, "id": 3, "name": "fred"},
+        ],
+        id_key="id",
+    )
+    actions = [
+        {"op": "update", "_id": 1, "doc": {"age": 11}},
+        {"op": "upsert", "doc": {"age": 40, "id": 4, "name": "carlos"}},
+        {
+            "op": "script",
+            "_id": 2,
+            "script": {"source": "ctx._source.age += params.years"},
+            "upsert": {"age": 0},
+        },
+        {"op": "delete", "_id": 3},
+        {"op": "delete", "_id": 5},
+        {"op": "update", "_id": 6, "doc": {"age": 60}},
+    ]
+    res = OS_MAN.bulk_actions(
+        index_handler,
+        (action for action in actions),
+        id_key="id",
+        refresh=True,
+        chunk_size=2,
+        thread_count=thread_count,
+    )
+    # the script is missing params
+    assert not res["acknowledged"]
+    assert res["succeeded"] == 4
+    assert res["failed"] == 2
+    assert res["results"] == {
+        "updated": 1,
+        "created": 1,
+        "deleted": 1,
+        "not_found": 1,
+    }
+
+    search_results = OS_MAN.search_index(index_handler, {})
+    ages = {
+        doc["_source"]["id"]: doc["_source"]["age"]
+        for doc in search_results["hits"]["hits"]
+    }
+    assert ages == {1: 11, 2: 20, 4: 40}
+
+
+@pytest.mark.parametrize(**INDEX_HANDLER_FIXTURE_PARAMS)
+@pytest.mark.parametrize("include_missing", [True, False])
+def test_get_documents(index_handler, include_missing: bool):
+    """
+    Test fetching documents by ids in concurrent batches.
+
+    Parameters
+    ----------
+    index_handler
+        index_handler fixture, returning the name of the index for testing
+    include_missing: bool
+        yield the missing documents too
+    """
+    documents = [
+        {"age": idx, "id": idx, "name": f"name {idx}"} for idx in range(100)
+    ]
+    OS_MAN.add_data_to_index(index_handler, documents, id_key="id")
+
+    ids = (str(idx) for idx in range(95, 105))
+    res = list(
+        OS_MAN.get_documents(
+            index_handler,
+            ids,
+            batch_size=3,
+            thread_count=2,
+            source_includes=["id", "age"],
+            include_missing=include_missing,
+        )
+    )
+    found = [doc for doc in res if doc["found"]]
+    assert [doc["_source"] for doc in found] == [
+        {"age": idx, "id": idx} for idx in range(95, 100)
+    ]
+    assert len(res) == (10 if include_missing else 5)
+
+
+@pytest.mark.parametrize(**INDEX_HANDLER_FIXTURE_PARAMS)
+def test_sync_data_to_index(index_handler, tmp_path):
+    """
+    Test incremental sync of changed and removed documents.
+
+    Parameters
+    ----------
+    index_handler
+        index_handler fixture, returning the name of the index for testing
+    tmp_path
+        temporary directory for the fingerprint store
+    """
+    store = str(tmp_path / "fingerprints.sqlite")
+    documents = [
+        {"age": 10, "id": 1, "name": "james"},
+        {"age": 20, "id": 2, "name": "lordos"},
+        {"age": 30, "id": 3, "name": "fred"},
+    ]
+    res = OS_MAN.sync_data_to_index(index_handler, documents, "id", store)
+    assert res["acknowledged"]
+    assert (res["indexed"], res["unchanged"], res["deleted"]) == (3, 0, 0)
+
+    documents = [
+        {"age": 11, "id": 1, "name": "james"},
+        {"age": 20, "id": 2, "name": "lordos"},
+        {"age": 40, "id": 4, "name": "carlos"},
+    ]
+    res = OS_MAN.sync_data_to_index(
+        index_handler, documents, "id", store, refresh=True
+    )
+    assert res["acknowledged"]
+    assert (res["indexed"], res["unchanged"], res["deleted"]) == (2, 1, 1)
+
+    search_results = OS_MAN.search_index(index_handler, {})
+    assert sorted(
+        doc["_source"]["id"] for doc in search_results["hits"]["hits"]
+    ) == [1, 2, 4]
+
+
+@pytest.mark.parametrize(**INDEX_HANDLER_FIXTURE_PARAMS)
+def test_add_dataframe_to_index(index_handler):
+    """
+    Test inserting a DataFrame.
+
+    Parameters
+    ----------
+    index_handler
+        index_handler fixture, returning the name of the index for testing
+    """
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("pyarrow")
+    df = pd.DataFrame(
+        {"age": [10, 20, 30], "id": [1, 2, 3], "name": ["a", "b", None]}
+    )
+    res = OS_MAN.add_dataframe_to_index(
+        index_handler, df, id_key="id", refresh=True, batch_size=2
+    )
+    assert res["acknowledged"]
+    assert res["succeeded"] == 3
+
+    search_results = OS_MAN.search_index(index_handler, {})
+    sources = {
+        doc["_id"]: doc["_source"] for doc in search_results["hits"]["hits"]
+    }
+    assert sources["3"] == {"age": 30, "id": 3, "name": None}
+
+
+@pytest.mark.parametrize(**INDEX_HANDLER_FIXTURE_PARAMS)
+def test_search_index_columns(index_handler):
+    """
+    Test searching and scrolling hits as columns.
+
+    Parameters
+    ----------
+    index_handler
+        index_handler fixture, returning the name of the index for testing
+    """
+    documents = [{"age": i, "id": i, "name": f"name{i}"} for i in range(5)]
+    OS_MAN.add_data_to_index(
+        index_handler, documents, id_key="id", refresh=True
+    )
+
+    query = {"query": {"match_all": {}}, "sort": ["id"]}
+    columns = OS_MAN.search_index_columns(index_handler, query, fields=["age"])
+    assert columns["_id"] == ["0", "1", "2", "3", "4"]
+    assert columns["age"] == [0, 1, 2, 3, 4]
+    assert list(columns) == ["_id", "_score", "age"]
+
+    pages = list(
+        OS_MAN.scroll_index_columns(
+            index_handler, query, fields=["name"], size=2
+        )
+    )
+    assert [page["name"] for page in pages] == [
+        ["name0", "name1"],
+        ["name2", "name3"],
+        ["name4"],
+    ]
+
+
+@parameterized.expand([(None,), (3,)])
+def test_aggregate_buckets(partitions: Union[int, None]):
+    """
+    Test paging through the buckets of an aggregation.
+
+    Parameters
+    ----------
+    partitions: Union[int, None]
+        number of terms partitions
+    """
+    index_name = "test_aggregate_buckets"
+    documents = [{"id": i, "group": i % 7, "age": i} for i in range(50)]
+    OS_MAN.add_data_to_index(index_name, documents, id_key="id", refresh=True)
+    try:
+        buckets = OS_MAN.aggregate_buckets(
+            index_name,
+            [{"group": {"terms": {"field": "group"}}}],
+            aggs={"age": {"sum": {"field": "age"}}},
+            size=3,
+            partitions=partitions,
+        )
+        sums = {
+            bucket["key"]["group"]: bucket["age"]["value"] for bucket in buckets
+        }
+    finally:
+        OS_MAN.delete_index(index_name)
+    assert sums == {
+        group: sum(doc["age"] for doc in documents if doc["group"] == group)
+        for group in range(7)
+    }
+
+
+BY_QUERY_DOCUMENTS = [
+    {"age": 10, "id": 1, "name": "james"},
+    {"age": 20, "id": 2, "name": "lordos"},
+    {"age": 30, "id": 3, "name": "fred"},
+    {"age": 40, "id": 4, "name": "carlos"},
+]
+
+
+@pytest.mark.parametrize(**INDEX_HANDLER_FIXTURE_PARAMS)
+@pytest.mark.parametrize("slices", ["auto", 2])
+def test_delete_by_query(index_handler, slices):
+    """
+    Test deleting documents by a sliced task.
+
+    Parameters
+    ----------
+    index_handler
+        index_handler fixture, returning the name of the index for testing
+    slices
+        number of slices of the task
+    """
+    OS_MAN.add_data_to_index(
+        index_handler, BY_QUERY_DOCUMENTS, id_key="id", refresh=True
+    )
+    res = OS_MAN.delete_by_query(
+        index_handler,
+        {"range": {"age": {"gte": 25}}},
+        slices=slices,
+        requests_per_second=1000,
+        refresh=True,
+        poll_interval=0.1,
+    )
+    assert res["acknowledged"]
+    assert res["completed"]
+    assert res["task"]
+    assert res["deleted"] == 2
+    assert res["total"] == 2
+    assert res["failures"] == []
+
+    search_results = OS_MAN.search_index(index_handler, {})
+    assert sorted(get_ids_from_response(search_results)) == [1, 2]
+
+
+@pytest.mark.parametrize(**INDEX_HANDLER_FIXTURE_PARAMS)
+def test_update_by_query(index_handler):
+    """
+    Test updating documents by a task.
+
+    Parameters
+    ----------
+    index_handler
+        index_handler fixture, returning the name of the index for testing
+    """
+    OS_MAN.add_data_to_index(
+        index_handler, BY_QUERY_DOCUMENTS, id_key="id", refresh=True
+    )
+    res = OS_MAN.update_by_query(
+        index_handler,
+        query={"range": {"age": {"lt": 25}}},
+        script={
+            "source": "ctx._source.age += params.years",
+            "params": {"years": 1},
+        },
+        refresh=True,
+        poll_interval=0.1,
+    )
+    assert res["acknowledged"]
+    assert res["updated"] == 2
+    assert res["version_conflicts"] == 0
+
+    search_results = OS_MAN.search_index(index_handler, {})
+    ages = sorted(
+        doc["_source"]["age"] for doc in search_results["hits"]["hits"]
+    )
+    assert ages == [11, 21, 30, 40]
+
+
+@pytest.mark.parametrize(**INDEX_HANDLER_FIXTURE_PARAMS)
+def test_performance_snapshot(index_handler):
+    """
+    Test the performance snapshots and their diff.
+
+    Parameters
+    ----------
+    index_handler
+        index_handler fixture, returning the name of the index for testing
+    """
+    previous = OS_MAN.performance_snapshot(index_handler)
+    OS_MAN.add_data_to_index(
+        index_name=index_handler,
+        documents=[{"id": idx, "age": idx} for idx in range(10)],
+        id_key="id",
+        refresh=True,
+    )
+    for _ in range(5):
+        OS_MAN.search_index(index_handler, {"query": {"match_all": {}}})
+    snapshot = OS_MAN.performance_snapshot(index_handler)
+
+    index = snapshot.indices[index_handler]
+    assert index.docs == 10
+    assert index.shards.get("STARTED")
+    assert index.segments >= 1
+    assert index.max_shard_segments >= 1
+    assert all(
+        0 <= node.heap_used_percent <= 100 for node in snapshot.nodes.values()
+    )
+    rates = snapshot.diff(previous).indices[index_handler]
+    assert rates.docs_delta == 10
+    assert rates.indexing_rate > 0
+    assert rates.search_rate > 0
+
+
+@pytest.mark.parametrize(**INDEX_HANDLER_FIXTURE_PARAMS)
+def test_replay(index_handler):
+    """
+    Test replaying logged search requests.
+
+    Parameters
+    ----------
+    index_handler
+        index_handler fixture, returning the name of the index for testing
+    """
+    OS_MAN.add_data_to_index(
+        index_name=index_handler,
+        documents=[{"id": idx, "age": idx} for idx in range(10)],
+        id_key="id",
+        refresh=True,
+    )
+    log = [
+        {"index": index_handler, "query": {"query": {"term": {"age": idx}}}}
+        for idx in range(40)
+    ]
+    log.append({"index": f"{index_handler}-missing", "query": {}})
+
+    report = replay(
+        OsmanConfig(host_url=OpenSearchLocalConfig.url),
+        log,
+        qps=100,
+        thread_count=16,
+    )
+
+    assert report["requests"] == 41
+    assert report["errors_by_type"] == {"404": 1}
+    assert report["labels"]["query"]["requests"] == 41
+    assert sum(report["histogram"].values()) == 41
+    assert report["latency"]["p50"] <= report["response_time"]["p99"]
+
+
 @pytest.mark.parametrize(**INDEX_HANDLER_FIXTURE_PARAMS)
 @pytest.mark.parametrize(
     "documents",
@@ -248,6 +755,102 @@ def test_data_insert(index_handler, documents: list, id_key: str):
 )
 @pytest.mark.parametrize("source", [{"query": {"match": {"age": "{{age}}"}}}])
 class TestTemplates(object):
+    def test_render_template(
+        self,
+        index_handler,
+        documents: list,
+        config: dict,
+        source: dict,
+    ):
+        """
+        Test rendering a stored template by OpenSearch and locally.
+
+        Parameters
+        ----------
+        index_handler
+            index_handler fixture, returning the name of the index for testing
+        documents: list
+            list of documents [{document}, {document}, ...]
+        config: dict
+            search template config {name: template_name, parameters: {validation parameters}}
+        source: dict
+            search template to upload
+        """
+        os_man = OS_MAN
+        os_man.add_data_to_index(
+            index_name=index_handler,
+            documents=documents,
+            id_key="id",
+            refresh=True,
+        )
+        os_man.upload_search_template(
+            source, config["name"], index_handler, config["params"]
+        )
+        try:
+            for age in (10, 23, 45):
+                params = {**config["params"], "age": age}
+                rendered = os_man.render_template(params, name=config["name"])
+                misses = os_man.render_cache.misses
+                # rendered locally, not taken from the cache
+                assert rendered == os_man.render_template(
+                    params, name=config["name"], local=True
+                )
+                assert os_man.render_cache.misses == misses + 1
+                assert rendered == os_man.render_template(params, source=source)
+        finally:
+            os_man.delete_script(config["name"])
+
+    def test_profile_search_template(
+        self,
+        index_handler,
+        documents: list,
+        config: dict,
+        source: dict,
+    ):
+        """
+        Test profiling a stored template with a grid of parameters.
+
+        Parameters
+        ----------
+        index_handler
+            index_handler fixture, returning the name of the index for testing
+        documents: list
+            list of documents [{document}, {document}, ...]
+        config: dict
+            search template config {name: template_name, parameters: {validation parameters}}
+        source: dict
+            search template to upload
+        """
+        os_man = OS_MAN
+        os_man.add_data_to_index(
+            index_name=index_handler,
+            documents=documents,
+            id_key="id",
+            refresh=True,
+        )
+        os_man.upload_search_template(
+            source, config["name"], index_handler, config["params"]
+        )
+        try:
+            res = os_man.profile_search_template(
+                index_handler,
+                config["name"],
+                {"age": [10, 23, 45], "from": [0], "size": [1, 100]},
+                samples=3,
+            )
+        finally:
+            os_man.delete_script(config["name"])
+
+        assert res["acknowledged"]
+        assert len(res["templates"]) == 6
+        p95s = [report["took"]["p95"] for report in res["templates"]]
+        assert p95s == sorted(p95s, reverse=True)
+        for report in res["templates"]:
+            assert report["samples"] == 3
+            assert report["latency"]["p50"] > 0
+            assert report["profile"]["shards"]
+            assert report["profile"]["shards"][0]["query_nanos"] > 0
+
     def test_search_template_upload(
         self,
         index_handler,
@@ -481,6 +1084,40 @@ class TestTemplates(object):
         assert res
 
 
+def _age_in_months(source: dict) -> Union[dict, None]:
+    """
+    Transform a document for reindexing, module level to be picklable.
+
+    Parameters
+    ----------
+    source: dict
+        _source of the document
+    Returns
+    -------
+    Union[dict, None]
+        the transformed document, None for documents to drop
+    """
+    if source["name"] == "fred":
+        return None
+    return {**source, "age_months": source["age"] * 12}
+
+
+def _missing_field(source: dict) -> dict:
+    """
+    Transform failing with a KeyError, module level to be picklable.
+
+    Parameters
+    ----------
+    source: dict
+        _source of the document
+    Returns
+    -------
+    dict
+        never returns
+    """
+    return {"value": source["missing"]}
+
+
 @pytest.mark.parametrize(**INDEX_HANDLER_FIXTURE_PARAMS)
 @pytest.mark.parametrize(
     "documents",
@@ -616,6 +1253,266 @@ class TestReindexing(object):
             # the name, however, should be different
             assert (res1.get("name") == res2.get("name")) is False
 
+    @pytest.mark.parametrize("process_count", [0, 2])
+    def test_reindexing_transform(
+        self, index_handler, documents: list, process_count: int
+    ):
+        """
+        Test reindexing with a client-side transform.
+
+        Parameters
+        ----------
+        index_handler
+            index_handler fixture, returning the name of the index for testing
+        documents: list
+            list of documents [{document}, {document}, ...]
+        process_count: int
+            number of transform processes
+        """
+        os_man = OS_MAN
+        index_name = index_handler
+        os_man.add_data_to_index(
+            index_name=index_name,
+            documents=documents,
+            id_key="id",
+            refresh=True,
+        )
+        mapping = copy.deepcopy(INDEX_MAPPING)
+        mapping["mappings"]["properties"]["age_months"] = {"type": "integer"}
+
+        res = os_man.reindex(
+            name=index_name,
+            mapping=mapping,
+            transform=_age_in_months,
+            slices=2,
+            process_count=process_count,
+        )
+        assert res["acknowledged"]
+        os_man.client.indices.refresh(index_name)
+
+        search_results = os_man.search_index(index_name, {})
+        sources = {
+            doc["_source"]["id"]: doc["_source"]
+            for doc in search_results["hits"]["hits"]
+        }
+        assert sorted(sources) == [10, 123, 456]
+        assert sources[123]["age_months"] == 120
+
+    def test_reindexing_invalid_mapping(self, index_handler):
+        """
+        Test a reindex failing to create the new index leaves nothing behind.
+
+        Parameters
+        ----------
+        index_handler
+            index_handler fixture, returning the name of the index for testing
+        """
+        os_man = OS_MAN
+        index_name = index_handler
+        mapping = copy.deepcopy(INDEX_MAPPING)
+        mapping["mappings"]["properties"]["age"] = {"type": "no_such_type"}
+
+        res = os_man.reindex(name=index_name, mapping=mapping)
+        assert res["acknowledged"] is False
+        assert os_man.index_exists(res["name"]) is False
+
+    @pytest.mark.parametrize("process_count", [0, 2])
+    def test_reindexing_failing_transform(
+        self, index_handler, documents: list, process_count: int
+    ):
+        """
+        Test a failing transform leaves no new index behind.
+
+        Parameters
+        ----------
+        index_handler
+            index_handler fixture, returning the name of the index for testing
+        documents: list
+            list of documents [{document}, {document}, ...]
+        process_count: int
+            number of transform processes
+        """
+        os_man = OS_MAN
+        index_name = index_handler
+        os_man.add_data_to_index(
+            index_name=index_name,
+            documents=documents,
+            id_key="id",
+            refresh=True,
+        )
+        mapping = copy.deepcopy(INDEX_MAPPING)
+        mapping["mappings"]["properties"]["value"] = {"type": "integer"}
+
+        res = os_man.reindex(
+            name=index_name,
+            mapping=mapping,
+            transform=_missing_field,
+            process_count=process_count,
+        )
+        assert res["acknowledged"] is False
+        assert os_man.index_exists(res["name"]) is False
+
+    def test_reindexing_unpicklable_transform(
+        self, index_handler, documents: list
+    ):
+        """
+        Test reindexing with a transform which can't be pickled.
+
+        Parameters
+        ----------
+        index_handler
+            index_handler fixture, returning the name of the index for testing
+        documents: list
+            list of documents [{document}, {document}, ...]
+        """
+        os_man = OS_MAN
+        index_name = index_handler
+        os_man.add_data_to_index(
+            index_name=index_name,
+            documents=documents,
+            id_key="id",
+            refresh=True,
+        )
+        mapping = copy.deepcopy(INDEX_MAPPING)
+        mapping["mappings"]["properties"]["age_months"] = {"type": "integer"}
+
+        with pytest.raises(RuntimeError):
+            os_man.reindex(
+                name=index_name, mapping=mapping, transform=lambda doc: doc
+            )
+        assert os_man.index_exists(f"{index_name}-1") is False
+
+    def test_reindexing_versions(self, index_handler, documents: list):
+        """
+        Test retained versions, rollback and the reindex lock.
+
+        Parameters
+        ----------
+        index_handler
+            index_handler fixture, returning the name of the index for testing
+        documents: list
+            list of documents [{document}, {document}, ...]
+        """
+        os_man = OS_MAN
+        index_name = index_handler
+        os_man.add_data_to_index(
+            index_name=index_name,
+            documents=documents,
+            id_key="id",
+            refresh=True,
+        )
+        mapping = copy.deepcopy(INDEX_MAPPING)
+        names = []
+        for field in ("a", "b", "c"):
+            mapping["mappings"]["properties"][field] = {"type": "keyword"}
+            res = os_man.reindex(
+                name=index_name, mapping=mapping, retained_versions=1
+            )
+            assert res["acknowledged"]
+            names.append(res["name"])
+
+        assert names == [f"{index_name}-{version}" for version in (1, 2, 3)]
+        assert res["retained"] == [names[1]]
+        assert os_man.index_exists(names[0]) is False
+
+        res = os_man.rollback_index(index_name)
+        assert res["acknowledged"]
+        assert res["name"] == names[1]
+        assert list(os_man.client.indices.get_alias(name=index_name)) == [
+            names[1]
+        ]
+        assert os_man.rollback_index(index_name)["acknowledged"] is False
+        assert os_man.rollback_index(index_name, version=3)["acknowledged"]
+
+        # a held lock stops the reindex
+        os_man.client.index(
+            LOCK_INDEX,
+            {"owner": "test", "acquired": time.time()},
+            id=index_name,
+            refresh=True,
+        )
+        try:
+            mapping["mappings"]["properties"]["d"] = {"type": "keyword"}
+            res = os_man.reindex(name=index_name, mapping=mapping)
+            assert res["acknowledged"] is False
+            assert res["locked"]
+        finally:
+            os_man.client.delete(LOCK_INDEX, index_name)
+
+    def test_reindexing_lock_renewal(self, index_handler):
+        """
+        Test renewing the reindex lock and detecting its takeover.
+
+        Parameters
+        ----------
+        index_handler
+            index_handler fixture, returning the name of the index for testing
+        """
+        os_man = OS_MAN
+        index_name = index_handler
+        owner = os_man._acquire_lock(index_name, 60)
+        try:
+            acquired = os_man.client.get(LOCK_INDEX, index_name)["_source"][
+                "acquired"
+            ]
+            stop, heartbeat = os_man._start_heartbeat(index_name, owner, 0.3)
+            time.sleep(0.5)
+            stop.set()
+            heartbeat.join()
+            held = os_man.client.get(LOCK_INDEX, index_name)["_source"]
+            assert held["owner"] == owner
+            assert held["acquired"] > acquired
+
+            os_man.client.index(
+                LOCK_INDEX,
+                {"owner": "test", "acquired": time.time()},
+                id=index_name,
+                refresh=True,
+            )
+            assert os_man._renew_lock(index_name, owner) is False
+            assert os_man._release_lock(index_name, owner) is False
+        finally:
+            os_man.client.delete(LOCK_INDEX, index_name)
+
+    def test_reindexing_readiness(self, index_handler, documents: list):
+        """
+        Test preparing the new index before the alias switch.
+
+        Parameters
+        ----------
+        index_handler
+            index_handler fixture, returning the name of the index for testing
+        documents: list
+            list of documents [{document}, {document}, ...]
+        """
+        os_man = OS_MAN
+        index_name = index_handler
+        os_man.add_data_to_index(
+            index_name=index_name,
+            documents=documents,
+            id_key="id",
+            refresh=True,
+        )
+        settings = {"settings": {"number_of_replicas": 0}}
+        res = os_man.reindex(
+            name=index_name,
+            settings=settings,
+            defer_replicas=True,
+            max_num_segments=1,
+            wait_for_green=True,
+            warm_up=[{"query": {"match": {"name": "james"}}}],
+            ready_timeout=60,
+        )
+        assert res["acknowledged"]
+        assert len(res["warm_up_took"]) == 1
+
+        index_settings = res["settings"]["index"]
+        assert index_settings["number_of_replicas"] == "0"
+        assert "refresh_interval" not in index_settings
+        # the documents are searchable right after the switch
+        search_results = os_man.search_index(index_name, {})
+        assert len(search_results["hits"]["hits"]) == len(documents)
+
     @pytest.mark.parametrize(
         "new_index_settings, expected_ack, expected_number_of_shards, expected_analysis",
         [
@@ -1059,3 +1956,70 @@ class TestPainlessScripts(object):
 
         assert res
         assert res["acknowledged"] == expected_ack
+
+    def test_painless_script_debug_batch(self, index_handler, documents: list):
+        """
+        Test debugging of a painless script on a batch of cases.
+
+        Parameters
+        ----------
+        index_handler
+            index_handler fixture, returning the name of the index for testing
+        documents: list
+            list of documents [{document}, {document}, ...]
+        """
+        os_man = OS_MAN
+        index_name = index_handler
+        source = """
+            int total = 0;
+            for (int i = 0; i < doc['container'].length; ++i) {
+                total += doc['container'][i] * params.multiplier;
+            }
+            return total;
+            """
+        cases = [
+            {
+                "document": documents[0],
+                "params": {"params": {"multiplier": multiplier}},
+                "expected_result": 6 * multiplier,
+            }
+            for multiplier in range(1, 11)
+        ]
+        cases.append(
+            {
+                "name": "wrong",
+                "document": documents[0],
+                "params": {"params": {"multiplier": 1}},
+                "expected_result": 7,
+            }
+        )
+        cases.append(
+            {
+                "name": "missing param",
+                "document": documents[0],
+                "params": {"params": {}},
+                "expected_result": 6,
+            }
+        )
+
+        res = os_man.debug_painless_script_batch(
+            source=source,
+            index=index_name,
+            context_type="score",
+            cases=cases,
+            thread_count=4,
+        )
+
+        assert not res["acknowledged"]
+        assert res["passed"] == 10
+        assert res["failed"] == 2
+        assert [case["case"] for case in res["cases"]][-2:] == [
+            "wrong",
+            "missing param",
+        ]
+        assert res["cases"][-2]["result"] == 6
+        assert res["cases"][-1]["error"]
+        assert res["latency"]["p50"] <= res["latency"]["p99"]
+        assert os_man.debug_painless_script_batch(
+            source, index_name, "unknown", cases
+        ) == {"acknowledged": False}
@@ -0,0 +1,69 @@
+"""Tests for the search template profiling helpers."""
+from osman.osman import _params_grid, _profile_breakdown
+
+
+def test_params_grid():
+    """Lists of values should expand to all combinations."""
+    assert _params_grid({"age": [10, 20], "size": [1]}) == [
+        {"age": 10, "size": 1},
+        {"age": 20, "size": 1},
+    ]
+    assert _params_grid([{"age": 10}]) == [{"age": 10}]
+    assert _params_grid({}) == [{}]
+
+
+def test_profile_breakdown():
+    """Shards should be summarized and the slowest ranked first."""
+    profile = {
+        "shards": [
+            {
+                "id": "[node][index][0]",
+                "searches": [
+                    {
+                        "rewrite_time": 5,
+                        "query": [
+                            {
+                                "type": "TermQuery",
+                                "time_in_nanos": 100,
+                                "breakdown": {"score": 10, "score_count": 2},
+                            }
+                        ],
+                        "collector": [
+                            {"name": "TopScoreDocCollector", "time_in_nanos": 7}
+                        ],
+                    }
+                ],
+            },
+            {
+                "id": "[node][index][1]",
+                "searches": [
+                    {
+                        "rewrite_time": 1,
+                        "query": [
+                            {
+                                "type": "TermQuery",
+                                "time_in_nanos": 300,
+                                "breakdown": {"score": 30, "match": 3},
+                            }
+                        ],
+                        "collector": [],
+                    }
+                ],
+            },
+        ]
+    }
+    shards = _profile_breakdown(profile)
+    assert [shard["id"] for shard in shards] == [
+        "[node][index][1]",
+        "[node][index][0]",
+    ]
+    assert shards[0]["breakdown"] == {"score": 30, "match": 3}
+    assert shards[1] == {
+        "id": "[node][index][0]",
+        "query_nanos": 100,
+        "rewrite_nanos": 5,
+        "collector_nanos": 7,
+        "breakdown": {"score": 10},
+        "collectors": {"TopScoreDocCollector": 7},
+    }
+    assert _profile_breakdown({}) == []
@@ -0,0 +1,22 @@
+"""Tests for the readiness gate before the alias switch."""
+from unittest import mock
+
+import pytest
+
+from osman.osman import Osman
+
+
+def test_prepare_index_not_green():
+    """Health timing out with 408 should fail the gate with RuntimeError."""
+    osman = Osman.__new__(Osman)
+    osman.client = mock.Mock()
+    osman.client.cluster.health.return_value = {
+        "status": "yellow",
+        "timed_out": True,
+    }
+
+    with pytest.raises(RuntimeError, match="yellow"):
+        osman._prepare_index(  # noqa: WPS437
+            "index-2", wait_for_green=True, ready_timeout=1
+        )
+    assert osman.client.cluster.health.call_args.kwargs["ignore"] == 408
@@ -0,0 +1,31 @@
+"""Tests for the shared Osman instance registry."""
+from osman import OsmanConfig, registry
+
+
+def test_config_key_equal_configs():
+    """Equal configurations should share the registry key."""
+    key1 = registry._config_key(  # noqa: WPS437
+        OsmanConfig(host_url="http://example.com")
+    )
+    key2 = registry._config_key(  # noqa: WPS437
+        OsmanConfig(host_url="http://example.com")
+    )
+    assert key1 == key2
+
+
+def test_config_key_different_configs():
+    """Different configurations should not share the registry key."""
+    key1 = registry._config_key(  # noqa: WPS437
+        OsmanConfig(host_url="http://example.com")
+    )
+    key2 = registry._config_key(  # noqa: WPS437
+        OsmanConfig(host_url="http://example.com", timeout=30)
+    )
+    assert key1 != key2
+
+
+def test_reset_after_fork():
+    """Inherited instances should be forgotten without closing them."""
+    registry._INSTANCES["key"] = object()  # noqa: WPS437
+    registry._reset_after_fork()  # noqa: WPS437
+    assert not registry._INSTANCES  # noqa: WPS437
@@ -0,0 +1,113 @@
+"""Tests for the replay of logged search requests."""
+import json
+from unittest import mock
+
+import pytest
+from opensearchpy import ConnectionTimeout, RequestsHttpConnection
+
+from osman.config import OsmanConfig
+from osman.connection import OsmanConnection
+from osman.replay import (
+    CIRCUIT_OPEN,
+    _send,
+    _summary,
+    histogram,
+    read_log,
+    schedule,
+)
+from osman.resilience import CircuitBreakerOpenError
+from osman.transport import REPLAY_PROFILE, OsmanTransport
+
+
+def test_read_log(tmp_path):
+    """Logged requests should be read with their timestamps in seconds."""
+    path = tmp_path / "queries.jsonl"
+    entries = [
+        {"index": "a", "query": {"size": 1}, "timestamp": 10},
+        {"index": "a", "template": "t", "params": {"age": 1}},
+        {"index": "b", "source": "{}", "timestamp": "1970-01-01T00:00:12Z"},
+    ]
+    path.write_text(
+        "\n".join(json.dumps(entry) for entry in entries) + "\n\n",
+        encoding="utf-8",
+    )
+    log = read_log(str(path))
+    assert [entry.get("timestamp") for entry in log] == [10.0, None, 12.0]
+    assert log[1]["params"] == {"age": 1}
+
+    path.write_text(json.dumps({"index": "a"}), encoding="utf-8")
+    with pytest.raises(AssertionError):
+        read_log(str(path))
+
+
+def test_schedule():
+    """Requests should be scheduled by qps or by their logged timing."""
+    entries = [{"timestamp": 100}, {"timestamp": 101}, {"timestamp": 104}]
+    assert schedule(entries, qps=10) == [0, 0.1, 0.2]
+    assert schedule(entries) == [0, 1, 4]
+    assert schedule(entries, speed=2) == [0, 0.5, 2]
+    with pytest.raises(AssertionError):
+        schedule([{"index": "a"}])
+
+
+def test_histogram():
+    """Latencies should be counted by the upper bound of their bucket."""
+    counts = histogram([0.0005, 0.001, 0.003, 0.3, 60])
+    assert counts["0.001"] == 2
+    assert counts["0.005"] == 1
+    assert counts["0.5"] == 1
+    assert counts["+Inf"] == 1
+    assert sum(counts.values()) == 5
+
+
+def test_send_errors():
+    """Requests rejected by the circuit breaker should be told apart."""
+    osman = mock.Mock()
+    entry = {"index": "a", "query": {"size": 1}}
+    osman.client.search.side_effect = CircuitBreakerOpenError("N/A", "", None)
+    assert _send(osman, entry, 0)[3] == CIRCUIT_OPEN
+    osman.client.search.side_effect = ConnectionTimeout("TIMEOUT", "", None)
+    assert _send(osman, entry, 0)[3] == "ConnectionTimeout"
+    assert osman.client.search.call_args.kwargs["params"] == REPLAY_PROFILE
+
+
+def test_summary():
+    """Circuit open requests should be counted apart from the errors."""
+    summary = _summary(
+        [
+            ("query", 0.1, 0.1, None),
+            ("query", 0.3, 0.3, "503"),
+            ("query", 0, 0, CIRCUIT_OPEN),
+        ]
+    )
+    assert summary["requests"] == 3
+    assert summary["circuit_open"] == 1
+    assert summary["errors"] == 1
+    assert summary["error_rate"] == 0.5
+    assert summary["errors_by_type"] == {"503": 1}
+
+
+def test_replay_fixed_timeout():
+    """Replayed requests should wait the fixed timeout of the config."""
+    config = OsmanConfig(
+        host_url="http://example.com",
+        timeout=7,
+        adaptive_timeout={"percentile": 50, "multiplier": 1, "samples": 1},
+    )
+    transport = OsmanTransport(
+        [{"host": "a"}],
+        connection_class=OsmanConnection,
+        timeout=config.timeout,
+        adaptive_timeout=config.adaptive_timeout,
+        profiles=config.profiles,
+    )
+    transport.get_connection().latencies["search"].add(0.01)
+
+    with mock.patch.object(
+        RequestsHttpConnection, "perform_request"
+    ) as perform_request:
+        perform_request.return_value = (200, {}, "{}")
+        transport.perform_request(
+            "POST", "/index/_search", params=dict(REPLAY_PROFILE)
+        )
+    assert perform_request.call_args.kwargs["timeout"] == 7
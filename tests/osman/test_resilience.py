@@ -0,0 +1,245 @@
+"""Tests for the circuit breaker, adaptive timeout and retries."""
+from unittest import mock
+
+import pytest
+from opensearchpy import (
+    Connection,
+    ConnectionError,
+    RequestsHttpConnection,
+    TransportError,
+)
+
+from osman.config import OsmanConfig
+from osman.connection import OsmanConnection
+from osman.resilience import (
+    CircuitBreaker,
+    CircuitBreakerOpenError,
+    LatencyWindow,
+    RetryBudget,
+    backoff_delay,
+)
+from osman.transport import PROFILE_PARAM, OsmanTransport
+
+
+class FailingConnection(Connection):
+    """Connection failing the first `failures` requests."""
+
+    failures = 0
+    requests = 0
+    last_request = None
+
+    def perform_request(self, *args, **kwargs):
+        """Fail or return an empty JSON response."""
+        FailingConnection.requests += 1
+        FailingConnection.last_request = (args, kwargs)
+        if FailingConnection.requests <= FailingConnection.failures:
+            raise ConnectionError("N/A", "connection refused", None)
+        return 200, {}, "{}"
+
+
+def test_circuit_breaker():
+    """Breaker should open on errors and close after a successful probe."""
+    breaker = CircuitBreaker(error_rate=0.5, min_requests=4, reset_timeout=10)
+    for success in (True, False, True):
+        breaker.record(success)
+        assert breaker.allow()
+    breaker.record(False)
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    with mock.patch("time.monotonic", return_value=1e9):
+        assert breaker.allow()
+        assert breaker.state == "half_open"
+        # Only a single probe is let through
+        assert not breaker.allow()
+        breaker.record(True)
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_circuit_breaker_failed_probe():
+    """Failed probe should open the breaker again."""
+    breaker = CircuitBreaker(error_rate=1, min_requests=1, reset_timeout=10)
+    breaker.record(False)
+    with mock.patch("time.monotonic", return_value=1e9):
+        assert breaker.allow()
+        breaker.record(False)
+        assert breaker.state == "open"
+        assert not breaker.allow()
+
+
+def test_latency_window():
+    """Percentile should be computed from the recent latencies."""
+    window = LatencyWindow(size=100)
+    assert window.percentile(99) is None
+    for latency in range(200):
+        window.add(latency)
+    assert len(window) == 100
+    assert window.percentile(0) == 100
+    assert window.percentile(50) == 150
+    assert window.percentile(100) == 199
+    assert window.summary() == {"p50": 150, "p95": 194, "p99": 198, "max": 199}
+
+
+def test_retry_budget():
+    """Retries should be limited to the ratio of the requests."""
+    budget = RetryBudget(ratio=0.5, reserve=2)
+    assert budget.withdraw()
+    assert budget.withdraw()
+    assert not budget.withdraw()
+    budget.deposit()
+    assert not budget.withdraw()
+    budget.deposit()
+    assert budget.withdraw()
+
+
+def test_backoff_delay():
+    """Delay should grow exponentially up to the cap."""
+    for attempt in range(10):
+        delay = backoff_delay(attempt, base=0.1, cap=1)
+        assert 0 <= delay <= min(1, 0.1 * 2**attempt)
+
+
+def test_connection_circuit_breaker():
+    """Open breaker should reject the requests of its operation class."""
+    connection = OsmanConnection(
+        host="node", circuit_breaker={"error_rate": 1, "min_requests": 1}
+    )
+    connection.breakers["search"].record(False)
+
+    with pytest.raises(CircuitBreakerOpenError):
+        connection.perform_request("GET", "/index/_search")
+    assert connection.breakers["bulk"].allow()
+
+
+def test_connection_adaptive_timeout():
+    """Timeout should follow the latency percentile within the bounds."""
+    connection = OsmanConnection(
+        host="node",
+        timeout=10,
+        adaptive_timeout={"percentile": 50, "multiplier": 2, "samples": 4},
+    )
+    assert connection.request_timeout("search") == 10
+
+    for latency in (0.5, 1, 2, 3):
+        connection.latencies["search"].add(latency)
+    assert connection.request_timeout("search") == 4
+    assert connection.request_timeout("search", timeout=3) == 3
+    assert connection.request_timeout("bulk") == 10
+
+    for latency in (10, 10, 10, 10):
+        connection.latencies["search"].add(latency)
+    assert connection.request_timeout("search") == 10
+
+
+@pytest.mark.parametrize(
+    "failures, retry_budget, expected_requests",
+    [(1, 0.2, 2), (2, 0.2, 3), (5, 0.2, 4), (1, 0, 1)],
+)
+def test_transport_retries(
+    failures: int, retry_budget: float, expected_requests: int
+):
+    """Failed requests should be retried within max_retries and budget."""
+    FailingConnection.failures = failures
+    FailingConnection.requests = 0
+    transport = OsmanTransport(
+        [{"host": "a"}, {"host": "b"}],
+        connection_class=FailingConnection,
+        max_retries=3,
+        retry_backoff=0.001,
+        retry_budget=retry_budget,
+    )
+    # Budget without any reserve
+    if retry_budget == 0:
+        transport.retry_budget = RetryBudget(0, reserve=0)
+
+    if failures < expected_requests:
+        assert transport.perform_request("GET", "/") == {}
+    else:
+        with pytest.raises(TransportError):
+            transport.perform_request("GET", "/")
+    assert FailingConnection.requests == expected_requests
+
+
+@pytest.mark.parametrize(
+    "profile, expected_requests, expected_timeout",
+    [("slow", 1, 300), ("retried", 3, 10), ("unknown", 2, 10)],
+)
+def test_transport_profiles(
+    profile: str, expected_requests: int, expected_timeout: float
+):
+    """Timeout and retries should be taken from the request profile."""
+    FailingConnection.failures = 5
+    FailingConnection.requests = 0
+    transport = OsmanTransport(
+        [{"host": "a"}],
+        connection_class=FailingConnection,
+        max_retries=1,
+        retry_backoff=0,
+        profiles={
+            "slow": {"timeout": 300, "max_retries": 0},
+            "retried": {"max_retries": 2},
+        },
+    )
+
+    with pytest.raises(TransportError):
+        transport.perform_request(
+            "GET", "/", params={PROFILE_PARAM: profile, "size": 1}
+        )
+    assert FailingConnection.requests == expected_requests
+    args, kwargs = FailingConnection.last_request
+    assert args[2] == {"size": 1}
+    assert kwargs["timeout"] == expected_timeout
+
+
+def test_transport_scroll_profile():
+    """Scroll requests should never be retried."""
+    FailingConnection.failures = 5
+    FailingConnection.requests = 0
+    config = OsmanConfig(
+        host_url="http://example.com", max_retries=3, retry_on_timeout=True
+    )
+    transport = OsmanTransport(
+        [{"host": "a"}],
+        connection_class=FailingConnection,
+        max_retries=config.max_retries,
+        retry_backoff=0,
+        profiles=config.profiles,
+    )
+
+    with pytest.raises(TransportError):
+        transport.perform_request(
+            "POST", "/_search/scroll", params={PROFILE_PARAM: "scroll"}
+        )
+    assert FailingConnection.requests == 1
+
+
+@pytest.mark.parametrize(
+    "profile, expected_timeout",
+    [
+        ({"adaptive_timeout": True}, 2),
+        ({"adaptive_timeout": False}, 10),
+        ({}, 10),
+        ({"timeout": 5}, 5),
+    ],
+)
+def test_transport_adaptive_timeout(profile: dict, expected_timeout: float):
+    """Only the profiles enabling it should get the adaptive timeout."""
+    transport = OsmanTransport(
+        [{"host": "a"}],
+        connection_class=OsmanConnection,
+        timeout=10,
+        adaptive_timeout={"percentile": 50, "multiplier": 2, "samples": 1},
+        profiles={"tested": profile},
+    )
+    connection = transport.get_connection()
+    connection.latencies["search"].add(1)
+
+    with mock.patch.object(
+        RequestsHttpConnection, "perform_request"
+    ) as perform_request:
+        perform_request.return_value = (200, {}, "{}")
+        transport.perform_request(
+            "GET", "/index/_search", params={PROFILE_PARAM: "tested"}
+        )
+    assert perform_request.call_args.kwargs["timeout"] == expected_timeout
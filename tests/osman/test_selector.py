@@ -0,0 +1,48 @@
+"""Tests for the node selectors."""
+from types import SimpleNamespace
+
+from osman.selector import (
+    LeastLatencySelector,
+    ZoneAwareSelector,
+    zone_host_info,
+)
+
+
+def test_least_latency_selector():
+    """The fast nodes should be selected, the slowest one never."""
+    connections = [
+        SimpleNamespace(latency=0.3),
+        SimpleNamespace(latency=0.1),
+        SimpleNamespace(latency=0.2),
+    ]
+    selector = LeastLatencySelector({})
+    selected = [selector.select(connections) for _ in range(100)]
+    assert connections[0] not in selected
+    assert selected.count(connections[1]) > selected.count(connections[2])
+
+
+def test_least_latency_selector_unmeasured_first():
+    """Nodes without any finished request should be measured first."""
+    connections = [SimpleNamespace(latency=0.1), SimpleNamespace(latency=None)]
+    selector = LeastLatencySelector({})
+    assert selector.select(connections) is connections[1]
+
+
+def test_zone_aware_selector():
+    """Nodes in the local zone should be preferred while alive."""
+    local = SimpleNamespace(zone="zone-a", latency=0.2)
+    remote = SimpleNamespace(zone="zone-b", latency=0.1)
+    selector = ZoneAwareSelector(
+        {}, selector_class=LeastLatencySelector, local_zone="zone-a"
+    )
+    for _ in range(10):
+        assert selector.select([remote, local]) is local
+    assert selector.select([remote]) is remote
+
+
+def test_zone_host_info():
+    """Zone of a sniffed node should be read from its attributes."""
+    host = {"host": "node", "port": 9200}
+    node_info = {"roles": ["data"], "attributes": {"zone": "zone-a"}}
+    assert zone_host_info(node_info, host) == {**host, "zone": "zone-a"}
+    assert zone_host_info({"roles": ["cluster_manager"]}, host) is None
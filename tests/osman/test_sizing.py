@@ -0,0 +1,65 @@
+"""Tests for the shard sizing recommendation."""
+import pytest
+
+from osman.sizing import apply_recommendation, recommend_shards
+
+GIB = 2**30
+
+
+@pytest.mark.parametrize(
+    "document_count, document_bytes, data_nodes, growth, expected_shards",
+    [
+        (1000, 1000, 5, 1, 1),
+        (10**8, 1000, 1, 1, 4),
+        (10**8, 1000, 3, 1, 6),
+        (10**8, 1000, 3, 2, 9),
+        (4 * 10**8, 10, 1, 1, 2),
+        (70 * GIB // 1000, 1000, 2, 1, 4),
+        (5 * 10**8, 10, 2, 1, 3),
+    ],
+)
+def test_recommend_shards(
+    document_count: int,
+    document_bytes: int,
+    data_nodes: int,
+    growth: float,
+    expected_shards: int,
+):
+    """Shards should be few, under the size limits and balanced."""
+    recommendation = recommend_shards(
+        document_count, document_bytes, data_nodes=data_nodes, growth=growth
+    )
+    assert recommendation["settings"]["number_of_shards"] == expected_shards
+
+
+def test_recommend_replicas_and_refresh():
+    """A replica needs a second node, fast indexing a longer refresh."""
+    single = recommend_shards(10, 10, data_nodes=1)["settings"]
+    assert single["number_of_replicas"] == 0
+    assert single["refresh_interval"] == "1s"
+    cluster = recommend_shards(10, 10, data_nodes=3, indexing_rate=50000)
+    assert cluster["settings"]["number_of_replicas"] == 1
+    assert cluster["settings"]["refresh_interval"] == "30s"
+
+
+def test_apply_recommendation():
+    """Explicit settings should win over the recommended ones."""
+    recommendation = recommend_shards(10, 10, data_nodes=3)
+    assert apply_recommendation(None, recommendation) == {
+        "settings": recommendation["settings"]
+    }
+    settings = {
+        "settings": {
+            "index": {"number_of_shards": 3},
+            "index.refresh_interval": "5s",
+            "analysis": {},
+        }
+    }
+    applied = apply_recommendation(settings, recommendation)["settings"]
+    assert applied == {
+        "index": {"number_of_shards": 3},
+        "index.refresh_interval": "5s",
+        "analysis": {},
+        "number_of_replicas": 1,
+    }
+    assert "number_of_replicas" not in settings["settings"]
@@ -0,0 +1,116 @@
+"""Tests for the health and performance snapshots."""
+import pytest
+
+from osman.snapshot import ClusterSnapshot
+
+
+def _index_stats(indexed: int, queries: int, merges: int) -> dict:
+    """Return a _stats response of an index."""
+    total = {
+        "docs": {"count": indexed * 2, "deleted": 1},
+        "store": {"size_in_bytes": 2048},
+        "indexing": {"index_total": indexed, "index_time_in_millis": indexed},
+        "search": {
+            "query_total": queries,
+            "query_time_in_millis": queries * 3,
+            "fetch_total": queries,
+            "fetch_time_in_millis": queries,
+        },
+        "merges": {"current": 1, "total": merges, "total_time_in_millis": 5},
+        "refresh": {"total": merges},
+        "segments": {"count": 3},
+        "fielddata": {"memory_size_in_bytes": 64},
+    }
+    primaries = {**total, "docs": {"count": indexed, "deleted": 1}}
+    return {"indices": {"people": {"primaries": primaries, "total": total}}}
+
+
+def _node_stats(queries: int, rejected: int) -> dict:
+    """Return a _nodes/stats response of a node."""
+    return {
+        "nodes": {
+            "node-id": {
+                "name": "node-1",
+                "jvm": {
+                    "mem": {"heap_used_percent": 40, "heap_used_in_bytes": 400}
+                },
+                "os": {"cpu": {"percent": 12}},
+                "indices": {
+                    "fielddata": {"memory_size_in_bytes": 64},
+                    "indexing": {"index_total": 0, "index_time_in_millis": 0},
+                    "search": {
+                        "query_total": queries,
+                        "query_time_in_millis": queries * 2,
+                    },
+                    "segments": {"count": 3},
+                },
+                "thread_pool": {
+                    "search": {"queue": 2, "rejected": rejected},
+                    "write": {"queue": 0, "rejected": 7},
+                },
+            }
+        }
+    }
+
+
+SHARDS = [
+    {
+        "index": "people",
+        "shard": "0",
+        "prirep": "p",
+        "state": "STARTED",
+        "store": "1024",
+    },
+    {
+        "index": "people",
+        "shard": "0",
+        "prirep": "r",
+        "state": "UNASSIGNED",
+        "store": None,
+    },
+]
+SEGMENTS = [
+    {"index": "people", "shard": "0", "prirep": "p", "ip": "10.0.0.1"},
+    {"index": "people", "shard": "0", "prirep": "p", "ip": "10.0.0.1"},
+    {"index": "people", "shard": "1", "prirep": "p", "ip": "10.0.0.1"},
+]
+
+
+def test_snapshot_from_responses():
+    """The statistics APIs should be parsed to typed snapshots."""
+    snapshot = ClusterSnapshot.from_responses(
+        100, _index_stats(10, 4, 1), SHARDS, _node_stats(4, 0), SEGMENTS
+    )
+    index = snapshot.indices["people"]
+    assert index.docs == 10
+    assert index.store_bytes == 2048
+    assert index.shards == {"STARTED": 1, "UNASSIGNED": 1}
+    assert index.max_shard_bytes == 1024
+    assert index.max_shard_segments == 2
+    node = snapshot.nodes["node-1"]
+    assert node.heap_used_percent == 40
+    assert node.cpu_percent == 12
+    assert node.thread_pool_rejected == {"search": 0, "write": 7}
+
+
+def test_snapshot_diff():
+    """The diff of two snapshots should give the rates."""
+    previous = ClusterSnapshot.from_responses(
+        100, _index_stats(10, 4, 1), SHARDS, _node_stats(4, 0), SEGMENTS
+    )
+    current = ClusterSnapshot.from_responses(
+        110, _index_stats(110, 24, 3), SHARDS, _node_stats(24, 5), SEGMENTS
+    )
+    diff = current.diff(previous)
+    assert diff.seconds == 10
+    rates = diff.indices["people"]
+    assert rates.indexing_rate == 10
+    assert rates.search_rate == 2
+    assert rates.indexing_latency_ms == 1
+    assert rates.search_latency_ms == 3
+    assert rates.merge_rate == pytest.approx(0.2)
+    assert rates.docs_delta == 100
+    node = diff.nodes["node-1"]
+    assert node.search_rate == 2
+    assert node.indexing_latency_ms is None
+    assert node.rejected == {"search": 5}
@@ -0,0 +1,80 @@
+"""Tests for the local search template rendering."""
+import pytest
+
+from osman.template import RenderCache, render_mustache
+
+
+@pytest.mark.parametrize(
+    "source, params, expected",
+    [
+        (
+            {"query": {"match": {"age": "{{age}}"}}},
+            {"age": 10},
+            {"query": {"match": {"age": "10"}}},
+        ),
+        (
+            '{"size": {{size}}{{^size}}10{{/size}}, "from": {{from}}0}',
+            {"from": 2},
+            {"size": 10, "from": 20},
+        ),
+        (
+            '{"terms": {{#toJson}}ids{{/toJson}}, "b": {{flag}}}',
+            {"ids": [1, "a"], "flag": False},
+            {"terms": [1, "a"], "b": False},
+        ),
+        (
+            '{"q": "{{#join}}tags{{/join}}",'
+            + " \"d\": \"{{#join delimiter='|'}}tags{{/join delimiter='|'}}\"}",
+            {"tags": ["a", "b"]},
+            {"q": "a,b", "d": "a|b"},
+        ),
+        (
+            '{"should": [{{#terms}}{"term": {"k": "{{name}}"}}'
+            + "{{^last}},{{/last}}{{/terms}}]}",
+            {"terms": [{"name": 'x"y'}, {"name": "z", "last": True}]},
+            {"should": [{"term": {"k": 'x"y'}}, {"term": {"k": "z"}}]},
+        ),
+        (
+            '{"first": "{{o.items.0}}", "missing": "{{o.nothing}}"{{! x }}}',
+            {"o": {"items": ["a", "b"]}},
+            {"first": "a", "missing": ""},
+        ),
+    ],
+)
+def test_render_mustache(source, params: dict, expected: dict):
+    """Templates should be rendered as OpenSearch renders them."""
+    assert render_mustache(source, params) == expected
+
+
+@pytest.mark.parametrize(
+    "source",
+    ['{"a": {{#b}}1}', '{"a": 1{{/b}}}', "{{>partial}}", '{"a": {{b}}}'],
+)
+def test_render_mustache_wrong(source: str):
+    """Unclosed sections, partials and invalid JSON should fail."""
+    with pytest.raises(ValueError):
+        render_mustache(source, {})
+
+
+def test_render_cache():
+    """The cache should drop the least recently used and invalidated."""
+    cache = RenderCache(maxsize=2)
+    first = RenderCache.key("template", None, {"a": 1, "b": 2})
+    assert first == RenderCache.key("template", None, {"b": 2, "a": 1})
+    assert first != RenderCache.key("template", None, {"a": 1, "b": 2}, True)
+    second = RenderCache.key(None, {"query": {}}, {"a": 1})
+    third = RenderCache.key("other", None, {})
+
+    cache.put(first, {"size": 1})
+    cache.put(second, {"size": 2})
+    cache.get(first)["size"] = 10
+    assert cache.get(first) == {"size": 1}
+    cache.put(third, {"size": 3})
+    assert cache.get(second) is None
+    assert (cache.hits, cache.misses) == (2, 1)
+
+    cache.sources["template"] = "{}"
+    cache.invalidate("template")
+    assert cache.get(first) is None
+    assert cache.get(third) == {"size": 3}
+    assert cache.sources == {}
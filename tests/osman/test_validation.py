@@ -0,0 +1,97 @@
+"""Tests for the mapping validator."""
+import pytest
+
+from osman.validation import MappingValidator
+
+MAPPING = {
+    "mappings": {
+        "dynamic": "strict",
+        "properties": {
+            "age": {"type": "byte"},
+            "id": {"type": "integer"},
+            "score": {"type": "float"},
+            "name": {"type": "text"},
+            "active": {"type": "boolean"},
+            "created": {"type": "date"},
+            "tags": {"type": "keyword"},
+            "address": {
+                "dynamic": "true",
+                "properties": {"zip": {"type": "integer", "coerce": False}},
+            },
+            "items": {
+                "type": "nested",
+                "properties": {"qty": {"type": "long"}},
+            },
+        },
+    }
+}
+
+
+@pytest.mark.parametrize(
+    "document, expected",
+    [
+        ({"id": 1, "name": "james"}, {"id": 1, "name": "james"}),
+        ({"id": "5", "score": "1.5"}, {"id": 5, "score": 1.5}),
+        ({"id": 2.7, "active": "false"}, {"id": 2, "active": False}),
+        ({"tags": ["a", 1, None]}, {"tags": ["a", 1, None]}),
+        ({"created": "2024-01-01", "age": None}, None),
+        ({"address": {"zip": 123, "city": "x"}}, None),
+        (
+            {"items": [{"qty": "3"}, {"qty": 4}]},
+            {"items": [{"qty": 3}, {"qty": 4}]},
+        ),
+    ],
+)
+def test_valid_documents(document: dict, expected: dict):
+    """
+    Valid documents should be coerced without modifying the input.
+
+    None as expected means the document is returned as is.
+    """
+    original = repr(document)
+    coerced, errors = MappingValidator(MAPPING).validate(document)
+    assert errors == []
+    if expected is None:
+        assert coerced is document
+    else:
+        assert coerced == expected
+    assert repr(document) == original
+
+
+@pytest.mark.parametrize(
+    "document, expected_error",
+    [
+        ({"id": "x"}, "id:"),
+        ({"age": 300}, "age: 300 is out of byte range"),
+        ({"id": True}, "id: boolean is not integer"),
+        ({"score": [1, "nan"]}, "score:"),
+        ({"active": "yes"}, "active: 'yes' is not boolean"),
+        ({"name": {"first": "james"}}, "name: dict is not a string"),
+        ({"created": {}}, "created: {} is not a date"),
+        ({"address": {"zip": "123"}}, "address.zip: str is not integer"),
+        ({"address": "street"}, "address: str is not an object"),
+        ({"items": [{"qty": 1.5e30}]}, "items.qty: "),
+        ({"unknown": 1}, "unknown: field not in the mapping"),
+    ],
+)
+def test_invalid_documents(document: dict, expected_error: str):
+    """Invalid documents should be reported with the field path."""
+    _, errors = MappingValidator(MAPPING).validate(document)
+    assert len(errors) == 1
+    assert errors[0].startswith(expected_error)
+
+
+def test_validate_batch():
+    """Batch should be split into valid and rejected documents."""
+    validator = MappingValidator.from_response({"index-1": MAPPING})
+    valid, rejected = validator.validate_batch(
+        [{"id": "1"}, {"id": "x"}, {"id": 3}]
+    )
+    assert valid == [{"id": 1}, {"id": 3}]
+    assert rejected[0]["document"] == {"id": "x"}
+
+
+def test_from_response_alias():
+    """Mappings of several indices should be rejected."""
+    with pytest.raises(ValueError, match="index-1, index-2"):
+        MappingValidator.from_response({"index-1": MAPPING, "index-2": MAPPING})